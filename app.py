@@ -1,15 +1,28 @@
 # app.py
 
+import os
 import streamlit as st
-import re
+from src.knn_classifier import KNNVoteClassifier
 from src.rag_pipeline import RAGPipeline
+from src.response_cache import ResponseCache
+from src.telemetry import PipelineTelemetry
 
 # NOTE: Les constantes sont généralement importées depuis main ou un fichier de config.
 # Pour l'autonomie de l'application, nous les redéfinissons ici (assurez-vous qu'elles correspondent à main.py)
 CHROMA_PATH = "data/vector_db"
 COLLECTION_NAME = "articles"
 EMBEDDING_MODEL = "all-minilm"
+# Vectorisation des requêtes dans le processus (ONNX Runtime) plutôt que par le serveur Ollama
+USE_ONNX_EMBEDDER = False
 GENERATION_MODEL = "llama3.2"  # Ou 'phi3:mini'
+# Seuil du vote kNN calibré par benchmarks/calibrate_knn.py (optionnel)
+KNN_CLASSIFIER_PATH = "data/processed/knn_classifier.json"
+# Cache des réponses : articles déjà analysés ou quasi identiques
+RESPONSE_CACHE_PATH = "data/cache/responses.sqlite"
+# Index lexical BM25 (construit par build_vector_db.py) : recherche hybride s'il existe
+BM25_INDEX_PATH = "data/processed/bm25_index"
+# Journal JSON des analyses : durée de chaque étape et statistiques de tokens Ollama
+TELEMETRY_LOG_PATH = "data/logs/analyses.jsonl"
 
 # ===============================================
 # 1. INITIALISATION DU PIPELINE (mis en cache)
@@ -20,10 +33,23 @@ GENERATION_MODEL = "llama3.2"  # Ou 'phi3:mini'
 def get_rag_pipeline():
     """Initialise et met en cache l'objet RAGPipeline."""
     try:
+        embedder = None
+        if USE_ONNX_EMBEDDER:
+            from src.onnx_embedding import OnnxEmbedder # Import tardif : ONNX Runtime seulement si utilisé
+            embedder = OnnxEmbedder(EMBEDDING_MODEL)
         rag_pipe = RAGPipeline(
             chroma_path=CHROMA_PATH,
             collection_name=COLLECTION_NAME,
             embedding_model=EMBEDDING_MODEL,
+            knn_classifier=(
+                KNNVoteClassifier.load(KNN_CLASSIFIER_PATH)
+                if os.path.exists(KNN_CLASSIFIER_PATH)
+                else None
+            ),
+            response_cache=ResponseCache(RESPONSE_CACHE_PATH),
+            telemetry=PipelineTelemetry(TELEMETRY_LOG_PATH),
+            embedder=embedder,
+            bm25_path=BM25_INDEX_PATH if os.path.isdir(BM25_INDEX_PATH) else None,
         )
         return rag_pipe
     except Exception as e:
@@ -78,7 +104,21 @@ N_RESULTS = st.sidebar.slider(
 LLM_MODEL = st.sidebar.text_input(
     "Modèle de Génération (Ollama) :", value=GENERATION_MODEL
 )
+STOP_AFTER = st.sidebar.selectbox(
+    "Arrêt de la génération :",
+    options=[None, "reason", "verdict"],
+    format_func=lambda v: {
+        None: "Réponse complète",
+        "reason": "Après la justification",
+        "verdict": "Dès le verdict (plus rapide)",
+    }[v],
+)
 st.sidebar.caption(f"Modèle d'Embedding: {EMBEDDING_MODEL}")
+if rag_pipeline and rag_pipeline.response_cache is not None:
+    cache_stats = rag_pipeline.response_cache.stats()
+    st.sidebar.caption(
+        f"Cache des réponses : {cache_stats['entries']} entrées, hit rate {cache_stats['hit_rate']:.0%}"
+    )
 
 
 # ===============================================
@@ -97,62 +137,69 @@ if st.button("Lancer l'Analyse 🔍") and rag_pipeline:
     else:
         st.subheader("Résultats de l'Analyse RAG")
 
-        with st.spinner(
-            f"⏳ Recherche de k={N_RESULTS} chunks similaires et demande au modèle {LLM_MODEL}..."
-        ):
-            try:
-                # La fonction doit retourner (réponse_LLM, docs, metas)
-                response, docs, metas = rag_pipeline.analyze_article(
-                    text=user_article, model_name=LLM_MODEL, n_results=N_RESULTS
+        try:
+            with st.spinner(f"⏳ Recherche de k={N_RESULTS} chunks similaires..."):
+                # La fonction retourne (flux de la réponse, docs, metas) ; la génération démarre à l'itération
+                stream, docs, metas = rag_pipeline.stream_article(
+                    text=user_article,
+                    model_name=LLM_MODEL,
+                    n_results=N_RESULTS,
+                    stop_after=STOP_AFTER,
                 )
 
-                # Extraction du Verdict et de la Raison (selon le format 'Verdict: X\nReason: Y' défini dans retrieval.py)
-                verdict_match = re.search(
-                    r"Verdict: (TRUE|FAKE)", response, re.IGNORECASE
+            verdict_box = st.empty()
+            verdict_box.info(f"⏳ Génération de la réponse par le modèle {LLM_MODEL}...")
+            st.markdown("---")
+            st.markdown(f"**Justification du Modèle ({LLM_MODEL}) :**")
+            reason_box = st.empty()
+
+            shown_verdict = None
+            # Affichage incrémental : les tokens sont rendus dès leur arrivée
+            for _ in stream:
+                if stream.verdict and stream.verdict != shown_verdict:
+                    shown_verdict = stream.verdict
+                    # --- AFFICHAGE DU VERDICT (dès qu'il est lisible) ---
+                    if shown_verdict == "TRUE":
+                        verdict_box.success(f"## ✅ VERDICT : **ARTICLE FIABLE**")
+                    else:
+                        verdict_box.error(f"## 🚨 VERDICT : **FAUSSE NOUVELLE POTENTIELLE**")
+                reason_box.info(stream.reason or stream.text)
+
+            if stream.verdict is None:
+                verdict_box.warning(f"## ❓ VERDICT : **RÉPONSE DU LLM INDÉTERMINÉE**")
+            # --- AFFICHAGE DE LA JUSTIFICATION ---
+            reason = stream.reason or ("" if stream.stopped_early else stream.text.strip())
+            reason_box.info(reason or "Justification non demandée (arrêt dès le verdict).")
+
+            # --- DURÉES PAR ÉTAPE (dernière analyse) ---
+            last_trace = rag_pipeline.telemetry.last_trace
+            if last_trace is not None:
+                timings = ", ".join(f"{name} {ms:.0f} ms" for name, ms in last_trace.stages.items())
+                st.caption(f"⏱️ {timings}")
+
+            # --- AFFICHAGE DES CHUNKS DE RÉFÉRENCE ---
+            st.subheader(f"Articles de Référence Récupérés (Top {len(docs)})")
+            st.caption(
+                "Ce sont les passages que le modèle a utilisés comme contexte."
+            )
+
+            for i, (doc, meta) in enumerate(zip(docs, metas)):
+                # Assurez-vous que meta['label'] est soit 0 (Fake) soit 1 (True)
+                label_value = meta.get("label", -1)
+                label_text = (
+                    "Vrai (Label 1)"
+                    if label_value == 1
+                    else "Faux (Label 0)"
+                    if label_value == 0
+                    else "N/A"
                 )
-                reason_match = re.search(r"Reason: (.*)", response, re.DOTALL)
 
-                verdict = verdict_match.group(1).upper() if verdict_match else "INCONNU"
-                reason = (
-                    reason_match.group(1).strip() if reason_match else response.strip()
-                )
+                col1, col2 = st.columns([1, 4])
+                col1.markdown(f"**Chunk #{i + 1}**")
+                col1.markdown(f"**Label :** `{label_text}`")
+                col2.code(doc, language="text")
 
-                # --- AFFICHAGE DU VERDICT ---
-                if verdict == "TRUE":
-                    st.success(f"## ✅ VERDICT : **ARTICLE FIABLE**")
-                elif verdict == "FAKE":
-                    st.error(f"## 🚨 VERDICT : **FAUSSE NOUVELLE POTENTIELLE**")
-                else:
-                    st.warning(f"## ❓ VERDICT : **RÉPONSE DU LLM INDÉTERMINÉE**")
-
-                # --- AFFICHAGE DE LA JUSTIFICATION ---
-                st.markdown("---")
-                st.markdown(f"**Justification du Modèle ({LLM_MODEL}) :**")
-                st.info(reason)
-
-                # --- AFFICHAGE DES CHUNKS DE RÉFÉRENCE ---
-                st.subheader(f"Articles de Référence Récupérés (Top {len(docs)})")
-                st.caption(
-                    "Ce sont les passages que le modèle a utilisés comme contexte."
-                )
-
-                for i, (doc, meta) in enumerate(zip(docs, metas)):
-                    # Assurez-vous que meta['label'] est soit 0 (Fake) soit 1 (True)
-                    label_value = meta.get("label", -1)
-                    label_text = (
-                        "Vrai (Label 1)"
-                        if label_value == 1
-                        else "Faux (Label 0)"
-                        if label_value == 0
-                        else "N/A"
-                    )
-
-                    col1, col2 = st.columns([1, 4])
-                    col1.markdown(f"**Chunk #{i + 1}**")
-                    col1.markdown(f"**Label :** `{label_text}`")
-                    col2.code(doc, language="text")
-
-            except Exception as e:
-                st.error(
-                    f"Une erreur s'est produite lors de l'exécution du RAG. Détails : {e}"
-                )
+        except Exception as e:
+            st.error(
+                f"Une erreur s'est produite lors de l'exécution du RAG. Détails : {e}"
+            )
@@ -0,0 +1,55 @@
+"""
+Benchmark du nettoyage : méthodes chaînées de DataCleaner vs clean_pipeline (passe unique).
+
+Usage :
+    python -m benchmarks.bench_cleaning --rows 20000 --jobs 4
+"""
+import argparse
+import os
+import random
+import time
+import pandas as pd
+from src.preprocessing import DataCleaner
+
+WORDS = ["Trump", "senate", "said", "on", "Tuesday", "the", "bill", "(Reuters)", "-", "WASHINGTON",
+         "http://t.co/abc", "vote!!", "Republicans", "tax", "reform", "@realDonaldTrump", "  ", "2017"]
+
+
+def make_articles(n_rows: int, words_per_article: int = 400, seed: int = 0) -> pd.DataFrame:
+    """Génère un DataFrame au format de True.csv / Fake.csv (title, text, subject, date)."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "title": [" ".join(rng.choices(WORDS, k=12)) for _ in range(n_rows)],
+        "text": [" " + " ".join(rng.choices(WORDS, k=words_per_article)) + " " for _ in range(n_rows)],
+        "subject": [rng.choice(["politicsNews", "worldnews", "News"]) for _ in range(n_rows)],
+        "date": [rng.choice(["December 31, 2017 ", "November 9, 2016", "bad date"]) for _ in range(n_rows)],
+    })
+
+
+def timed(label: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<40} {elapsed:8.2f}s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = make_articles(args.rows)
+    print(f"[INFO] {len(df)} articles synthétiques")
+
+    chained, t_chained = timed("chaîné (strip/lower/date/clean)", lambda: (
+        DataCleaner(df.copy()).remove_spaces().lower_case().date_format().clean_all_text_columns().df
+    ))
+    fused, t_fused = timed("clean_pipeline (n_jobs=1)", lambda: DataCleaner(df.copy()).clean_pipeline().df)
+    parallel, t_parallel = timed(f"clean_pipeline (n_jobs={args.jobs})",
+                                 lambda: DataCleaner(df.copy()).clean_pipeline(n_jobs=args.jobs).df)
+
+    pd.testing.assert_frame_equal(fused, chained)
+    pd.testing.assert_frame_equal(parallel, chained)
+    print(f"[OK] Résultats identiques. Gain : x{t_chained / t_fused:.2f} (1 process), x{t_chained / t_parallel:.2f} ({args.jobs} process)")
@@ -0,0 +1,217 @@
+"""
+Benchmark de bout en bout, entièrement hors ligne : corpus synthétique au format de
+True.csv / Fake.csv et faux serveur Ollama local (embeddings déterministes, latence réglable).
+
+Chaque étape est chronométrée : chargement (CSVLoader), nettoyage (DataCleaner),
+découpage (split_text), vectorisation (embed_texts), insertion (insert_into_chroma),
+recherche (retrieve_similar_docs, p50 / p95 par requête) et analyse complète
+(analyze_article, p50 / p95 et détail par étape). Les résultats sont écrits en JSON
+(avec le commit courant) pour comparer deux versions du code.
+
+Usage :
+    python -m benchmarks.bench_pipeline --articles 2000 --output benchmarks/results/$(git rev-parse --short HEAD).json
+    # Comparaison de deux exécutions (ratio après / avant par étape)
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/avant.json benchmarks/results/apres.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+import numpy as np
+import ollama
+from benchmarks.bench_cleaning import make_articles
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from src.embedding import OllamaEmbedder
+from src.preprocessing import CSVLoader, DataCleaner, DatasetMerger
+from src.rag_pipeline import RAGPipeline
+from src.retrieval import RAGAnalyzer
+from src.storage_chroma import ChromaStorage
+from src.telemetry import PipelineTelemetry
+from src.vector_store import EmbeddingStore
+
+
+@contextmanager
+def use_ollama_host(host: str):
+    """Redirige les fonctions du module ollama (client par défaut) vers `host` le temps du bloc."""
+    client = ollama.Client(host=host)
+    with patch.multiple(ollama, embed=client.embed, embeddings=client.embeddings, generate=client.generate):
+        yield client
+
+
+def write_corpus(workdir: str, n_articles: int):
+    """Écrit True.csv et Fake.csv synthétiques (n_articles au total) et renvoie leurs chemins."""
+    paths = []
+    for name, seed in (("True.csv", 0), ("Fake.csv", 1)):
+        path = os.path.join(workdir, name)
+        make_articles(max(n_articles // 2, 1), words_per_article=400, seed=seed).to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_summary(latencies) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {"queries": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3), "mean_ms": round(float(ms.mean()), 3)}
+
+
+class StageTimer:
+    """Chronomètre les étapes et accumule les résultats {étape: {seconds, items, items_per_s}}."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, stage: str, fn, items=None):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        n = items(result) if callable(items) else items
+        self.stages[stage] = {"seconds": round(elapsed, 4), "items": n,
+                              "items_per_s": round(n / max(elapsed, 1e-9), 2) if n else None}
+        print(f"{stage:<24} {elapsed:8.3f}s" + (f"  ({n} éléments)" if n else ""))
+        return result
+
+
+def run_benchmark(workdir: str, host: str, n_articles: int = 1000, n_queries: int = 20, n_results: int = 3,
+                  backend: str = "chroma", chunk_size: int = 300, overlap: int = 30, batch_size: int = 64,
+                  max_workers: int = 4) -> dict:
+    """
+    Exécute toutes les étapes sur un corpus synthétique, les appels Ollama étant servis par `host`.
+
+    Returns:
+        dict: Durées et débits par étape, latences p50 / p95 de la recherche et de l'analyse.
+    """
+    timer = StageTimer()
+    true_csv, fake_csv = write_corpus(workdir, n_articles)
+
+    with use_ollama_host(host):
+        # --- CHARGEMENT ET NETTOYAGE ---
+        loader = CSVLoader()
+        df_true, df_fake = timer.run(
+            "load_csv", lambda: (loader.load_csv(true_csv), loader.load_csv(fake_csv)),
+            items=lambda dfs: sum(len(df) for df in dfs),
+        )
+        combined_df = timer.run("clean", lambda: DatasetMerger().merge([
+            DataCleaner(df).add_label(label).drop_empty_rows_and_duplicated().clean_pipeline().get_df()
+            for df, label in ((df_true, 1), (df_fake, 0))
+        ]), items=len)
+
+        # --- DÉCOUPAGE, VECTORISATION, STOCKAGE ---
+        embedder = OllamaEmbedder(model_name="all-minilm", chunk_size=chunk_size, overlap=overlap,
+                                  batch_size=batch_size, max_workers=max_workers)
+        chunks_df = timer.run("split_text", lambda: embedder.build_chunks(combined_df), items=len)
+        embeddings = timer.run(
+            "embed_texts", lambda: np.asarray(embedder.embed_texts(chunks_df["chunk"].tolist()), dtype=np.float32),
+            items=len,
+        )
+        store_dir = os.path.join(workdir, "store")
+        timer.run("store_write", lambda: EmbeddingStore(store_dir).write(chunks_df, embeddings), items=len(chunks_df))
+        storage = ChromaStorage(persist_dir=os.path.join(workdir, "db"), collection_name="bench")
+        timer.run("insert_into_chroma", lambda: storage.insert_into_chroma(chunks_df, embeddings=embeddings),
+                  items=len(chunks_df))
+
+        # --- REQUÊTES ---
+        queries = combined_df["text"].sample(n=min(n_queries, len(combined_df)), random_state=0).tolist()
+        retriever = RAGAnalyzer(os.path.join(workdir, "db"), "bench", backend=backend, store_path=store_dir)
+        vectors = retriever.vectorize_queries(queries)
+        latencies = []
+        for vector in vectors:
+            t0 = time.perf_counter()
+            retriever.retrieve_similar_docs(vector, n_results=n_results)
+            latencies.append(time.perf_counter() - t0)
+        retrieval = latency_summary(latencies)
+        print(f"{'retrieve_similar_docs':<24} p50 {retrieval['p50_ms']:.2f} ms, p95 {retrieval['p95_ms']:.2f} ms")
+
+        telemetry = PipelineTelemetry()
+        pipeline = RAGPipeline(os.path.join(workdir, "db"), "bench", backend=backend, store_path=store_dir,
+                               telemetry=telemetry)
+        latencies, stage_ms = [], {}
+        for text in queries:
+            t0 = time.perf_counter()
+            pipeline.analyze_article(text, n_results=n_results)
+            latencies.append(time.perf_counter() - t0)
+            for stage, ms in telemetry.last_trace.stages.items():
+                stage_ms.setdefault(stage, []).append(ms)
+        analysis = latency_summary(latencies)
+        analysis["stages_mean_ms"] = {stage: round(float(np.mean(v)), 3) for stage, v in stage_ms.items()}
+        print(f"{'analyze_article':<24} p50 {analysis['p50_ms']:.2f} ms, p95 {analysis['p95_ms']:.2f} ms")
+
+    return {
+        "stages": timer.stages,
+        "retrieve_similar_docs": retrieval,
+        "analyze_article": analysis,
+        "corpus": {"articles": len(combined_df), "chunks": len(chunks_df), "dim": int(embeddings.shape[1])},
+    }
+
+
+def compare(before: dict, after: dict) -> None:
+    """Affiche, pour chaque mesure, les valeurs des deux exécutions et le ratio après / avant."""
+    rows = [(stage, before["stages"][stage]["seconds"] * 1000, after["stages"][stage]["seconds"] * 1000)
+            for stage in before["stages"] if stage in after["stages"]]
+    for name in ("retrieve_similar_docs", "analyze_article"):
+        for p in ("p50_ms", "p95_ms"):
+            rows.append((f"{name} {p[:3]}", before[name][p], after[name][p]))
+    print(f"\n{before.get('commit')} -> {after.get('commit')}")
+    print(f"{'mesure':<28}{'avant (ms)':>12}{'après (ms)':>12}{'ratio':>8}")
+    for name, b, a in rows:
+        print(f"{name:<28}{b:>12.2f}{a:>12.2f}{a / b if b else float('nan'):>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1000, help="Nombre d'articles synthétiques (True + Fake).")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--n-results", type=int, default=3)
+    parser.add_argument("--backend", default="chroma", choices=RAGAnalyzer.BACKENDS)
+    parser.add_argument("--chunk-size", type=int, default=300)
+    parser.add_argument("--overlap", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=384, help="Dimension des embeddings du faux serveur.")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Latence simulée (s) par requête d'embedding.")
+    parser.add_argument("--generate-latency", type=float, default=0.05, help="Latence simulée (s) avant le premier token.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Latence simulée (s) par token généré.")
+    parser.add_argument("--output", default=None, help="Fichier JSON de résultats.")
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRES"), help="Compare deux fichiers de résultats.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f_before, open(args.compare[1], encoding="utf-8") as f_after:
+            compare(json.load(f_before), json.load(f_after))
+        exit(0)
+
+    server = FakeOllamaServer(dim=args.dim, embed_latency=args.embed_latency,
+                              generate_latency=args.generate_latency, token_latency=args.token_latency)
+    with server, tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmark(workdir, server.host, n_articles=args.articles, n_queries=args.queries,
+                                n_results=args.n_results, backend=args.backend, chunk_size=args.chunk_size,
+                                overlap=args.overlap, batch_size=args.batch_size, max_workers=args.max_workers)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "server_requests": {route: s["requests"] for route, s in server.stats.items()},
+        **results,
+    }
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Résultats écrits dans '{args.output}'")
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,111 @@
+"""
+Benchmark de la recherche : Chroma (collection.query), NumpySearchIndex (recherche exacte)
+et QuantizedSearchIndex (int8 / pq avec re-ranking).
+
+Mesure la latence par requête (p50 / p95), le rappel@k par rapport à la recherche
+exacte NumPy et la mémoire des index compressés.
+
+Usage :
+    # Sur le corpus (store + collection construits par build_vector_db.py)
+    python -m benchmarks.bench_retrieval --store data/processed/embedded_chunks_normalized \\
+        --chroma-path data/vector_db --collection articles
+    # Sur un corpus synthétique
+    python -m benchmarks.bench_retrieval --synthetic 50000
+"""
+import argparse
+import tempfile
+import time
+import chromadb
+import numpy as np
+import pandas as pd
+from src.numpy_index import NumpySearchIndex
+from src.quantized_index import QuantizedSearchIndex, recall_at_k
+from src.storage_chroma import ChromaStorage
+from src.vector_store import EmbeddingStore
+
+
+def make_synthetic(n: int, dim: int, workdir: str):
+    """Crée un store et une collection Chroma de n vecteurs normalisés aléatoires."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    df = pd.DataFrame({
+        "index_article": np.arange(n),
+        "chunk_index": np.zeros(n, dtype=int),
+        "chunk": [f"chunk {i}" for i in range(n)],
+        "label": rng.integers(0, 2, n),
+        "subject": "News",
+        "date": pd.Timestamp("2017-12-31"),
+    })
+    store_dir = f"{workdir}/store"
+    EmbeddingStore(store_dir).write(df, vectors)
+    storage = ChromaStorage(persist_dir=f"{workdir}/db", collection_name="bench")
+    storage.insert_into_chroma(df, embeddings=vectors)
+    return store_dir, storage.collection
+
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="data/processed/embedded_chunks_normalized")
+    parser.add_argument("--chroma-path", default="data/vector_db")
+    parser.add_argument("--collection", default="articles")
+    parser.add_argument("--synthetic", type=int, default=0, help="Nombre de vecteurs synthétiques (0 = corpus réel).")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    if args.synthetic:
+        store_dir, collection = make_synthetic(args.synthetic, args.dim, workdir)
+    else:
+        store_dir = args.store
+        collection = chromadb.PersistentClient(path=args.chroma_path).get_collection(args.collection)
+
+    index = NumpySearchIndex(store_dir)
+    # Ids Chroma de chaque ligne du store (mêmes ids que insert_into_chroma)
+    chroma_ids = ChromaStorage.make_chunk_ids(EmbeddingStore(store_dir).load_metadata())
+    # Requêtes : chunks du corpus légèrement bruités puis renormalisés
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(index), size=min(args.queries, len(index)), replace=False)
+    queries = np.asarray(index.embeddings[rows]) + rng.normal(scale=0.05, size=(len(rows), index.embeddings.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    numpy_lat, chroma_lat, recalls = [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        idx, _ = index.search(q, k=args.k)
+        numpy_lat.append(time.perf_counter() - t0)
+        exact = {chroma_ids[i] for i in idx[0]}
+
+        t0 = time.perf_counter()
+        res = collection.query(query_embeddings=[q.tolist()], n_results=args.k, include=["documents", "metadatas"])
+        chroma_lat.append(time.perf_counter() - t0)
+        recalls.append(len(set(res["ids"][0]) & exact) / len(exact))
+
+    t0 = time.perf_counter()
+    index.search(queries, k=args.k)
+    batched = (time.perf_counter() - t0) / len(queries)
+
+    print(f"\n{len(index)} vecteurs, {len(queries)} requêtes, k={args.k}")
+    print(f"{'backend':<22}{'p50 (ms)':>10}{'p95 (ms)':>10}{'rappel@k':>10}")
+    print(f"{'numpy (exact)':<22}{percentiles(numpy_lat)[0]:>10.2f}{percentiles(numpy_lat)[1]:>10.2f}{1.0:>10.3f}")
+    print(f"{'numpy (batch)':<22}{batched * 1000:>10.2f}{'-':>10}{1.0:>10.3f}")
+    print(f"{'chroma':<22}{percentiles(chroma_lat)[0]:>10.2f}{percentiles(chroma_lat)[1]:>10.2f}{np.mean(recalls):>10.3f}")
+
+    for method in QuantizedSearchIndex.METHODS:
+        quantized = QuantizedSearchIndex(store_dir, method=method)
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            quantized.search(q, k=args.k)
+            latencies.append(time.perf_counter() - t0)
+        p50, p95 = percentiles(latencies)
+        recall = recall_at_k(quantized, index, queries, k=args.k)
+        ratio = index.embeddings.nbytes / quantized.memory_bytes()
+        print(f"{method + f' (x{ratio:.1f} mém.)':<22}{p50:>10.2f}{p95:>10.2f}{recall:>10.3f}")
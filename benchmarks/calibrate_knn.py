@@ -0,0 +1,82 @@
+"""
+Calibration du vote kNN (KNNVoteClassifier) sur un jeu annoté tenu à l'écart.
+
+Pour chaque article du jeu de validation, les k voisins sont récupérés dans la base
+vectorielle ; le script affiche le compromis entre la part des requêtes court-circuitées
+(verdict rendu sans LLM) et la précision du vote, choisit le seuil le plus bas qui
+atteint la précision visée et sauvegarde les paramètres du classifieur.
+
+Avec --with-llm, les articles ambigus sont envoyés au LLM (mode verdict rapide) pour
+mesurer la précision globale du pipeline hybride.
+
+Usage :
+    python -m benchmarks.calibrate_knn --holdout data/processed/holdout.csv --backend numpy
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from src.knn_classifier import KNNVoteClassifier
+from src.retrieval import RAGAnalyzer
+
+
+def drop_self_matches(neighbours, k: int, min_distance: float):
+    """Retire les voisins quasi identiques (l'article lui-même s'il est indexé) et garde les k premiers."""
+    kept = []
+    for docs, metas, distances in neighbours:
+        rows = [i for i, d in enumerate(distances) if d >= min_distance][:k]
+        kept.append(([docs[i] for i in rows], [metas[i] for i in rows], [distances[i] for i in rows]))
+    return kept
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--holdout", required=True, help="CSV annoté (colonnes text et label) absent de l'index.")
+    parser.add_argument("--text-col", default="text")
+    parser.add_argument("--n", type=int, default=1000, help="Nombre d'articles évalués.")
+    parser.add_argument("--backend", default="chroma", choices=RAGAnalyzer.BACKENDS)
+    parser.add_argument("--store", default="data/processed/embedded_chunks_normalized")
+    parser.add_argument("--chroma-path", default="data/vector_db")
+    parser.add_argument("--collection", default="articles")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-distance", type=float, default=1e-3,
+                        help="Distance en dessous de laquelle un voisin est considéré comme l'article lui-même.")
+    parser.add_argument("--target-accuracy", type=float, default=0.95)
+    parser.add_argument("--output", default="data/processed/knn_classifier.json")
+    parser.add_argument("--with-llm", action="store_true", help="Évalue aussi le LLM sur les cas ambigus.")
+    parser.add_argument("--model", default="llama3.2")
+    args = parser.parse_args()
+
+    holdout = pd.read_csv(args.holdout).dropna(subset=[args.text_col, "label"])
+    holdout = holdout.sample(n=min(args.n, len(holdout)), random_state=0)
+    texts = holdout[args.text_col].astype(str).tolist()
+    labels = holdout["label"].astype(int).to_numpy()
+
+    analyzer = RAGAnalyzer(chroma_path=args.chroma_path, collection_name=args.collection,
+                           backend=args.backend, store_path=args.store)
+    vectors = analyzer.vectorize_queries(texts)
+    neighbours = drop_self_matches(
+        analyzer.retrieve_batch(vectors, n_results=args.k + 1, return_distances=True), args.k, args.min_distance
+    )
+    votes = [(metas, distances) for _, metas, distances in neighbours]
+
+    classifier = KNNVoteClassifier()
+    print(f"\n{'seuil':>7} {'court-circuit':>14} {'précision kNN':>14}")
+    for row in classifier.tradeoff(votes, labels, thresholds=np.round(np.arange(0.5, 1.0, 0.05), 2)):
+        print(f"{row['threshold']:>7.2f} {row['coverage']:>14.1%} {row['accuracy']:>14.1%}")
+
+    best = classifier.calibrate(votes, labels, target_accuracy=args.target_accuracy)
+    classifier.save(args.output)
+    print(f"[INFO] Paramètres sauvegardés dans '{args.output}'")
+
+    if args.with_llm:
+        predictions = []
+        for text, (docs, metas, distances), y in zip(texts, neighbours, labels):
+            label, confidence = classifier.predict(metas, distances)
+            if label is not None and classifier.is_confident(confidence):
+                predictions.append(label)
+                continue
+            prompt = analyzer.build_verdict_prompt(text, docs, metas)
+            result = analyzer.generate_verdict(prompt, metas, args.model)
+            predictions.append({"TRUE": 1, "FAKE": 0}.get(result.verdict, -1))
+        accuracy = float(np.mean(np.array(predictions) == labels))
+        print(f"[INFO] Pipeline hybride : {best['coverage']:.1%} sans LLM, précision globale {accuracy:.1%}")
@@ -0,0 +1,204 @@
+"""
+Évaluation qualité / latence des paramètres de recherche et de découpage.
+
+Un échantillon annoté du jeu nettoyé (cleaned_df_all.csv) est tenu à l'écart de l'index.
+Pour chaque configuration (chunk_size, overlap) l'index est reconstruit sur le reste du
+corpus, puis chaque valeur de n_results est évaluée à travers RAGPipeline :
+
+- précision du verdict : verdict du LLM (ou du vote kNN) comparé à la colonne `label`
+  des articles tenus à l'écart ;
+- rappel@k : part des requêtes « titre » d'articles indexés dont l'article source figure
+  parmi les k chunks retrouvés ;
+- latence p50 / p95 de analyze_article ;
+- coût par requête : tokens du prompt et de la réponse (statistiques Ollama), temps de
+  génération et coût estimé à partir des prix au millier de tokens.
+
+Usage :
+    python -m benchmarks.evaluate --data data/processed/cleaned_df_all.csv \\
+        --chunk-sizes 200 300 --overlaps 30 --n-results 3 5 8 --holdout 200
+    # Hors ligne (faux serveur Ollama, corpus synthétique) pour vérifier le harnais
+    python -m benchmarks.evaluate --synthetic 400 --fake-ollama
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.bench_cleaning import make_articles
+from benchmarks.bench_pipeline import use_ollama_host
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from src.embedding import OllamaEmbedder
+from src.embedding_cache import EmbeddingCache
+from src.preprocessing import DataCleaner, DatasetMerger
+from src.rag_pipeline import RAGPipeline
+from src.retrieval import RAGAnalyzer
+from src.storage_chroma import ChromaStorage
+from src.telemetry import PipelineTelemetry
+from src.verdict import parse_verdict
+
+VERDICT_LABELS = {"TRUE": 1, "FAKE": 0}
+# (clé, titre, largeur, format) des colonnes du tableau de résultats
+TABLE_COLUMNS = [
+    ("chunk_size", "chunk", 6, "d"), ("overlap", "overlap", 8, "d"), ("n_results", "k", 4, "d"),
+    ("accuracy", "précision", 10, ".1%"), ("unknown_rate", "indéterm.", 10, ".1%"),
+    ("recall_at_k", "rappel@k", 9, ".1%"), ("p50_ms", "p50 (ms)", 9, ".0f"), ("p95_ms", "p95 (ms)", 9, ".0f"),
+    ("prompt_tokens", "tok. prompt", 12, ".0f"), ("completion_tokens", "tok. rép.", 10, ".0f"),
+    ("generate_s", "génér. (s)", 11, ".2f"), ("cost", "coût/req.", 10, ".5f"),
+]
+
+
+def split_holdout(df: pd.DataFrame, n_holdout: int, seed: int = 0):
+    """Sépare un échantillon stratifié par label (tenu à l'écart) du corpus à indexer."""
+    frac = min(n_holdout / max(len(df), 1), 0.5)
+    holdout = df.groupby("label", group_keys=False).sample(frac=frac, random_state=seed)
+    return df.drop(holdout.index).reset_index(drop=True), holdout.reset_index(drop=True)
+
+
+def synthetic_corpus(n_articles: int) -> pd.DataFrame:
+    """Corpus synthétique nettoyé (moitié TRUE, moitié FAKE), pour tester le harnais hors ligne."""
+    return DatasetMerger().merge([
+        DataCleaner(make_articles(n_articles // 2, seed=label)).add_label(label)
+        .drop_empty_rows_and_duplicated().clean_pipeline().get_df()
+        for label in (1, 0)
+    ])
+
+
+def build_index(train_df: pd.DataFrame, workdir: str, chunk_size: int, overlap: int, backend: str,
+                cache: EmbeddingCache = None) -> str:
+    """Construit le store d'embeddings (et la collection Chroma si besoin) pour une configuration de découpage."""
+    store_dir = os.path.join(workdir, f"store_{chunk_size}_{overlap}")
+    embedder = OllamaEmbedder(model_name="all-minilm", chunk_size=chunk_size, overlap=overlap,
+                              batch_size=64, cache=cache)
+    embedded = embedder.embed_dataframe(train_df, text_col="text", output_path=store_dir)
+    if backend == "chroma":
+        ChromaStorage(persist_dir=os.path.join(workdir, "db"), collection_name=f"eval_{chunk_size}_{overlap}") \
+            .insert_into_chroma(embedded)
+    return store_dir
+
+
+def evaluate_config(pipeline: RAGPipeline, holdout: pd.DataFrame, recall_queries: pd.DataFrame, n_results: int,
+                    model_name: str, price_prompt: float, price_completion: float) -> dict:
+    """Précision, rappel@k, latences et coût par requête d'une valeur de n_results."""
+    # --- Rappel@k : requête = titre d'un article indexé ---
+    retriever = pipeline.retriever
+    vectors = retriever.vectorize_queries(recall_queries["title"].tolist())
+    found = [
+        any(meta.get("index_article") == source for meta in metas)
+        for (_, metas), source in zip(
+            (retriever.retrieve_similar_docs(v, n_results=n_results) for v in vectors),
+            recall_queries.index,
+        )
+    ]
+
+    # --- Verdicts sur les articles tenus à l'écart ---
+    telemetry = pipeline.telemetry
+    predictions, latencies, prompt_tokens, completion_tokens, generate_s = [], [], [], [], []
+    for text in holdout["text"]:
+        t0 = time.perf_counter()
+        response, _, _ = pipeline.analyze_article(text, model_name=model_name, n_results=n_results)
+        latencies.append(time.perf_counter() - t0)
+        predictions.append(VERDICT_LABELS.get(parse_verdict(response), -1))
+        stats = telemetry.last_trace.ollama
+        prompt_tokens.append(stats.get("prompt_eval_count", 0))
+        completion_tokens.append(stats.get("eval_count", 0))
+        generate_s.append(stats.get("total_duration", 0) / 1e9)
+
+    predictions = np.array(predictions)
+    ms = np.asarray(latencies) * 1000
+    return {
+        "n_results": n_results,
+        "accuracy": float(np.mean(predictions == holdout["label"].astype(int).to_numpy())),
+        "unknown_rate": float(np.mean(predictions == -1)),
+        "recall_at_k": float(np.mean(found)) if found else float("nan"),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "prompt_tokens": float(np.mean(prompt_tokens)),
+        "completion_tokens": float(np.mean(completion_tokens)),
+        "generate_s": float(np.mean(generate_s)),
+        "cost": float(np.mean(prompt_tokens) * price_prompt + np.mean(completion_tokens) * price_completion) / 1000,
+    }
+
+
+def run_sweep(df: pd.DataFrame, workdir: str, chunk_sizes, overlaps, n_results_values, n_holdout: int = 100,
+              n_recall: int = 100, backend: str = "numpy", model_name: str = "llama3.2", price_prompt: float = 0.0,
+              price_completion: float = 0.0, cache_path: str = None) -> list:
+    """
+    Évalue toutes les combinaisons (chunk_size, overlap, n_results).
+
+    Returns:
+        list: Une ligne (dict) par configuration, voir evaluate_config.
+    """
+    train_df, holdout = split_holdout(df, n_holdout)
+    recall_queries = train_df[train_df["title"].astype(str).str.strip() != ""]
+    recall_queries = recall_queries.sample(n=min(n_recall, len(recall_queries)), random_state=0)
+    print(f"[INFO] {len(train_df)} articles indexés, {len(holdout)} tenus à l'écart, {len(recall_queries)} requêtes titre")
+    cache = EmbeddingCache(cache_path) if cache_path else None
+
+    rows = []
+    for chunk_size, overlap in itertools.product(chunk_sizes, overlaps):
+        if overlap >= chunk_size:
+            continue
+        store_dir = build_index(train_df, workdir, chunk_size, overlap, backend, cache)
+        pipeline = RAGPipeline(os.path.join(workdir, "db"), f"eval_{chunk_size}_{overlap}", backend=backend,
+                               store_path=store_dir, cache_path=cache_path, telemetry=PipelineTelemetry())
+        for n_results in n_results_values:
+            row = {"chunk_size": chunk_size, "overlap": overlap, **evaluate_config(
+                pipeline, holdout, recall_queries, n_results, model_name, price_prompt, price_completion
+            )}
+            rows.append(row)
+            print_table([row], header=len(rows) == 1)
+    return rows
+
+
+def print_table(rows: list, header: bool = True) -> None:
+    if header:
+        print("".join(title.rjust(width) for _, title, width, _ in TABLE_COLUMNS))
+    for row in rows:
+        print("".join(format(row[key], spec).rjust(width) for key, _, width, spec in TABLE_COLUMNS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/processed/cleaned_df_all.csv", help="Jeu nettoyé et annoté.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Corpus synthétique de N articles (ignore --data).")
+    parser.add_argument("--fake-ollama", action="store_true", help="Utilise le faux serveur Ollama (hors ligne).")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[300])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[30])
+    parser.add_argument("--n-results", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--holdout", type=int, default=100, help="Nombre d'articles tenus à l'écart (verdicts).")
+    parser.add_argument("--recall-queries", type=int, default=100, help="Nombre de requêtes titre (rappel@k).")
+    parser.add_argument("--backend", default="numpy", choices=RAGAnalyzer.BACKENDS)
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--price-prompt", type=float, default=0.0, help="Prix pour 1000 tokens de prompt.")
+    parser.add_argument("--price-completion", type=float, default=0.0, help="Prix pour 1000 tokens générés.")
+    parser.add_argument("--embedding-cache", default=None, help="Cache SQLite des embeddings (réutilisé entre configurations).")
+    parser.add_argument("--output", default=None, help="Fichier JSON des résultats.")
+    args = parser.parse_args()
+
+    df = synthetic_corpus(args.synthetic) if args.synthetic else pd.read_csv(args.data)
+    df = df.dropna(subset=["text", "label"]).reset_index(drop=True)
+
+    def sweep(workdir):
+        return run_sweep(df, workdir, args.chunk_sizes, args.overlaps, args.n_results, n_holdout=args.holdout,
+                         n_recall=args.recall_queries, backend=args.backend, model_name=args.model,
+                         price_prompt=args.price_prompt, price_completion=args.price_completion,
+                         cache_path=args.embedding_cache)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.fake_ollama:
+            with FakeOllamaServer(dim=384) as server, use_ollama_host(server.host):
+                rows = sweep(workdir)
+        else:
+            rows = sweep(workdir)
+
+    print("\n=== Récapitulatif ===")
+    print_table(rows)
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": rows}, f, indent=2)
+        print(f"[INFO] Résultats écrits dans '{args.output}'")
@@ -0,0 +1,186 @@
+"""
+Faux serveur Ollama (HTTP local) pour les tests de charge et les benchmarks hors ligne.
+
+Implémente les routes utilisées par le projet (/api/embed, /api/embeddings, /api/generate,
+/api/tags) avec une latence simulée, et mesure le nombre de requêtes simultanées par route.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+DEFAULT_RESPONSE = "Verdict: TRUE\nReason: The retrieved context supports the article."
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """Vecteur déterministe (non normalisé) dérivé du hash du texte."""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=dim).round(6).tolist()
+
+
+class FakeOllamaServer:
+    """
+    Serveur Ollama factice, démarré dans un thread.
+
+    Usage :
+        with FakeOllamaServer(generate_latency=0.05) as server:
+            client = ollama.AsyncClient(host=server.host)
+    """
+
+    def __init__(self, dim: int = 8, embed_latency: float = 0.0, generate_latency: float = 0.0,
+                 response: str = DEFAULT_RESPONSE, token_latency: float = 0.0, fail_requests: int = 0):
+        """
+        Args:
+            dim (int): Dimension des embeddings renvoyés.
+            embed_latency (float): Latence simulée (s) par requête d'embedding.
+            generate_latency (float): Latence simulée (s) par génération (avant le premier token).
+            response (str): Texte généré (découpé en tokens sur les espaces en mode stream).
+            token_latency (float): Latence simulée (s) entre deux tokens en mode stream.
+            fail_requests (int): Nombre de premières requêtes d'embedding en erreur 500 (pannes transitoires).
+        """
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.response = response
+        self.token_latency = token_latency
+        self.fail_requests = fail_requests
+        self.stats = {route: {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+                      for route in ("embed", "embeddings", "generate")}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _enter(self, route: str):
+        with self._lock:
+            stats = self.stats[route]
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def _should_fail(self, route: str) -> bool:
+        with self._lock:
+            if route in ("embed", "embeddings") and self.fail_requests > 0:
+                self.fail_requests -= 1
+                return True
+            return False
+
+    def _exit(self, route: str):
+        with self._lock:
+            self.stats[route]["in_flight"] -= 1
+
+    # -----------------------------
+    # Réponses par route
+    # -----------------------------
+    def embed(self, body: dict) -> dict:
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(self.embed_latency)
+        return {"model": body.get("model", ""), "embeddings": [fake_embedding(t, self.dim) for t in texts]}
+
+    def embeddings(self, body: dict) -> dict:
+        time.sleep(self.embed_latency)
+        return {"embedding": fake_embedding(body.get("prompt", ""), self.dim)}
+
+    def generate_chunks(self, body: dict):
+        """Réponses successives d'une génération (une seule si stream=False)."""
+        time.sleep(self.generate_latency)
+        prompt_tokens = len(body.get("prompt", "").split())
+        tokens = self.response.split(" ")
+        final = {
+            "model": body.get("model", ""), "created_at": "2024-01-01T00:00:00Z", "done": True,
+            "done_reason": "stop", "prompt_eval_count": prompt_tokens, "prompt_eval_duration": 1_000_000,
+            "eval_count": len(tokens), "eval_duration": max(int(self.token_latency * 1e9) * len(tokens), 1_000_000),
+            "total_duration": int((self.generate_latency + self.token_latency * len(tokens)) * 1e9),
+        }
+        if not body.get("stream", True):
+            time.sleep(self.token_latency * len(tokens))
+            yield {**final, "response": self.response}
+            return
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            text = token if i == len(tokens) - 1 else token + " "
+            yield {"model": final["model"], "created_at": final["created_at"], "response": text, "done": False}
+        yield {**final, "response": ""}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, Nagle + ACK retardé
+            # ajouteraient ~40 ms à chaque requête et fausseraient les mesures
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "fake", "model": "fake"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                route = self.path.rsplit("/", 1)[-1]
+                if route not in server.stats:
+                    self.send_error(404)
+                    return
+                server._enter(route)
+                try:
+                    if server._should_fail(route):
+                        self.send_error(500, "panne simulée")
+                    elif route == "embed":
+                        self._send_json(server.embed(body))
+                    elif route == "embeddings":
+                        self._send_json(server.embeddings(body))
+                    elif not body.get("stream", True):
+                        self._send_json(next(server.generate_chunks(body)))
+                    else:
+                        # Réponse NDJSON découpée (chunked), comme le vrai serveur
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-ndjson")
+                        self.send_header("Transfer-Encoding", "chunked")
+                        self.end_headers()
+                        for chunk in server.generate_chunks(body):
+                            line = json.dumps(chunk).encode("utf-8") + b"\n"
+                            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                            self.wfile.flush()
+                        self.wfile.write(b"0\r\n\r\n")
+                finally:
+                    server._exit(route)
+
+        return Handler
@@ -1,3 +1,4 @@
+import logging
 from src.rag_pipeline import RAGPipeline
 from src.storage_chroma import ChromaStorage
 from datetime import datetime
@@ -25,6 +26,7 @@ def ask_user_article():
 
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
     print("=== Système RAG Fake News ===")
 
     # Initialisation du pipeline RAG
@@ -45,9 +47,9 @@ def main():
 
     # Étape 2 : Analyse via le pipeline RAG
     print("\n[INFO] Lancement de l'analyse RAG...")
-    result = rag.analyze_article(article_text, model_name=GENERATION_MODEL, n_results=3)
+    response, docs, metas = rag.analyze_article(article_text, model_name=GENERATION_MODEL, n_results=3)
     print("\n====== RÉPONSE DU MODÈLE ======")
-    print(result.strip())
+    print(response.strip())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import ollama
+from typing import Dict, List, Tuple
+from src.embedding import OllamaEmbedder
+from src.retrieval import RAGAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRAGAnalyzer:
+    """
+    Variante asyncio de RAGAnalyzer : un seul processus peut traiter de nombreuses
+    analyses en parallèle.
+
+    - vectorisation et génération passent par le client asynchrone d'Ollama ;
+    - la recherche (Chroma ou index NumPy, bloquante) est exécutée dans un thread ;
+    - chaque backend a sa propre limite de concurrence (sémaphores), pour ne pas
+      saturer le serveur d'embedding ni le modèle de génération.
+
+    Le contexte et le prompt sont construits par le RAGAnalyzer synchrone sous-jacent.
+    """
+
+    def __init__(self, chroma_path="data/vector_db",
+                 collection_name="news_articles",
+                 embedding_model="all-minilm",
+                 cache_path=None,
+                 backend="chroma",
+                 store_path="data/processed/embedded_chunks_normalized",
+                 host: str = None,
+                 embed_concurrency: int = 8,
+                 generate_concurrency: int = 2,
+                 retrieval_concurrency: int = 4,
+                 embedder: OllamaEmbedder = None,
+                 bm25_path: str = None):
+        """
+        Args:
+            host (str): URL du serveur Ollama (par défaut : OLLAMA_HOST ou localhost).
+            embed_concurrency (int): Nombre maximal de requêtes d'embedding simultanées.
+            generate_concurrency (int): Nombre maximal de générations simultanées.
+            retrieval_concurrency (int): Nombre maximal de recherches simultanées (threads).
+            Les autres arguments sont ceux de RAGAnalyzer.
+        """
+        self.analyzer = RAGAnalyzer(chroma_path, collection_name, embedding_model, cache_path=cache_path,
+                                    backend=backend, store_path=store_path, embedder=embedder,
+                                    bm25_path=bm25_path)
+        self.embedder = self.analyzer.embedder
+        self.client = ollama.AsyncClient(host=host)
+        self.embed_limit = asyncio.Semaphore(embed_concurrency)
+        self.generate_limit = asyncio.Semaphore(generate_concurrency)
+        self.retrieval_limit = asyncio.Semaphore(retrieval_concurrency)
+
+    async def vectorize_query(self, text: str) -> list:
+        """
+        Vectorise et normalise le texte utilisateur (sans chunking), en passant par le cache
+        d'embeddings s'il est configuré.
+        """
+        if not text.strip():
+            raise ValueError("Texte utilisateur vide")
+        if self.embedder.in_process:
+            # Embedder local (ONNX) : inférence dans un thread, cache géré par embed_texts
+            async with self.embed_limit:
+                return await asyncio.to_thread(self.analyzer.vectorize_query, text)
+        cache = self.embedder.cache
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get_many, self.embedder.cache_key, [text])
+            if cached:
+                return cached[0]
+        async with self.embed_limit:
+            response = await self.client.embed(model=self.embedder.model_name, input=[text])
+        vector = self.embedder.normalize_vector(response.embeddings[0])
+        if cache is not None:
+            await asyncio.to_thread(cache.put_many, self.embedder.cache_key, [text], [vector])
+        return vector
+
+    async def retrieve_similar_docs(self, query_vector, n_results=5, query_text=None,
+                                    **filters) -> Tuple[List[str], List[Dict]]:
+        """Recherche non bloquante (voir RAGAnalyzer.retrieve_similar_docs pour les filtres et query_text)."""
+        async with self.retrieval_limit:
+            return await asyncio.to_thread(self.analyzer.retrieve_similar_docs, query_vector,
+                                           n_results, query_text=query_text, **filters)
+
+    def build_context(self, docs, metas) -> str:
+        return self.analyzer.build_context(docs, metas)
+
+    def build_prompt(self, user_text: str, context: str) -> str:
+        return self.analyzer.build_prompt(user_text, context)
+
+    async def generate_response(self, prompt: str, model_name="llama3.2") -> str:
+        """Envoie le prompt au modèle Ollama sans bloquer la boucle d'événements."""
+        async with self.generate_limit:
+            response = await self.client.generate(model=model_name, prompt=prompt, stream=False)
+        return response.response
+
+
+class AsyncRAGPipeline:
+    """
+    Variante asyncio de RAGPipeline : plusieurs analyses peuvent être en cours
+    simultanément (ex. plusieurs utilisateurs servis par le même processus).
+    """
+
+    def __init__(self, chroma_path: str, collection_name: str, embedding_model: str = "all-minilm", **kwargs):
+        """
+        Args:
+            chroma_path (str): Chemin de la base vectorielle ChromaDB.
+            collection_name (str): Nom de la collection à interroger.
+            embedding_model (str): Nom du modèle d'embedding.
+            kwargs: Options de AsyncRAGAnalyzer (backend, host, limites de concurrence...).
+        """
+        logger.info("Initialisation du pipeline RAG asynchrone avec modèle '%s'...", embedding_model)
+        self.retriever = AsyncRAGAnalyzer(chroma_path, collection_name, embedding_model, **kwargs)
+
+    async def analyze_article(self, text: str, model_name: str = "llama3.2", n_results: int = 5,
+                              **filters) -> Tuple[str, List[str], List[Dict]]:
+        """
+        Même contrat que RAGPipeline.analyze_article, sans bloquer la boucle d'événements.
+
+        Args:
+            filters: Filtres de métadonnées (label, subject, date_from, date_to).
+        """
+        query_vector = await self.retriever.vectorize_query(text)
+        docs, metas = await self.retriever.retrieve_similar_docs(query_vector, n_results=n_results,
+                                                             query_text=text, **filters)
+        prompt = self.retriever.build_prompt(text, self.retriever.build_context(docs, metas))
+        response = await self.retriever.generate_response(prompt, model_name)
+        return response, docs, metas
+
+    async def analyze_articles(self, texts: List[str], model_name: str = "llama3.2", n_results: int = 5,
+                               **filters) -> List[Tuple[str, List[str], List[Dict]]]:
+        """Analyse concurrente de plusieurs articles (résultats dans l'ordre de `texts`)."""
+        return await asyncio.gather(*(self.analyze_article(t, model_name, n_results, **filters) for t in texts))
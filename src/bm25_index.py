@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import time
+import numpy as np
+from typing import Iterable, List, Sequence, Tuple
+
+# Mots (lettres, chiffres) : les noms propres et les nombres sont conservés tels quels
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class BM25Index:
+    """
+    Index lexical BM25 (index inversé) sur le texte des chunks d'un EmbeddingStore.
+
+    Stockage sous forme de tableaux NumPy projetés en mémoire (aucun chargement complet) :
+    - terms.npy : vocabulaire trié (octets UTF-8, longueur fixe), recherche dichotomique ;
+    - idf.npy : idf de chaque terme ;
+    - indptr.npy, rows.npy, weights.npy : listes de postings au format CSR. Le poids BM25
+      de chaque (terme, chunk) est précalculé, le score d'une requête est donc une somme
+      de poids sur les postings de ses termes.
+
+    La ligne i de l'index correspond à la ligne i du store (même ordre que NumpySearchIndex) ;
+    chunk_ids.npy contient l'id Chroma de chaque ligne (voir ChromaStorage.make_chunk_ids).
+    """
+
+    FILES = ("terms", "idf", "indptr", "rows", "weights", "chunk_ids")
+
+    def __init__(self, path: str, max_query_terms: int = 64):
+        """
+        Args:
+            path (str): Répertoire de l'index (voir build).
+            max_query_terms (int): Nombre maximal de termes d'une requête pris en compte : les
+                plus discriminants (idf le plus élevé). Un article entier soumis comme requête
+                reste ainsi rapide, les mots très fréquents n'apportant presque rien au score.
+        """
+        self.path = path
+        self.max_query_terms = max_query_terms
+        with open(os.path.join(path, "params.json"), encoding="utf-8") as f:
+            self.params = json.load(f)
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        print(f"[INFO] Index BM25 prêt : {self.params['n_docs']} chunks, {len(self.terms)} termes ({path})")
+
+    def __len__(self) -> int:
+        return self.params["n_docs"]
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+    @classmethod
+    def build(cls, texts: Iterable[str], path: str, chunk_ids: Sequence[str] = None, k1: float = 1.2,
+              b: float = 0.75, max_term_bytes: int = 32, batch_size: int = 20000) -> "BM25Index":
+        """
+        Construit l'index à partir du texte des chunks (dans l'ordre des lignes du store) et l'écrit dans `path`.
+
+        Args:
+            texts: Texte de chaque chunk.
+            chunk_ids: Id Chroma de chaque chunk (optionnel, pour le backend Chroma).
+            k1 (float), b (float): Paramètres BM25 (saturation du tf, normalisation par la longueur).
+            max_term_bytes (int): Longueur maximale d'un terme (au-delà, il est tronqué).
+            batch_size (int): Chunks traités par lot lors du comptage des fréquences.
+        """
+        t0 = time.perf_counter()
+        vocab = {}
+        term_parts, row_parts, tf_parts, lengths = [], [], [], []
+        batch_terms, batch_rows = [], []
+
+        def flush():
+            # Fréquence de chaque (terme, chunk) du lot
+            if not batch_terms:
+                return
+            keys = np.asarray(batch_terms, dtype=np.int64) << 32 | np.asarray(batch_rows, dtype=np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            term_parts.append((keys >> 32).astype(np.int32))
+            row_parts.append((keys & 0xFFFFFFFF).astype(np.int32))
+            tf_parts.append(counts.astype(np.float32))
+            batch_terms.clear()
+            batch_rows.clear()
+
+        for row, text in enumerate(texts):
+            tokens = [t.encode("utf-8")[:max_term_bytes] for t in tokenize(text)]
+            lengths.append(len(tokens))
+            batch_terms.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+            batch_rows.extend([row] * len(tokens))
+            if (row + 1) % batch_size == 0:
+                flush()
+        flush()
+
+        n_docs = len(lengths)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if n_docs and lengths.mean() > 0 else 1.0
+        term_ids = np.concatenate(term_parts) if term_parts else np.empty(0, dtype=np.int32)
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32)
+        tf = np.concatenate(tf_parts) if tf_parts else np.empty(0, dtype=np.float32)
+
+        # Vocabulaire trié : l'identifiant d'un terme devient sa position dans terms.npy
+        words = list(vocab)
+        order = np.argsort(np.array(words, dtype=object)) if words else np.empty(0, dtype=np.int64)
+        rank = np.empty(len(words), dtype=np.int32)
+        rank[order] = np.arange(len(words), dtype=np.int32)
+        term_ids = rank[term_ids] if len(term_ids) else term_ids
+        terms = np.array([words[i] for i in order], dtype=f"S{max_term_bytes}")
+
+        df = np.bincount(term_ids, minlength=len(terms)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1.0 - b + b * lengths[rows] / avgdl) if len(rows) else np.empty(0, dtype=np.float32)
+        weights = (idf[term_ids] * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+        by_term = np.lexsort((rows, term_ids))
+        arrays = {
+            "terms": terms,
+            "idf": idf,
+            "indptr": np.concatenate([[0], np.cumsum(df.astype(np.int64))]),
+            "rows": rows[by_term],
+            "weights": weights[by_term],
+            "chunk_ids": np.array(list(chunk_ids) if chunk_ids is not None else [], dtype=bytes),
+        }
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        with open(os.path.join(path, "params.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_docs": n_docs, "avgdl": avgdl, "k1": k1, "b": b, "max_term_bytes": max_term_bytes}, f, indent=2)
+        print(f"[SAVE] Index BM25 : {n_docs} chunks, {len(terms)} termes, {len(rows)} postings "
+              f"en {time.perf_counter() - t0:.1f}s → {path}")
+        return cls(path)
+
+    # -----------------------------
+    # Recherche
+    # -----------------------------
+    def query_terms(self, text: str) -> np.ndarray:
+        """Identifiants des termes de la requête présents dans l'index (les max_query_terms plus discriminants)."""
+        max_bytes = self.params["max_term_bytes"]
+        words = np.array(sorted({t.encode("utf-8")[:max_bytes] for t in tokenize(text)}), dtype=f"S{max_bytes}")
+        if not len(words) or not len(self.terms):
+            return np.empty(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.terms, words), len(self.terms) - 1)
+        ids = pos[self.terms[pos] == words]
+        if len(ids) > self.max_query_terms:
+            ids = ids[np.argsort(-np.asarray(self.idf[ids]), kind="stable")[:self.max_query_terms]]
+        return ids
+
+    def search(self, text: str, k: int = 5, rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Les k chunks de meilleur score BM25 pour la requête `text`.
+
+        Args:
+            rows (np.ndarray): Lignes candidates triées (ex. MetadataIndex.rows), toutes si None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (lignes, scores), par score décroissant ; seuls les
+            chunks contenant au moins un terme de la requête sont renvoyés.
+        """
+        ids = self.query_terms(text)
+        if not len(ids) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        slices = [slice(self.indptr[i], self.indptr[i + 1]) for i in ids]
+        post_rows = np.concatenate([self.rows[s] for s in slices])
+        post_weights = np.concatenate([self.weights[s] for s in slices])
+        if rows is not None:
+            if not len(rows):
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            pos = np.minimum(np.searchsorted(rows, post_rows), len(rows) - 1)
+            keep = rows[pos] == post_rows
+            post_rows, post_weights = post_rows[keep], post_weights[keep]
+        if not len(post_rows):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Somme des poids par chunk : tableau dense si les postings couvrent une bonne part
+        # du corpus (pas de tri), regroupement des seuls chunks concernés sinon
+        if len(post_rows) > len(self) // 8:
+            dense = np.bincount(post_rows, weights=post_weights, minlength=len(self))
+            candidates = np.flatnonzero(dense)
+            scores = dense[candidates].astype(np.float32)
+        else:
+            candidates, inverse = np.unique(post_rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=post_weights).astype(np.float32)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top].astype(np.int64), scores[top]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence], k: int = 60) -> List[Tuple[object, float]]:
+    """
+    Fusion de classements par Reciprocal Rank Fusion : score(d) = somme des 1 / (k + rang),
+    rangs comptés à partir de 1 dans chaque classement où d apparaît.
+
+    Returns:
+        List[Tuple[object, float]]: (élément, score RRF), par score décroissant (à égalité,
+        ordre de première apparition).
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
@@ -1,27 +1,160 @@
 from src.preprocessing import CSVLoader, DataCleaner, DatasetMerger
 from src.embedding import OllamaEmbedder
 from src.storage_chroma import ChromaStorage
-import os
+from src.vector_store import EmbeddingStore
+from src.embedding_cache import EmbeddingCache
+from src.embedding_farm import EmbeddingFarm
+from src.streaming_build import StreamingVectorDBBuilder
+from src.chunking import TokenChunker, WordChunker, truncation_report
+from src.quantized_index import QuantizedSearchIndex
+from src.bm25_index import BM25Index
+import argparse
+
+TRUE_CSV = "/home/emese/Briefs/Fake_news_project/fake_news_rag/data/raw/True.csv/True.csv"
+FAKE_CSV = "/home/emese/Briefs/Fake_news_project/fake_news_rag/data/raw/Fake.csv/Fake.csv"
+
+
+def build_chunker(args):
+    """Découpage utilisé pour la construction de la base."""
+    if args.token_chunking:
+        # Chunks dimensionnés en tokens de la fenêtre du modèle (256 pour all-minilm)
+        return TokenChunker.for_model("all-minilm", tokenizer_path=args.tokenizer)
+    return WordChunker(chunk_size=300, overlap=30)
+
+
+def build_embedder(args):
+    """Embedder utilisé pour la construction de la base."""
+    chunker = build_chunker(args)
+    if args.embedder == "onnx":
+        # Inférence locale (ONNX Runtime) : mêmes vecteurs que all-minilm servi par Ollama
+        from src.onnx_embedding import OnnxEmbedder # Import tardif : ONNX Runtime seulement si utilisé
+        return OnnxEmbedder(
+            model_name="all-minilm",
+            chunk_size=300,
+            overlap=30,
+            batch_size=32,
+            cache=EmbeddingCache("data/cache/embeddings.sqlite"),
+            chunker=chunker,
+            model_path=args.onnx_model,
+            quantize=args.int8,
+        )
+    return OllamaEmbedder(
+        model_name="all-minilm",
+        chunk_size=300,
+        overlap=30,
+        batch_size=64,
+        max_workers=4,
+        cache=EmbeddingCache("data/cache/embeddings.sqlite"),
+        chunker=chunker,
+    )
+
+
+def report_word_chunk_truncation(chunker, df, sample_size=1000):
+    """Affiche la part de tokens que le modèle tronquait avec les chunks de 300 mots."""
+    sample = df.sample(n=min(sample_size, len(df)), random_state=0)
+    word_chunks = WordChunker(chunk_size=300, overlap=30).chunk_spans(sample["text"].tolist())[3]
+    report = truncation_report(chunker.tokenizer, word_chunks, chunker.chunk_size + 2)
+    print(
+        f"[INFO] Chunks de 300 mots ({len(sample)} articles échantillonnés) : "
+        f"{report['n_truncated_chunks']}/{report['n_chunks']} chunks tronqués, "
+        f"{report['truncated_tokens']}/{report['total_tokens']} tokens ignorés par le modèle "
+        f"({report['truncated_ratio']:.1%})."
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Construction de la base vectorielle Chroma.")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Mode flux : chargement, nettoyage, embedding et insertion par batchs (mémoire bornée).",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=2000, help="Nombre d'articles par batch en mode flux."
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=2, help="Batchs en attente maximum entre deux étapes (mode flux)."
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Mise à jour incrémentale : n'indexe que les articles nouveaux ou modifiés et supprime les articles retirés.",
+    )
+    parser.add_argument(
+        "--quantize",
+        choices=QuantizedSearchIndex.METHODS,
+        action="append",
+        default=[],
+        help="Construit aussi l'index compressé (int8 et/ou pq) à partir du store d'embeddings.",
+    )
+    parser.add_argument(
+        "--token-chunking",
+        action="store_true",
+        help="Découpe en tokens du modèle d'embedding au lieu de chunks de 300 mots.",
+    )
+    parser.add_argument(
+        "--embedder",
+        choices=("ollama", "onnx"),
+        default="ollama",
+        help="Vectorisation via le serveur Ollama, ou dans le processus avec ONNX Runtime.",
+    )
+    parser.add_argument(
+        "--onnx-model",
+        default=None,
+        help="Répertoire local du modèle ONNX (tokenizer.json + onnx/model*.onnx), sinon téléchargé depuis le Hub.",
+    )
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="Embedder ONNX : poids quantifiés int8 (plus rapide).",
+    )
+    parser.add_argument(
+        "--farm",
+        nargs="+",
+        metavar="ENDPOINT",
+        default=None,
+        help="Vectorisation répartie : URLs de serveurs Ollama et/ou 'onnx' (inférence locale).",
+    )
+    parser.add_argument(
+        "--farm-workers", type=int, default=2, help="Workers par endpoint de la ferme d'embedding."
+    )
+    parser.add_argument(
+        "--farm-processes",
+        action="store_true",
+        help="Workers de la ferme en processus séparés (recommandé avec l'endpoint 'onnx').",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=None,
+        help="Fichier tokenizer.json local (sinon téléchargé depuis le Hub Hugging Face).",
+    )
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.stream:
+        # --- MODE FLUX : CHARGEMENT -> NETTOYAGE -> CHUNKING -> EMBEDDING -> STOCKAGE ---
+        storage = ChromaStorage(persist_dir="data/vector_db", collection_name="articles")
+        builder = StreamingVectorDBBuilder(
+            build_embedder(args), storage, batch_size=args.batch_size, queue_size=args.queue_size
+        )
+        builder.run([(TRUE_CSV, 1), (FAKE_CSV, 0)])
+        print("\n [SUCCESS] Terminé !")
+        exit(0)
+
     # --- CHARGEMENT ---
     loader = CSVLoader()
-    df_true = loader.load_csv(
-        "/home/emese/Briefs/Fake_news_project/fake_news_rag/data/raw/True.csv/True.csv"
-    )
-    df_fake = loader.load_csv(
-        "/home/emese/Briefs/Fake_news_project/fake_news_rag/data/raw/Fake.csv/Fake.csv"
-    )
+    df_true = loader.load_csv(TRUE_CSV)
+    df_fake = loader.load_csv(FAKE_CSV)
 
     # --- NETTOYAGE ---
     cleaner_true = DataCleaner(df_true)
     cleaned_df_true = (
         cleaner_true.add_label(1)
         .drop_empty_rows_and_duplicated()
-        .remove_spaces()
-        .lower_case()
-        .date_format()
-        .clean_all_text_columns()
+        .clean_pipeline()  # = remove_spaces().lower_case().date_format().clean_all_text_columns()
         .get_df()
     )
     cleaner_true.save_csv("data/processed/cleaned_df_true.csv")
@@ -30,10 +163,7 @@ if __name__ == "__main__":
     cleaned_df_fake = (
         cleaner_fake.add_label(0)
         .drop_empty_rows_and_duplicated()
-        .remove_spaces()
-        .lower_case()
-        .date_format()
-        .clean_all_text_columns()
+        .clean_pipeline()  # = remove_spaces().lower_case().date_format().clean_all_text_columns()
         .get_df()
     )
     cleaner_fake.save_csv("data/processed/cleaned_df_fake.csv")
@@ -44,27 +174,64 @@ if __name__ == "__main__":
     combined_df.to_csv("data/processed/cleaned_df_all.csv", index=False)
     print(f"[INFO] Fusion terminée : {combined_df.shape[0]} articles combinés.")
 
+    if args.sync:
+        # --- MISE À JOUR INCRÉMENTALE (empreinte de chaque article vs manifeste) ---
+        storage = ChromaStorage(persist_dir="data/vector_db", collection_name="articles")
+        storage.sync_articles(combined_df, build_embedder(args))
+        print("\n [SUCCESS] Terminé !")
+        exit(0)
+
     # --- EMBEDDING ---
-    output_path = "data/processed/embedded_chunks_normalized.csv"
-    if not os.path.exists(output_path):
-        print("\n[INFO] Démarrage de la vectorisation avec Ollama...")
+    output_path = "data/processed/embedded_chunks_normalized"  # EmbeddingStore (embeddings.npy + metadata.parquet)
+    if not EmbeddingStore(output_path).exists():
+        print(f"\n[INFO] Démarrage de la vectorisation ({args.embedder})...")
         try:
-            embedder = OllamaEmbedder(
-                model_name="all-minilm", chunk_size=300, overlap=30
-            )
-            embedded_df = embedder.embed_dataframe(
-                combined_df, text_col="text", output_path=output_path
-            )
+            chunker = build_chunker(args)
+            if args.token_chunking:
+                report_word_chunk_truncation(chunker, combined_df)
+            if args.farm:
+                # Ferme d'embedding : shards répartis sur les endpoints, fusionnés dans un store unique
+                # (les workers chargent eux-mêmes leur modèle : pas d'embedder local à construire)
+                farm = EmbeddingFarm(
+                    args.farm,
+                    workers_per_endpoint=args.farm_workers,
+                    use_processes=args.farm_processes,
+                    cache=EmbeddingCache("data/cache/embeddings.sqlite"),
+                )
+                farm.embed_to_store(
+                    chunker.chunk_table(combined_df, "text"),
+                    output_path,
+                    work_dir="data/processed/embedding_farm",
+                )
+            else:
+                embedder = build_embedder(args)
+                embedded_df = embedder.embed_dataframe(
+                    combined_df,
+                    text_col="text",
+                    output_path=output_path,
+                    checkpoint_dir="data/processed/embedding_checkpoints",
+                )
         except Exception as e:
             print(f"[ERREUR] Échec de la vectorisation : {e}")
             exit(1)
     else:
         print(f"[INFO] Embeddings déjà existants : {output_path}")
 
+    # --- INDEX COMPRESSÉS (optionnels) ---
+    for method in args.quantize:
+        QuantizedSearchIndex(output_path, method=method)
+
     # --- CREATION & STOCKAGE ---
 
     storage = ChromaStorage(persist_dir="data/vector_db", collection_name="articles")
-    df_loaded = storage.load_embedded_data(csv_path=output_path)
-    storage.insert_into_chroma(df_loaded)
+    df_loaded, embeddings = storage.load_embedded_store(output_path)
+    storage.insert_into_chroma(df_loaded, embeddings=embeddings)
+
+    # --- INDEX LEXICAL BM25 (recherche hybride, lignes alignées sur le store) ---
+    BM25Index.build(
+        df_loaded["chunk"],
+        "data/processed/bm25_index",
+        chunk_ids=storage.make_chunk_ids(df_loaded),
+    )
 
     print("\n [SUCCESS] Terminé !")
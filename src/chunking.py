@@ -0,0 +1,291 @@
+import os
+import numpy as np
+import pandas as pd
+from tokenizers import Tokenizer
+from typing import List, Sequence, Tuple
+
+
+# Octets considérés comme blancs par str.split() (partie ASCII)
+ASCII_WHITESPACE = np.zeros(256, dtype=bool)
+ASCII_WHITESPACE[list(b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f")] = True
+
+
+class WordChunker:
+    """
+    Découpage des textes en chunks de mots avec chevauchement.
+
+    Les bornes des mots sont calculées une seule fois pour tout le corpus ; les bornes
+    des chunks (article, début, fin en nombre de mots) sont ensuite des tableaux NumPy,
+    et le texte d'un chunk est une simple tranche du texte d'origine.
+
+    Règles (identiques à l'ancien OllamaEmbedder.split_text) :
+    - fenêtres de `chunk_size` mots, qui avancent de `chunk_size - overlap` mots ;
+    - la dernière fenêtre est celle qui atteint la fin du texte ;
+    - les chunks de `min_words` mots ou moins sont ignorés.
+    """
+
+    META_COLUMNS = ("label", "subject", "date")
+    unit = "words"
+
+    def __init__(self, chunk_size: int = 200, overlap: int = 50, min_words: int = 10):
+        """
+        Args:
+            chunk_size (int): Taille des chunks (en mots).
+            overlap (int): Chevauchement entre chunks (en mots).
+            min_words (int): Un chunk doit contenir strictement plus de min_words mots.
+        """
+        if chunk_size - overlap <= 0:
+            raise ValueError(f"overlap ({overlap}) doit être strictement inférieur à chunk_size ({chunk_size}).")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.min_words = min_words
+
+    # -----------------------------
+    # Calcul vectorisé des bornes
+    # -----------------------------
+    def spans_from_lengths(self, n_words: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calcule les bornes des chunks à partir du nombre de mots de chaque document.
+
+        Args:
+            n_words (np.ndarray): Nombre de mots par document.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (position du document, début, fin)
+            de chaque chunk conservé, triés par document puis par début.
+        """
+        n_words = np.asarray(n_words, dtype=np.int64)
+        step = self.chunk_size - self.overlap
+        # Nombre de fenêtres : la i-ème commence à i*step, on s'arrête dès que start + chunk_size >= n
+        n_windows = np.where(
+            n_words > 0,
+            1 + np.maximum(0, -(-(n_words - self.chunk_size) // step)), # ceil((n - chunk_size) / step)
+            0,
+        )
+        doc = np.repeat(np.arange(len(n_words)), n_windows)
+        first = np.cumsum(n_windows) - n_windows # Position de la première fenêtre de chaque document
+        window = np.arange(len(doc)) - np.repeat(first, n_windows)
+        starts = window * step
+        ends = np.minimum(starts + self.chunk_size, n_words[doc])
+
+        keep = (ends - starts) > self.min_words
+        return doc[keep], starts[keep], ends[keep]
+
+    def chunk_spans(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        Découpe une liste de textes en chunks.
+
+        Returns:
+            (position du document, début, fin, texte) de chaque chunk. Le texte d'un chunk
+            est " ".join(mots[début:fin]), comme avec l'ancien split_text.
+        """
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        bounds = self._ascii_word_bounds(texts)
+        if bounds is None:
+            # Textes non ASCII : découpage en mots document par document
+            words = [t.split() for t in texts]
+            n_words = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(words))
+            doc, starts, ends = self.spans_from_lengths(n_words)
+            chunks = [" ".join(words[d][s:e]) for d, s, e in zip(doc.tolist(), starts.tolist(), ends.tolist())]
+            return doc, starts, ends, chunks
+
+        joined, word_starts, word_ends, n_words, other_blanks = bounds
+        doc, starts, ends = self.spans_from_lengths(n_words)
+
+        # Bornes en caractères de chaque chunk dans le texte concaténé
+        first_word = np.cumsum(n_words) - n_words
+        g_first = first_word[doc] + starts
+        g_last = first_word[doc] + ends - 1
+        char_start, char_end = word_starts[g_first], word_ends[g_last]
+
+        # Si les mots du chunk sont séparés par un seul espace, la tranche est déjà " ".join(mots)
+        letters = np.r_[0, np.cumsum(word_ends - word_starts)]
+        n_letters = letters[g_last + 1] - letters[g_first]
+        single_spaced = ((char_end - char_start) == n_letters + (ends - starts - 1)) & (
+            other_blanks[char_end] == other_blanks[char_start] # Aucun blanc autre que ' ' (tabulation, retour ligne...)
+        )
+
+        chunks = [
+            joined[a:b] if regular else " ".join(joined[a:b].split())
+            for a, b, regular in zip(char_start.tolist(), char_end.tolist(), single_spaced.tolist())
+        ]
+        return doc, starts, ends, chunks
+
+    @staticmethod
+    def _ascii_word_bounds(texts: List[str]):
+        """
+        Calcule en une passe NumPy les bornes de tous les mots du corpus.
+        Les textes sont concaténés (séparés par un retour à la ligne) puis analysés octet par octet.
+
+        Returns:
+            (texte concaténé, début et fin de chaque mot en caractères, nombre de mots par texte,
+            nombre cumulé de blancs autres que ' '), ou None si le corpus n'est pas entièrement ASCII.
+        """
+        joined = "\n".join(texts)
+        if not joined.isascii():
+            return None
+        buffer = np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+        is_space = ASCII_WHITESPACE[buffer]
+        other_blanks = np.r_[0, np.cumsum(is_space & (buffer != ord(" ")))]
+        padded = np.r_[True, is_space, True]
+        word_starts = np.flatnonzero(~padded[1:-1] & padded[:-2]) # Non-blanc précédé d'un blanc
+        word_ends = np.flatnonzero(~padded[1:-1] & padded[2:]) + 1 # Non-blanc suivi d'un blanc
+
+        text_starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+        word_doc = np.searchsorted(text_starts, word_starts, side="right") - 1
+        n_words = np.bincount(word_doc, minlength=len(texts)).astype(np.int64)
+        return joined, word_starts, word_ends, n_words, other_blanks
+
+    # -----------------------------
+    # Textes des chunks
+    # -----------------------------
+    def split_text(self, text: str) -> List[str]:
+        """Découpe un texte en plusieurs chunks avec chevauchement."""
+        return self.chunk_spans([text])[3]
+
+    def chunk_table(self, df: pd.DataFrame, text_col: str = "text") -> pd.DataFrame:
+        """
+        Construit la table des chunks (une ligne par chunk) de façon colonnaire :
+        index_article, chunk_index, chunk, label, subject, date.
+        """
+        doc, starts, ends, chunks = self.chunk_spans(df[text_col].tolist())
+
+        # Position du chunk dans son article (compteur qui repart à 0 pour chaque article)
+        is_first = np.r_[True, doc[1:] != doc[:-1]] if len(doc) else np.zeros(0, dtype=bool)
+        first_pos = np.maximum.accumulate(np.where(is_first, np.arange(len(doc)), 0)) if len(doc) else doc
+        chunk_index = np.arange(len(doc)) - first_pos
+
+        table = {
+            "index_article": df.index.to_numpy()[doc],
+            "chunk_index": chunk_index,
+            "chunk": chunks,
+        }
+        for col in self.META_COLUMNS:
+            table[col] = df[col].to_numpy()[doc] if col in df.columns else None # Si la colonne est absente : None
+        return pd.DataFrame(table)
+
+
+# Tokenizer Hugging Face correspondant à chaque modèle d'embedding Ollama,
+# et nombre maximal de tokens traités par le modèle (au-delà, le texte est tronqué)
+MODEL_TOKENIZERS = {
+    "all-minilm": ("sentence-transformers/all-MiniLM-L6-v2", 256),
+}
+
+
+def load_tokenizer(model_or_path: str):
+    """
+    Charge un tokenizer `tokenizers` depuis un fichier tokenizer.json local,
+    ou depuis le Hub Hugging Face pour un modèle de MODEL_TOKENIZERS.
+    """
+    if os.path.exists(model_or_path):
+        return Tokenizer.from_file(model_or_path)
+    hub_id = MODEL_TOKENIZERS.get(model_or_path, (model_or_path, None))[0]
+    return Tokenizer.from_pretrained(hub_id)
+
+
+class TokenChunker(WordChunker):
+    """
+    Découpage des textes en chunks dimensionnés en tokens du modèle d'embedding.
+
+    Les fenêtres font au plus `chunk_size` tokens (tokens spéciaux [CLS]/[SEP] non compris)
+    et se chevauchent de `overlap` tokens. Les coupures sont ramenées au début d'un mot
+    pour ne jamais couper un mot en deux (sauf mot plus long qu'une fenêtre).
+    Comme en mode mots, les chunks de `min_words` mots ou moins sont ignorés.
+    """
+
+    unit = "tokens"
+
+    def __init__(self, tokenizer: Tokenizer, chunk_size: int = 254, overlap: int = 25, min_words: int = 10):
+        """
+        Args:
+            tokenizer (tokenizers.Tokenizer): Tokenizer du modèle d'embedding.
+            chunk_size (int): Taille maximale des chunks (en tokens).
+            overlap (int): Chevauchement entre chunks (en tokens).
+            min_words (int): Un chunk doit contenir strictement plus de min_words mots.
+        """
+        super().__init__(chunk_size=chunk_size, overlap=overlap, min_words=min_words)
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def for_model(cls, model_name: str = "all-minilm", tokenizer_path: str = None, overlap: int = 25, min_words: int = 10):
+        """
+        Crée un TokenChunker dont la taille de chunk correspond à la fenêtre du modèle
+        (moins les 2 tokens spéciaux).
+        """
+        if model_name not in MODEL_TOKENIZERS:
+            raise ValueError(f"Modèle '{model_name}' inconnu, modèles disponibles : {list(MODEL_TOKENIZERS)}")
+        max_tokens = MODEL_TOKENIZERS[model_name][1]
+        tokenizer = load_tokenizer(tokenizer_path or model_name)
+        return cls(tokenizer, chunk_size=max_tokens - 2, overlap=overlap, min_words=min_words)
+
+    def _windows(self, word_ids: List[int]) -> List[Tuple[int, int]]:
+        """Fenêtres (début, fin) en tokens, alignées sur les débuts de mots."""
+        n = len(word_ids)
+        windows, start = [], 0
+        while start < n:
+            end = min(start + self.chunk_size, n)
+            if end < n:
+                # Recule la fin au début du mot coupé (sauf si le mot occupe toute la fenêtre)
+                cut = end
+                while cut > start and word_ids[cut] == word_ids[cut - 1]:
+                    cut -= 1
+                end = cut if cut > start else end
+            windows.append((start, end))
+            if end >= n:
+                break
+            next_start = max(end - self.overlap, start + 1)
+            while next_start > start + 1 and word_ids[next_start] == word_ids[next_start - 1]:
+                next_start -= 1 # Le chevauchement commence lui aussi au début d'un mot
+            start = next_start
+        return windows
+
+    def chunk_spans(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        Découpe une liste de textes en chunks de tokens.
+
+        Returns:
+            (position du document, début, fin, texte) de chaque chunk ; début et fin sont
+            des positions de tokens.
+        """
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        doc, starts, ends, chunks = [], [], [], []
+        for d, (text, enc) in enumerate(zip(texts, encodings)):
+            offsets = enc.offsets
+            for s, e in self._windows(enc.word_ids):
+                chunk = " ".join(text[offsets[s][0]:offsets[e - 1][1]].split())
+                if len(chunk.split()) > self.min_words:
+                    doc.append(d)
+                    starts.append(s)
+                    ends.append(e)
+                    chunks.append(chunk)
+        return (np.asarray(doc, dtype=np.int64), np.asarray(starts, dtype=np.int64),
+                np.asarray(ends, dtype=np.int64), chunks)
+
+
+def truncation_report(tokenizer, chunks: Sequence[str], max_tokens: int = 256) -> dict:
+    """
+    Mesure la part des tokens tronqués par le modèle d'embedding pour des chunks existants
+    (par exemple les chunks de 300 mots du mode WordChunker).
+
+    Args:
+        tokenizer (tokenizers.Tokenizer): Tokenizer du modèle.
+        chunks (Sequence[str]): Textes des chunks.
+        max_tokens (int): Fenêtre du modèle, tokens spéciaux compris.
+
+    Returns:
+        dict: nombre de chunks, chunks tronqués, tokens totaux et tokens tronqués.
+    """
+    lengths = np.fromiter(
+        (len(enc.ids) for enc in tokenizer.encode_batch(list(chunks), add_special_tokens=True)),
+        dtype=np.int64, count=len(chunks),
+    )
+    truncated = np.maximum(lengths - max_tokens, 0)
+    total = int(lengths.sum())
+    return {
+        "n_chunks": len(chunks),
+        "n_truncated_chunks": int((truncated > 0).sum()),
+        "total_tokens": total,
+        "truncated_tokens": int(truncated.sum()),
+        "truncated_ratio": float(truncated.sum() / total) if total else 0.0,
+    }
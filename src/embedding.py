@@ -3,8 +3,16 @@ from tqdm import tqdm
 from typing import List
 import numpy as np
 import ollama
+from src.vector_store import EmbeddingStore
+from src.embedding_cache import EmbeddingCache
+from src.chunking import WordChunker
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
 
 
 class OllamaEmbedder:
@@ -13,7 +21,10 @@ class OllamaEmbedder:
     via un modèle Ollama (par défaut 'all-minilm').
     """
 
-    def __init__(self, model_name: str = "all-minilm", chunk_size: int = 200, overlap: int = 50, batch_size: int = 8):
+    in_process = False # Vectorisation dans le processus (True) ou via le serveur Ollama (False)
+
+    def __init__(self, model_name: str = "all-minilm", chunk_size: int = 200, overlap: int = 50, batch_size: int = 8, max_workers: int = 4,
+                 cache: EmbeddingCache = None, chunker: WordChunker = None):
         """
         Initialise l'embedder Ollama.
 
@@ -21,35 +32,35 @@ class OllamaEmbedder:
             model_name (str): Nom du modèle d'embedding disponible via Ollama.
             chunk_size (int): Taille des chunks pour découper les textes longs (en mots).
             overlap (int): Chevauchement entre chunks (en mots).
-            batch_size (int): Nombre de textes traités en parallèle.
+            batch_size (int): Nombre de textes envoyés dans une seule requête d'embedding
+                (1 = une requête par texte via l'ancienne API `ollama.embeddings`).
+            max_workers (int): Nombre de requêtes (batchs) envoyées en parallèle.
+            cache (EmbeddingCache): Cache persistant des embeddings (optionnel). Seuls les
+                textes absents du cache sont envoyés à Ollama.
+            chunker (WordChunker): Stratégie de découpage (optionnelle), par exemple un
+                TokenChunker dimensionné en tokens du modèle. Par défaut : chunks de
+                chunk_size mots avec overlap mots.
         """
         self.model_name = model_name
+        # Clé des vecteurs dans le cache et les checkpoints : distingue les backends qui
+        # servent le même modèle avec des vecteurs différents (voir OnnxEmbedder)
+        self.cache_key = model_name
         self.chunk_size = chunk_size
         self.overlap = overlap
-        self.batch_size = batch_size
-        print(f"[INIT] OllamaEmbedder initialisé avec modèle='{model_name}', chunk_size={chunk_size}, overlap={overlap}")
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        if chunker is not None:
+            self.chunk_size, self.overlap = chunker.chunk_size, chunker.overlap
+        self.chunker = chunker or WordChunker(chunk_size=chunk_size, overlap=overlap)
+        print(f"[INIT] {type(self).__name__} initialisé avec modèle='{model_name}', chunk_size={self.chunk_size}, overlap={self.overlap} ({self.chunker.unit}), batch_size={self.batch_size}, max_workers={self.max_workers}")
 
     # -----------------------------
     #  Découpage du texte en chunks
     # -----------------------------
     def split_text(self, text: str) -> List[str]:
-        """Découpe un texte en plusieurs chunks avec chevauchement."""
-        if not isinstance(text, str) or not text.strip(): # Vérifie que le texte est une chaine non vide
-            return []
-
-        words = text.split() # Transforme le texte en liste de mots
-        chunks, start = [], 0 
-
-        while start < len(words):
-            end = start + self.chunk_size
-            chunk = " ".join(words[start:end])
-            if len(chunk.split()) > 10: # Ignore les segments de moins de 10 mots
-                chunks.append(chunk)
-            if end >= len(words): # Fin de la boucle si on arrive à la fin du texte à chunker
-                break
-            start += self.chunk_size - self.overlap  # Pointeur start avance en prenant en compte l'overlap
-
-        return chunks
+        """Découpe un texte en plusieurs chunks avec chevauchement (voir WordChunker)."""
+        return self.chunker.split_text(text)
 
     # -----------------------------
     # Fonction utilitaire : normalisation L2
@@ -61,69 +72,201 @@ class OllamaEmbedder:
         return (arr / norm).tolist() if norm > 0 else arr.tolist()
 
     # -----------------------------
-    # Vectorisation avec parallélisation
+    # Vectorisation d'un batch de textes
+    # -----------------------------
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Vectorise un batch de textes en une seule requête et retourne les vecteurs
+        normalisés dans le même ordre que les textes d'entrée.
+        """
+        if len(texts) == 1 and self.batch_size == 1:
+            # Mode historique : une requête HTTP par texte
+            response = ollama.embeddings(model=self.model_name, prompt=texts[0])
+            return [self.normalize_vector(response.embedding)]
+
+        response = ollama.embed(model=self.model_name, input=list(texts)) # API "embed" : accepte une liste de textes
+        vectors = response.embeddings
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"Ollama a renvoyé {len(vectors)} embeddings pour {len(texts)} textes.")
+        return [self.normalize_vector(vec) for vec in vectors]
+
+    # -----------------------------
+    # Vectorisation par batchs avec parallélisation
     # -----------------------------
-    def embed_texts(self, texts: List[str], max_workers: int = 4) -> List[List[float]]:
-        """Crée des embeddings normalisés pour une liste de textes (en parallèle)."""
-
-        def embed_one(text):
-            """
-            Appelle l'embedder et retourne le vecteur normalisé
-            """
-            response = ollama.embeddings(model=self.model_name, prompt=text)
-            return self.normalize_vector(response.embedding)
-
-        embeddings = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor: # permet d'executer plusieurs vectorisation (embed_one) en parallèle
-            futures = {executor.submit(embed_one, text): text for text in texts} # Crée un dict (clé = tâche (objet Future), valeur = texte correpsondant)
-            # executor.submit() lance la fonction embed_one dans un thread parallèle
-            for f in tqdm(as_completed(futures), total=len(futures), desc="Vectorisation parallèle"): 
-                embeddings.append(f.result()) # f.result() = vecteur normalisé renvoyé par la méthode embed_one()
+    def embed_texts(self, texts: List[str], max_workers: int = None, batch_size: int = None) -> List[List[float]]:
+        """
+        Crée des embeddings normalisés pour une liste de textes.
+
+        Les textes sont regroupés en batchs de `batch_size` (une requête par batch),
+        et jusqu'à `max_workers` batchs sont envoyés en parallèle.
+        L'ordre des vecteurs retournés correspond toujours à l'ordre des textes.
+        Si un cache est configuré, seuls les textes absents du cache (dédoublonnés) sont vectorisés.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_uncached(texts, max_workers, batch_size)
+
+        embeddings = [None] * len(texts)
+        cached = self.cache.get_many(self.cache_key, texts)
+        for i, vec in cached.items():
+            embeddings[i] = vec
+
+        # Textes manquants : chaque texte distinct n'est vectorisé qu'une fois
+        missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+        if missing:
+            vectors = self._embed_uncached(missing, max_workers, batch_size)
+            self.cache.put_many(self.cache_key, missing, vectors)
+            by_text = dict(zip(missing, vectors))
+            embeddings = [e if e is not None else by_text[t] for t, e in zip(texts, embeddings)]
+
+        logger.debug(
+            "[CACHE] %d/%d embeddings servis par le cache (hit rate global : %.1f%%)",
+            len(cached), len(texts), 100 * self.cache.stats()["hit_rate"],
+        )
+        return embeddings
+
+    def _embed_uncached(self, texts: List[str], max_workers: int = None, batch_size: int = None) -> List[List[float]]:
+        """Vectorise les textes via Ollama, par batchs parallèles, en conservant l'ordre."""
+        max_workers = max_workers or self.max_workers
+        batch_size = batch_size or self.batch_size
+
+        embeddings = [None] * len(texts) # Pré-allocation : chaque batch écrit à sa position d'origine
+        with ThreadPoolExecutor(max_workers=max_workers) as executor: # permet d'envoyer plusieurs batchs en parallèle
+            futures = {
+                executor.submit(self._embed_batch, texts[start:start + batch_size]): start # clé = tâche, valeur = position du batch
+                for start in range(0, len(texts), batch_size)
+            }
+            with tqdm(total=len(texts), desc="Vectorisation par batchs") as progress:
+                for f in as_completed(futures):
+                    start = futures[f]
+                    vectors = f.result()
+                    embeddings[start:start + len(vectors)] = vectors
+                    progress.update(len(vectors))
 
         return embeddings
 
     # -----------------------------
-    # Application à un DataFrame complet
+    # Vectorisation reprenable par shards (checkpoints)
     # -----------------------------
-    def embed_dataframe(self, df: pd.DataFrame, text_col: str = "text", output_path: str = None) -> pd.DataFrame:
+    def embed_with_checkpoints(self, chunks_df: pd.DataFrame, checkpoint_dir: str, shard_size: int = 5000) -> List[List[float]]:
         """
-        Applique le chunking + embedding à un DataFrame entier.
-        Sauvegarde partielle automatique si output_path est précisé.
+        Vectorise les chunks par shards en sauvegardant chaque shard terminé sur disque.
+
+        Le fichier `progress.json` du répertoire liste les shards écrits. Au redémarrage,
+        les couples (index_article, chunk_index) déjà présents dans les shards sont ignorés :
+        seuls les chunks manquants sont envoyés à Ollama.
+
+        Args:
+            chunks_df (pd.DataFrame): Table des chunks (colonnes index_article, chunk_index, chunk).
+            checkpoint_dir (str): Répertoire des shards et du fichier de progression.
+            shard_size (int): Nombre de chunks par shard.
+
+        Returns:
+            List[List[float]]: Les embeddings, dans l'ordre des lignes de chunks_df.
+        """
+        keys = ["index_article", "chunk_index"]
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        progress_path = os.path.join(checkpoint_dir, "progress.json")
+        params = {"model_name": self.cache_key, "chunk_size": self.chunk_size, "overlap": self.overlap,
+                  "chunk_unit": self.chunker.unit}
+
+        # Lecture de la progression existante
+        if os.path.exists(progress_path):
+            with open(progress_path, encoding="utf-8") as f:
+                progress = json.load(f)
+            if progress["params"] != params:
+                raise ValueError(
+                    f"Checkpoint '{checkpoint_dir}' créé avec d'autres paramètres ({progress['params']}), "
+                    f"incompatible avec {params}."
+                )
+        else:
+            progress = {"params": params, "shards": []}
+
+        shards = [pd.read_pickle(os.path.join(checkpoint_dir, s["file"])) for s in progress["shards"]]
+        done = pd.concat(shards, ignore_index=True) if shards else pd.DataFrame(
+            {**{k: pd.Series(dtype=chunks_df[k].dtype) for k in keys}, "embedding": pd.Series(dtype=object)}
+        )
+
+        # Chunks restant à vectoriser
+        remaining = chunks_df[keys + ["chunk"]].merge(done[keys], on=keys, how="left", indicator=True)
+        remaining = remaining[remaining["_merge"] == "left_only"]
+        print(f"[CHECKPOINT] {len(done)} chunks déjà vectorisés, {len(remaining)} restants ({checkpoint_dir})")
+
+        for start in range(0, len(remaining), shard_size):
+            shard = remaining.iloc[start:start + shard_size]
+            t0 = time.perf_counter()
+            vectors = self.embed_texts(shard["chunk"].tolist())
+            elapsed = time.perf_counter() - t0
+
+            shard_df = shard[keys].reset_index(drop=True)
+            shard_df["embedding"] = vectors
+            shard_file = f"shard_{len(progress['shards']):05d}.pkl"
+            shard_path = os.path.join(checkpoint_dir, shard_file)
+            shard_df.to_pickle(shard_path + ".tmp")
+            os.replace(shard_path + ".tmp", shard_path) # Écriture atomique : pas de shard à moitié écrit
+
+            rate = len(shard_df) / elapsed if elapsed > 0 else float("inf")
+            progress["shards"].append({"file": shard_file, "n_chunks": len(shard_df), "chunks_per_s": round(rate, 2)})
+            with open(progress_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(progress, f, indent=2)
+            os.replace(progress_path + ".tmp", progress_path)
+            shards.append(shard_df)
+            print(f"[CHECKPOINT] {shard_file} : {len(shard_df)} chunks en {elapsed:.1f}s ({rate:.1f} chunks/s)")
+
+        # Réassemblage dans l'ordre de chunks_df
+        done = pd.concat(shards, ignore_index=True) if shards else done
+        merged = chunks_df[keys].merge(done.drop_duplicates(subset=keys, keep="last"), on=keys, how="left")
+        return merged["embedding"].tolist()
+
+    # -----------------------------
+    # Construction de la table des chunks
+    # -----------------------------
+    def build_chunks(self, df: pd.DataFrame, text_col: str = "text") -> pd.DataFrame:
+        """
+        Découpe les articles d'un DataFrame en chunks (une ligne par chunk),
+        avec l'index de l'article, la position du chunk et les métadonnées.
         """
         if text_col not in df.columns:
             raise ValueError(f"La colonne '{text_col}' est absente du DataFrame.")
 
-        tqdm.pandas()
+        return self.chunker.chunk_table(df, text_col) # Découpage vectorisé, sans iterrows
+
+    # -----------------------------
+    # Application à un DataFrame complet
+    # -----------------------------
+    def embed_dataframe(self, df: pd.DataFrame, text_col: str = "text", output_path: str = None,
+                        checkpoint_dir: str = None, shard_size: int = 5000) -> pd.DataFrame:
+        """
+        Applique le chunking + embedding à un DataFrame entier.
+        output_path désigne un répertoire EmbeddingStore (matrice .npy + métadonnées Parquet),
+        ou un fichier CSV (ancien format) s'il se termine par '.csv'.
+        Si checkpoint_dir est précisé, la vectorisation est sauvegardée par shards
+        et reprend là où elle s'était arrêtée (voir embed_with_checkpoints).
+        """
         print(f"[INFO] Démarrage de la génération d'embeddings sur {len(df)} articles...")
 
-        # Étape 1 : découpage en chunks
-        df["chunks"] = df[text_col].progress_apply(self.split_text) # utilisation d'apply pour faire appel à la méthode split_text et stockage dans la nouvelle colonne 'chunks'
-
-        # Étape 2 : création du DataFrame de chunks
-        all_chunks = [] # Liste de dictionnaire qui contient les données de chaque article
-        for i, row in df.iterrows():
-            for chunk in row["chunks"]:
-                all_chunks.append({
-                    "index_article": i,
-                    "chunk": chunk,
-                    "label": row.get("label", None), # Si aucun label, renvoie None
-                    "subject": row.get("subject", None),
-                    "date": row.get("date", None),
-                })
-
-        chunks_df = pd.DataFrame(all_chunks) # Conversion de la liste d'objets structurés en dataframe
+        # Étapes 1 et 2 : découpage en chunks et table des chunks
+        chunks_df = self.build_chunks(df, text_col)
         if chunks_df.empty:
             print("[WARNING] Aucun chunk généré. Vérifie chunk_size / overlap.")
             return pd.DataFrame()
 
-        # Étape 3 : vectorisation
-        chunks_df["embedding"] = self.embed_texts(chunks_df["chunk"].tolist()) # Création de la colonne avec les vecteurs (embedding + normalisation)
+        # Étape 3 : vectorisation (avec checkpoints par shards si demandé)
+        if checkpoint_dir:
+            chunks_df["embedding"] = self.embed_with_checkpoints(chunks_df, checkpoint_dir, shard_size)
+        else:
+            chunks_df["embedding"] = self.embed_texts(chunks_df["chunk"].tolist()) # Création de la colonne avec les vecteurs (embedding + normalisation)
 
-        # Étape 4 : sauvegarde progressive
-        if output_path: 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True) 
-            chunks_df.to_csv(output_path, index=False)
-            print(f"[SAVE] Fichier partiel sauvegardé → {output_path}")
+        # Étape 4 : sauvegarde finale (store binaire, ou CSV si output_path se termine par .csv)
+        if output_path:
+            if output_path.endswith(".csv"):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                chunks_df.to_csv(output_path, index=False)
+                print(f"[SAVE] Fichier sauvegardé → {output_path}")
+            else:
+                EmbeddingStore(output_path).write(chunks_df)
 
         print(f"[OK] {len(chunks_df)} embeddings générés à partir de {len(df)} articles.")
         return chunks_df
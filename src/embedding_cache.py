@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+
+
+class EmbeddingCache:
+    """
+    Cache persistant (SQLite) des embeddings, adressé par contenu :
+    clé = hash SHA-256 du nom du modèle + texte normalisé.
+
+    Le cache est borné à `max_entries` vecteurs : au-delà, les entrées les moins
+    récemment utilisées sont supprimées (LRU).
+    """
+
+    def __init__(self, path: str = "data/cache/embeddings.sqlite", max_entries: int = 2_000_000):
+        """
+        Args:
+            path (str): Chemin de la base SQLite (":memory:" pour un cache non persistant).
+            max_entries (int): Nombre maximal de vecteurs conservés.
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] # Tenu à jour ensuite
+        print(f"[INIT] EmbeddingCache '{path}' ({self._count} entrées, max={max_entries})")
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Normalise les espaces pour que deux textes identiques au blanc près partagent la même clé."""
+        return " ".join(text.split())
+
+    @classmethod
+    def make_key(cls, model_name: str, text: str) -> str:
+        """Clé de cache : SHA-256 de (modèle, texte normalisé)."""
+        return hashlib.sha256(f"{model_name}\x00{cls.normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # -----------------------------
+    # Lecture / écriture
+    # -----------------------------
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[int, List[float]]:
+        """
+        Cherche les embeddings de plusieurs textes.
+
+        Returns:
+            Dict[int, List[float]]: {position du texte dans `texts`: vecteur} pour les textes trouvés.
+        """
+        keys = [self.make_key(model_name, t) for t in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500): # Limite du nombre de paramètres SQLite
+                part = list(set(keys[start:start + 500]))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update({k: np.frombuffer(v, dtype=np.float32).tolist() for k, v in rows})
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+
+            result = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(result)
+            self.misses += len(keys) - len(result)
+        return result
+
+    def put_many(self, model_name: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Enregistre les embeddings de plusieurs textes, puis applique l'éviction LRU si besoin."""
+        now = time.time()
+        rows = [
+            (self.make_key(model_name, t), model_name, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            inserted = self._conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", rows).rowcount
+            if inserted < len(rows): # Clés déjà présentes : vecteur et date d'accès réécrits
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_access = ? WHERE key = ?",
+                    [(vector, access, key) for key, _, vector, access in rows],
+                )
+            self._count += inserted
+            if self._count > self.max_entries:
+                self._count -= self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (self._count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+
+    # -----------------------------
+    # Statistiques
+    # -----------------------------
+    def stats(self) -> dict:
+        """Compteurs de hits/misses depuis l'ouverture du cache (sans requête SQLite)."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,447 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import threading
+import time
+import numpy as np
+import ollama
+import pandas as pd
+from tenacity import Retrying, stop_after_attempt, stop_after_delay, wait_exponential
+from typing import Callable, Dict, List, Sequence, Set
+from src.embedding_cache import EmbeddingCache
+from src.vector_store import EmbeddingStore
+
+# Endpoint particulier : vectorisation dans le processus du worker (OnnxEmbedder)
+ONNX_ENDPOINT = "onnx"
+
+
+class EmbeddingEndpoint:
+    """
+    Un point de vectorisation de la ferme : serveur Ollama (URL) ou "onnx" (OnnxEmbedder
+    local, utile avec des workers en processus séparés).
+    """
+
+    def __init__(self, url: str, model_name: str = "all-minilm", batch_size: int = 64, timeout: float = 120.0,
+                 num_threads: int = None):
+        self.url = url
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.num_threads = num_threads
+        self._client = None
+        self._embedder = None
+
+    @property
+    def cache_key(self) -> str:
+        """Clé des vecteurs de cet endpoint dans l'EmbeddingCache (même clé que OllamaEmbedder / OnnxEmbedder)."""
+        return f"{self.model_name}:onnx-fp32" if self.url == ONNX_ENDPOINT else self.model_name
+
+    @property
+    def client(self) -> ollama.Client:
+        if self._client is None:
+            self._client = ollama.Client(host=self.url, timeout=self.timeout)
+        return self._client
+
+    def check_health(self) -> bool:
+        """Le serveur répond-il (liste des modèles, /api/tags) ?"""
+        if self.url == ONNX_ENDPOINT:
+            return True
+        try:
+            ollama.Client(host=self.url, timeout=min(self.timeout, 5.0)).list()
+            return True
+        except Exception:
+            return False
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectorise les textes par batchs de `batch_size` et renvoie la matrice normalisée (float32)."""
+        if self.url == ONNX_ENDPOINT:
+            if self._embedder is None:
+                from src.onnx_embedding import OnnxEmbedder # Import tardif : ONNX Runtime seulement si utilisé
+                self._embedder = OnnxEmbedder(self.model_name, batch_size=self.batch_size, num_threads=self.num_threads)
+            vectors = np.asarray(self._embedder._embed_uncached(list(texts)), dtype=np.float32)
+        else:
+            vectors = []
+            for start in range(0, len(texts), self.batch_size):
+                batch = list(texts[start:start + self.batch_size])
+                response = self.client.embed(model=self.model_name, input=batch)
+                if len(response.embeddings) != len(batch):
+                    raise RuntimeError(f"{self.url} a renvoyé {len(response.embeddings)} embeddings pour {len(batch)} textes.")
+                vectors.extend(response.embeddings)
+            vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _worker_loop(name: str, endpoint: EmbeddingEndpoint, tasks, results, max_retries: int, backoff: float,
+                 recovery_timeout: float) -> None:
+    """
+    Boucle d'un worker (thread ou processus) : prend le prochain shard libre dans la file
+    commune (les workers rapides en traitent donc davantage), le vectorise avec retries
+    et backoff exponentiel, et renvoie le résultat au coordinateur.
+
+    Après un échec définitif, le shard est rendu au coordinateur et le worker attend que
+    son endpoint redevienne sain (health checks espacés) avant de reprendre ; au-delà de
+    `recovery_timeout` secondes, il s'arrête.
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        shard_id, texts = task
+        results.put(("started", shard_id, name, None))
+        try:
+            for attempt in Retrying(stop=stop_after_attempt(max_retries),
+                                    wait=wait_exponential(multiplier=backoff, max=30), reraise=True):
+                with attempt:
+                    vectors = endpoint.embed(texts)
+            results.put(("done", shard_id, name, vectors))
+        except Exception as e:
+            results.put(("failed", shard_id, name, repr(e)))
+            try:
+                for attempt in Retrying(stop=stop_after_delay(recovery_timeout),
+                                        wait=wait_exponential(multiplier=backoff, max=30), reraise=True):
+                    with attempt:
+                        if not endpoint.check_health():
+                            raise ConnectionError(f"{endpoint.url} indisponible")
+            except ConnectionError:
+                results.put(("dead", None, name, repr(e)))
+                return
+
+
+class EmbeddingFarm:
+    """
+    Vectorisation d'un grand corpus répartie sur plusieurs endpoints (serveurs Ollama et/ou
+    ONNX local) et plusieurs workers (threads, ou processus séparés).
+
+    - les chunks sont découpés en shards placés dans une file commune : chaque worker prend
+      le prochain shard dès qu'il est libre, un endpoint lent en traite donc moins ;
+    - vol de travail : quand la file est vide, un shard en cours depuis plus de
+      `steal_factor` fois la durée médiane d'un shard est redistribué à un worker inactif,
+      le premier résultat l'emporte ;
+    - health check de chaque endpoint au démarrage (les endpoints injoignables sont
+      écartés), retries avec backoff exponentiel (tenacity) sur chaque shard ;
+    - cache d'embeddings (optionnel) : les chunks déjà vectorisés sont servis par le cache
+      avant la répartition, et les nouveaux vecteurs y sont écrits ;
+    - chaque shard terminé est écrit dans `work_dir` (reprise après interruption), puis la
+      fusion produit un EmbeddingStore unique, dans l'ordre de la table des chunks.
+    """
+
+    def __init__(self, endpoints: List[str], model_name: str = "all-minilm", batch_size: int = 64,
+                 shard_size: int = 2048, workers_per_endpoint: int = 2, use_processes: bool = False,
+                 max_retries: int = 4, backoff: float = 1.0, steal_factor: float = 3.0,
+                 recovery_timeout: float = 60.0, timeout: float = 120.0, cache: EmbeddingCache = None):
+        """
+        Args:
+            endpoints (List[str]): URLs des serveurs Ollama, et/ou "onnx" pour l'inférence locale.
+            model_name (str): Modèle d'embedding.
+            batch_size (int): Textes par requête d'embedding.
+            shard_size (int): Chunks par shard (unité de répartition, de reprise et de vol de travail).
+            workers_per_endpoint (int): Workers (requêtes simultanées) par endpoint.
+            use_processes (bool): Workers en processus séparés (utile pour "onnx") plutôt qu'en threads.
+            max_retries (int): Tentatives par shard et par worker avant de rendre le shard.
+            backoff (float): Multiplicateur (s) du backoff exponentiel entre deux tentatives.
+            steal_factor (float): Un shard plus lent que steal_factor x la médiane est redistribué.
+            recovery_timeout (float): Durée (s) pendant laquelle un worker attend le retour de son endpoint.
+            timeout (float): Timeout (s) d'une requête HTTP.
+            cache (EmbeddingCache): Cache persistant des embeddings (optionnel), partagé avec
+                OllamaEmbedder : seuls les chunks absents du cache sont envoyés aux workers.
+        """
+        if not endpoints:
+            raise ValueError("Aucun endpoint d'embedding configuré.")
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.shard_size = max(1, shard_size)
+        self.workers_per_endpoint = max(1, workers_per_endpoint)
+        self.use_processes = use_processes
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+        self.steal_factor = steal_factor
+        self.recovery_timeout = recovery_timeout
+        self.timeout = timeout
+        self.cache = cache
+        self.stats = {} # {worker: {"shards": n, "chunks": n, "seconds": s}} de la dernière exécution
+        print(f"[INIT] EmbeddingFarm : {len(self.endpoints)} endpoints x {self.workers_per_endpoint} workers "
+              f"({'processus' if use_processes else 'threads'}), shards de {self.shard_size} chunks")
+
+    # -----------------------------
+    # Endpoints
+    # -----------------------------
+    def healthy_endpoints(self) -> List[str]:
+        """Endpoints qui répondent au health check ; erreur si aucun n'est disponible."""
+        healthy = []
+        for url in self.endpoints:
+            ok = EmbeddingEndpoint(url, self.model_name, timeout=self.timeout).check_health()
+            print(f"[FARM] {url} : {'OK' if ok else 'injoignable, écarté'}")
+            if ok:
+                healthy.append(url)
+        if not healthy:
+            raise RuntimeError(f"Aucun endpoint d'embedding joignable parmi {self.endpoints}")
+        return healthy
+
+    def _start_workers(self, endpoints: List[str], tasks, results) -> Dict[str, object]:
+        n_workers = len(endpoints) * self.workers_per_endpoint
+        num_threads = max(1, (os.cpu_count() or 1) // n_workers) if self.use_processes else None
+        ctx = multiprocessing.get_context("spawn") if self.use_processes else None
+        workers = {} # {nom du worker: thread ou processus}
+        for url in endpoints:
+            for i in range(self.workers_per_endpoint):
+                endpoint = EmbeddingEndpoint(url, self.model_name, self.batch_size, self.timeout, num_threads)
+                name = f"{url}#{i}"
+                args = (name, endpoint, tasks, results, self.max_retries, self.backoff, self.recovery_timeout)
+                if ctx is not None:
+                    worker = ctx.Process(target=_worker_loop, args=args, daemon=True)
+                else:
+                    worker = threading.Thread(target=_worker_loop, args=args, daemon=True)
+                worker.start()
+                workers[name] = worker
+        return workers
+
+    # -----------------------------
+    # Cache d'embeddings
+    # -----------------------------
+    def _cached_rows(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """{position: vecteur} des textes présents dans le cache, sous la clé de l'un des endpoints."""
+        if self.cache is None:
+            return {}
+        cached = {}
+        for key in dict.fromkeys(EmbeddingEndpoint(url, self.model_name).cache_key for url in self.endpoints):
+            missing = [i for i in range(len(texts)) if i not in cached]
+            if not missing:
+                break
+            found = self.cache.get_many(key, [texts[i] for i in missing])
+            cached.update({missing[j]: np.asarray(vec, dtype=np.float32) for j, vec in found.items()})
+        return cached
+
+    # -----------------------------
+    # Répartition des shards
+    # -----------------------------
+    def _run(self, texts: List[str], work_dir: str = None,
+             on_shard: Callable[[int, np.ndarray], None] = None) -> Set[int]:
+        """
+        Vectorise les shards de `texts` qui ne sont pas déjà dans `work_dir`. Chaque shard
+        terminé est écrit dans `work_dir` (si fourni) et transmis à `on_shard(numéro, matrice)`,
+        puis n'est plus gardé en mémoire.
+
+        Returns:
+            Set[int]: Numéros des shards déjà présents dans `work_dir` (non recalculés).
+        """
+        n_shards = (len(texts) + self.shard_size - 1) // self.shard_size
+        def shard_texts(s: int) -> List[str]:
+            return texts[s * self.shard_size:(s + 1) * self.shard_size]
+
+        resumed = self._prepare_work_dir(work_dir, texts, n_shards) if work_dir is not None else set()
+        done = set(resumed)
+
+        def finish(s: int, vectors: np.ndarray) -> None:
+            done.add(s)
+            if work_dir is not None:
+                self._save_shard(work_dir, s, vectors)
+            if on_shard is not None:
+                on_shard(s, vectors)
+
+        # Cache : les shards entièrement en cache sont terminés sans passer par les workers,
+        # seuls les textes manquants des autres shards sont envoyés
+        partial = {} # {shard: (positions manquantes, vecteurs en cache du shard)}, jusqu'à la fin du shard
+        n_cached = 0
+        for s in range(n_shards):
+            if s in done:
+                continue
+            chunk_texts = shard_texts(s)
+            cached = self._cached_rows(chunk_texts)
+            n_cached += len(cached)
+            if cached and len(cached) == len(chunk_texts):
+                finish(s, np.vstack([cached[i] for i in range(len(chunk_texts))]))
+            else:
+                partial[s] = ([i for i in range(len(chunk_texts)) if i not in cached], cached)
+        if self.cache is not None:
+            print(f"[CACHE] {n_cached} chunks servis par le cache, {n_shards - len(done)} shards à vectoriser")
+        todo = sorted(partial)
+        if not todo:
+            return resumed
+
+        def task(s: int):
+            missing, _ = partial[s]
+            chunk_texts = shard_texts(s)
+            return s, [chunk_texts[i] for i in missing]
+
+        endpoints = self.healthy_endpoints()
+        keys = {url: EmbeddingEndpoint(url, self.model_name).cache_key for url in endpoints}
+        ctx = multiprocessing.get_context("spawn") if self.use_processes else None
+        tasks, results = (ctx.Queue(), ctx.Queue()) if ctx is not None else (queue.Queue(), queue.Queue())
+        for s in todo:
+            tasks.put(task(s))
+        workers = self._start_workers(endpoints, tasks, results)
+
+        queued = len(todo) # Shards placés dans la file (y compris redistributions)
+        taken = 0 # Shards pris par un worker
+        in_flight = {} # {shard: instant du premier démarrage}
+        current = {} # {worker: shard en cours}
+        stopped = set() # Workers arrêtés (endpoint indisponible ou fin inattendue)
+        stolen, failures, durations = set(), {}, []
+        self.stats = {}
+        t0 = time.perf_counter()
+
+        def requeue(s: int) -> None:
+            nonlocal queued
+            if s not in done:
+                in_flight.pop(s, None)
+                tasks.put(task(s))
+                queued += 1
+
+        try:
+            while len(done) < n_shards:
+                try:
+                    kind, shard, worker, payload = results.get(timeout=0.2)
+                except queue.Empty:
+                    kind = None
+                if kind in ("done", "failed"):
+                    current.pop(worker, None)
+                if kind == "started":
+                    taken += 1
+                    current[worker] = shard
+                    in_flight.setdefault(shard, time.perf_counter())
+                elif kind == "done" and shard not in done:
+                    elapsed = time.perf_counter() - in_flight.pop(shard, t0)
+                    durations.append(elapsed)
+                    if self.cache is not None:
+                        self.cache.put_many(keys[worker.rsplit("#", 1)[0]], task(shard)[1], payload.tolist())
+                    missing, cached = partial.pop(shard)
+                    vectors = np.empty((len(missing) + len(cached), payload.shape[1]), dtype=np.float32)
+                    vectors[missing] = payload
+                    for i, vec in cached.items():
+                        vectors[i] = vec
+                    finish(shard, vectors)
+                    stats = self.stats.setdefault(worker, {"shards": 0, "chunks": 0, "seconds": 0.0})
+                    stats["shards"] += 1
+                    stats["chunks"] += len(payload)
+                    stats["seconds"] += elapsed
+                    print(f"[FARM] shard {shard + 1}/{n_shards} ({len(payload)} chunks) par {worker} en {elapsed:.1f}s "
+                          f"- {len(done)}/{n_shards} terminés")
+                elif kind == "failed":
+                    print(f"[FARM] Échec du shard {shard} sur {worker} : {payload}")
+                    failures[shard] = failures.get(shard, 0) + 1
+                    if failures[shard] > self.max_retries * len(endpoints):
+                        raise RuntimeError(f"Shard {shard} en échec sur tous les endpoints : {payload}")
+                    requeue(shard)
+                elif kind == "dead":
+                    stopped.add(worker)
+                    print(f"[FARM] Worker {worker} arrêté (endpoint indisponible), "
+                          f"{len(workers) - len(stopped)} restants")
+                elif kind is None:
+                    # File de résultats vide : un worker terminé sans prévenir (exception
+                    # inattendue, processus tué) rend son shard en cours
+                    for name, w in workers.items():
+                        if name not in stopped and not w.is_alive():
+                            stopped.add(name)
+                            print(f"[FARM] Worker {name} terminé de façon inattendue, "
+                                  f"{len(workers) - len(stopped)} restants")
+                            if name in current:
+                                requeue(current.pop(name))
+                if len(stopped) == len(workers):
+                    raise RuntimeError(f"Tous les workers d'embedding sont arrêtés, "
+                                       f"{n_shards - len(done)} shards non vectorisés.")
+
+                # Vol de travail : file vide, shards retardataires redistribués aux workers inactifs
+                if taken >= queued and durations and self.steal_factor:
+                    limit = self.steal_factor * statistics.median(durations)
+                    now = time.perf_counter()
+                    for s, started in list(in_flight.items()):
+                        if s not in stolen and s not in done and now - started > limit:
+                            stolen.add(s)
+                            tasks.put(task(s))
+                            queued += 1
+                            print(f"[FARM] shard {s} en cours depuis {now - started:.1f}s : redistribué")
+        finally:
+            for _ in workers:
+                tasks.put(None)
+            for worker in workers.values():
+                worker.join(timeout=1.0)
+                if self.use_processes and worker.is_alive():
+                    worker.terminate() # Worker encore occupé sur un doublon (shard volé)
+
+        elapsed = time.perf_counter() - t0
+        n_chunks = sum(len(shard_texts(s)) for s in todo)
+        print(f"[FARM] {n_chunks} chunks vectorisés en {elapsed:.1f}s ({n_chunks / max(elapsed, 1e-9):.1f} chunks/s)")
+        return resumed
+
+    def embed_shards(self, texts: List[str], work_dir: str = None) -> Dict[int, np.ndarray]:
+        """
+        Vectorise tous les shards de `texts` et renvoie {numéro de shard: matrice}.
+        Si `work_dir` est fourni, les shards déjà présents sur disque sont réutilisés et
+        chaque nouveau shard y est écrit dès qu'il est terminé.
+        """
+        done = {}
+        for s in self._run(texts, work_dir, on_shard=done.__setitem__):
+            done[s] = np.load(self._shard_path(work_dir, s))
+        return done
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Vectorise les textes et renvoie la matrice normalisée, dans l'ordre des textes."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        done = self.embed_shards(texts)
+        return np.vstack([done[s] for s in sorted(done)])
+
+    # -----------------------------
+    # Reprise et fusion
+    # -----------------------------
+    def _params(self, texts: List[str]) -> dict:
+        digest = hashlib.sha1("\x1f".join(texts).encode("utf-8")).hexdigest()
+        return {"model_name": self.model_name, "shard_size": self.shard_size, "n_texts": len(texts), "texts_sha1": digest}
+
+    @staticmethod
+    def _shard_path(work_dir: str, shard: int) -> str:
+        return os.path.join(work_dir, f"shard_{shard:05d}.npy")
+
+    def _prepare_work_dir(self, work_dir: str, texts: List[str], n_shards: int) -> Set[int]:
+        """Shards déjà vectorisés pour ces mêmes textes (sinon le répertoire de travail est réinitialisé)."""
+        os.makedirs(work_dir, exist_ok=True)
+        params_path = os.path.join(work_dir, "params.json")
+        params = self._params(texts)
+        if os.path.exists(params_path):
+            with open(params_path, encoding="utf-8") as f:
+                if json.load(f) != params:
+                    print(f"[FARM] '{work_dir}' créé pour d'autres textes ou paramètres : shards ignorés")
+                    for name in os.listdir(work_dir):
+                        if name.startswith("shard_"):
+                            os.remove(os.path.join(work_dir, name))
+        with open(params_path, "w", encoding="utf-8") as f:
+            json.dump(params, f, indent=2)
+        done = {s for s in range(n_shards) if os.path.exists(self._shard_path(work_dir, s))}
+        if done:
+            print(f"[FARM] {len(done)}/{n_shards} shards déjà vectorisés dans '{work_dir}'")
+        return done
+
+    @staticmethod
+    def _save_shard(work_dir: str, shard: int, vectors: np.ndarray) -> None:
+        path = EmbeddingFarm._shard_path(work_dir, shard)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        os.replace(path + ".tmp", path) # Écriture atomique : pas de shard à moitié écrit
+
+    def embed_to_store(self, chunks_df: pd.DataFrame, store_dir: str, work_dir: str) -> EmbeddingStore:
+        """
+        Vectorise la table des chunks (colonne 'chunk') et écrit un EmbeddingStore unique,
+        ligne i de la matrice = ligne i de chunks_df. Les shards sont relus un à un depuis
+        `work_dir` et recopiés dans une matrice projetée sur disque (pas de copie de tout
+        le corpus en mémoire).
+        """
+        texts = chunks_df["chunk"].tolist()
+        self._run(texts, work_dir=work_dir)
+        n_shards = (len(texts) + self.shard_size - 1) // self.shard_size
+        dim = np.load(self._shard_path(work_dir, 0), mmap_mode="r").shape[1] if n_shards else 0
+        merged_path = os.path.join(work_dir, "merged.npy")
+        matrix = np.lib.format.open_memmap(merged_path, mode="w+", dtype=np.float32, shape=(len(texts), dim))
+        for s in range(n_shards):
+            vectors = np.load(self._shard_path(work_dir, s), mmap_mode="r")
+            matrix[s * self.shard_size:s * self.shard_size + len(vectors)] = vectors
+        store = EmbeddingStore(store_dir)
+        store.write(chunks_df, matrix)
+        del matrix
+        os.remove(merged_path)
+        return store
@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class KNNVoteClassifier:
+    """
+    Classifieur par vote des plus proches voisins, à partir des résultats de
+    RAGAnalyzer.retrieve_similar_docs (labels des chunks + distances).
+
+    Chaque voisin vote pour son label avec un poids égal à sa similarité cosinus
+    (1 - distance / 2, les vecteurs étant normalisés) élevée à la puissance `power`.
+    La confiance est la part du label gagnant, lissée par `smoothing` :
+
+        confiance = poids du label gagnant / (poids total + smoothing)
+
+    Elle n'est donc élevée que si les voisins sont à la fois d'accord et proches.
+    Au-delà du seuil `threshold` (calibré sur un jeu annoté, voir calibrate),
+    le verdict est rendu sans appeler le LLM.
+    """
+
+    def __init__(self, threshold: float = 0.9, power: float = 2.0, smoothing: float = 0.5):
+        """
+        Args:
+            threshold (float): Confiance minimale pour rendre le verdict sans LLM.
+            power (float): Exposant appliqué aux similarités (accentue les voisins proches).
+            smoothing (float): Poids fictif ajouté au dénominateur (pénalise les voisins éloignés ou peu nombreux).
+        """
+        self.threshold = threshold
+        self.power = power
+        self.smoothing = smoothing
+
+    # -----------------------------
+    # Vote
+    # -----------------------------
+    def predict(self, metas: List[Dict], distances: Sequence[float]) -> Tuple[Optional[int], float]:
+        """
+        Vote pondéré des voisins.
+
+        Returns:
+            Tuple[Optional[int], float]: (label gagnant (0 = FAKE, 1 = TRUE) ou None sans voisin, confiance).
+        """
+        votes = {}
+        for meta, dist in zip(metas, distances):
+            label = meta.get("label")
+            if label is None:
+                continue
+            weight = max(1.0 - float(dist) / 2.0, 0.0) ** self.power
+            votes[int(label)] = votes.get(int(label), 0.0) + weight
+        if not votes:
+            return None, 0.0
+        label = max(votes, key=votes.get)
+        return label, votes[label] / (sum(votes.values()) + self.smoothing)
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.threshold
+
+    # -----------------------------
+    # Calibration sur un jeu annoté
+    # -----------------------------
+    def tradeoff(self, neighbours: List[Tuple[List[Dict], List[float]]], labels: Sequence[int],
+                 thresholds: Sequence[float] = None) -> List[Dict]:
+        """
+        Compromis couverture / précision selon le seuil.
+
+        Args:
+            neighbours: (metas, distances) de chaque article du jeu de validation.
+            labels: Labels réels des articles.
+            thresholds: Seuils évalués (par défaut, toutes les confiances observées).
+
+        Returns:
+            List[Dict]: Pour chaque seuil : part des requêtes court-circuitées ("coverage")
+            et précision du vote sur ces requêtes ("accuracy").
+        """
+        preds = [self.predict(metas, dists) for metas, dists in neighbours]
+        conf = np.array([c for _, c in preds])
+        correct = np.array([p is not None and p == int(y) for (p, _), y in zip(preds, labels)])
+        if thresholds is None:
+            thresholds = np.unique(conf)
+        rows = []
+        for t in thresholds:
+            selected = conf >= t
+            rows.append({
+                "threshold": float(t),
+                "coverage": float(selected.mean()) if len(conf) else 0.0,
+                "accuracy": float(correct[selected].mean()) if selected.any() else float("nan"),
+            })
+        return rows
+
+    def calibrate(self, neighbours: List[Tuple[List[Dict], List[float]]], labels: Sequence[int],
+                  target_accuracy: float = 0.95) -> Dict:
+        """
+        Choisit le seuil le plus bas dont la précision des verdicts court-circuités atteint
+        `target_accuracy` (couverture maximale), et l'affecte à `self.threshold`.
+
+        Returns:
+            Dict: Ligne du compromis retenue (threshold, coverage, accuracy).
+        """
+        rows = [r for r in self.tradeoff(neighbours, labels) if r["accuracy"] >= target_accuracy]
+        if not rows:
+            # Aucun seuil n'atteint la précision visée : le LLM est toujours appelé
+            self.threshold = float("inf")
+            print(f"[WARN] Précision {target_accuracy:.0%} inatteignable par le vote kNN : court-circuit désactivé")
+            return {"threshold": self.threshold, "coverage": 0.0, "accuracy": float("nan")}
+        best = min(rows, key=lambda r: r["threshold"])
+        self.threshold = best["threshold"]
+        print(
+            f"[INFO] Seuil kNN calibré : {self.threshold:.3f} "
+            f"(couverture {best['coverage']:.1%}, précision {best['accuracy']:.1%})"
+        )
+        return best
+
+    # -----------------------------
+    # Sauvegarde des paramètres
+    # -----------------------------
+    def save(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "power": self.power, "smoothing": self.smoothing}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "KNNVoteClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+from src.storage_chroma import ChromaStorage
+
+
+def _as_list(value) -> list:
+    """Un filtre accepte une valeur unique ou une liste de valeurs."""
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return list(value)
+    return [value]
+
+
+def date_bound(value) -> Optional[int]:
+    """Borne de date (str, datetime ou entier AAAAMMJJ) convertie au format numérique stocké."""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    bound = int(ChromaStorage.date_to_int([value])[0])
+    if bound == 0:
+        raise ValueError(f"Date de filtre invalide : {value!r}")
+    return bound
+
+
+def chroma_where(label=None, subject=None, date_from=None, date_to=None) -> Optional[Dict]:
+    """
+    Traduit les filtres de métadonnées en clause `where` Chroma (None si aucun filtre).
+
+    Args:
+        label: Label(s) acceptés (0 = FAKE, 1 = TRUE).
+        subject: Sujet(s) acceptés (ex. "politicsNews").
+        date_from: Date minimale incluse (str "AAAA-MM-JJ", datetime ou entier AAAAMMJJ).
+        date_to: Date maximale incluse.
+    """
+    column = ChromaStorage.DATE_NUMERIC_COLUMN
+    clauses = []
+    for field, value in (("label", label), ("subject", subject)):
+        if value is None:
+            continue
+        values = [v.item() if isinstance(v, np.generic) else v for v in _as_list(value)]
+        clauses.append({field: values[0]} if len(values) == 1 else {field: {"$in": values}})
+    date_from, date_to = date_bound(date_from), date_bound(date_to)
+    if date_from is not None or date_to is not None:
+        # Borne basse d'au moins 1 : les dates inconnues (0) sont exclues d'un filtre de dates
+        clauses.append({column: {"$gte": max(date_from or 1, 1)}})
+        if date_to is not None:
+            clauses.append({column: {"$lte": date_to}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class MetadataIndex:
+    """
+    Index des métadonnées (label, sujet, date) d'un EmbeddingStore, calculé une fois au chargement.
+
+    - label et sujet : listes de postings (indices de lignes triés) par valeur ;
+    - date : indices des lignes triés par date numérique, une plage de dates devient
+      une tranche contiguë (recherche dichotomique).
+
+    Une requête filtrée ne parcourt ainsi que les lignes retenues : son coût est
+    proportionnel au sous-ensemble, jamais supérieur à celui d'une requête non filtrée.
+    """
+
+    def __init__(self, metadata: Dict[str, list]):
+        """
+        Args:
+            metadata (Dict[str, list]): Colonnes de métadonnées (voir ChromaStorage.metadata_columns).
+        """
+        self.size = len(next(iter(metadata.values()), []))
+        self.postings = {field: self._postings(metadata[field]) for field in ("label", "subject") if field in metadata}
+        dates = np.asarray(metadata.get(ChromaStorage.DATE_NUMERIC_COLUMN, np.zeros(self.size)), dtype=np.int64)
+        self.date_order = np.argsort(dates, kind="stable")
+        self.sorted_dates = dates[self.date_order]
+
+    @staticmethod
+    def _postings(values: list) -> Dict:
+        codes, uniques = pd.factorize(pd.Series(values))
+        order = np.argsort(codes, kind="stable") # Indices de lignes triés à l'intérieur de chaque valeur
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques.tolist())}
+
+    def _field_rows(self, field: str, value) -> np.ndarray:
+        postings = self.postings.get(field, {})
+        rows = [postings.get(v, np.empty(0, dtype=np.int64)) for v in _as_list(value)]
+        return np.unique(np.concatenate(rows)) if len(rows) > 1 else rows[0]
+
+    def rows(self, label=None, subject=None, date_from=None, date_to=None) -> Optional[np.ndarray]:
+        """
+        Lignes satisfaisant tous les filtres (mêmes arguments que chroma_where).
+
+        Returns:
+            Optional[np.ndarray]: Indices de lignes triés, ou None si aucun filtre n'est demandé.
+        """
+        selected = []
+        if label is not None:
+            selected.append(self._field_rows("label", label))
+        if subject is not None:
+            selected.append(self._field_rows("subject", subject))
+        date_from, date_to = date_bound(date_from), date_bound(date_to)
+        if date_from is not None or date_to is not None:
+            lo = np.searchsorted(self.sorted_dates, max(date_from or 1, 1), side="left")
+            hi = np.searchsorted(self.sorted_dates, date_to, side="right") if date_to is not None else self.size
+            selected.append(np.sort(self.date_order[lo:hi]))
+        if not selected:
+            return None
+        # Intersection en partant de la liste la plus courte
+        selected.sort(key=len)
+        rows = selected[0]
+        for other in selected[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
@@ -0,0 +1,125 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from src.vector_store import EmbeddingStore
+from src.storage_chroma import ChromaStorage
+from src.metadata_index import MetadataIndex
+
+
+class NumpySearchIndex:
+    """
+    Recherche exacte en mémoire (NumPy) sur la matrice d'embeddings d'un EmbeddingStore.
+
+    Les vecteurs étant normalisés L2, la similarité cosinus est un simple produit scalaire :
+    la matrice float32 (projetée en mémoire) est parcourue par blocs, et les k meilleurs
+    scores de chaque bloc sont sélectionnés avec argpartition (pas de tri complet).
+    """
+
+    def __init__(self, store_dir: str, block_size: int = 65536):
+        """
+        Args:
+            store_dir (str): Répertoire de l'EmbeddingStore (embeddings.npy + metadata.parquet).
+            block_size (int): Nombre de lignes de la matrice traitées par produit matriciel.
+        """
+        metadata, self.embeddings = EmbeddingStore(store_dir).load(mmap=True)
+        self.block_size = block_size
+        self.documents = metadata["chunk"].tolist()
+        self.chunk_ids = metadata["chunk_id"].astype(str).tolist()
+        self._metadata = ChromaStorage.metadata_columns(metadata) # Même format que les métadonnées Chroma
+        self.metadata_index = MetadataIndex(self._metadata)
+        print(f"[INFO] Index NumPy prêt : {self.embeddings.shape[0]} vecteurs (dim={self.embeddings.shape[1]})")
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    # -----------------------------
+    # Recherche top-k
+    # -----------------------------
+    def blocks(self, rows: np.ndarray = None):
+        """
+        Parcourt la matrice par blocs : (indices globaux des lignes du bloc, vecteurs du bloc).
+
+        Args:
+            rows (np.ndarray): Lignes à parcourir (triées), toutes les lignes si None.
+        """
+        n = len(self) if rows is None else len(rows)
+        for start in range(0, n, self.block_size):
+            if rows is None:
+                end = min(start + self.block_size, n)
+                yield np.arange(start, end), self.embeddings[start:end]
+            else:
+                block_rows = rows[start:start + self.block_size]
+                yield block_rows, self.embeddings[block_rows]
+
+    def search(self, query_vectors, k: int = 5, rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les k vecteurs les plus similaires pour un batch de requêtes.
+
+        Args:
+            query_vectors: Vecteur (dim,) ou matrice (n_requêtes x dim) de requêtes normalisées.
+            k (int): Nombre de résultats par requête.
+            rows (np.ndarray): Sous-ensemble de lignes candidates (ex. MetadataIndex.rows),
+                toute la matrice si None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indices des lignes, similarités cosinus),
+            de forme (n_requêtes x k), triés par similarité décroissante.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        k = min(k, len(self) if rows is None else len(rows))
+        best_idx = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        if k == 0:
+            return best_idx, best_scores
+
+        for block_rows, block in self.blocks(rows):
+            scores = queries @ block.T # (n_requêtes x taille du bloc)
+            if scores.shape[1] > k:
+                part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            # Fusion des candidats du bloc avec les meilleurs résultats courants
+            cand_idx = np.concatenate([best_idx, block_rows[part]], axis=1)
+            cand_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            if cand_idx.shape[1] > k:
+                keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+                cand_idx = np.take_along_axis(cand_idx, keep, axis=1)
+                cand_scores = np.take_along_axis(cand_scores, keep, axis=1)
+            best_idx, best_scores = cand_idx, cand_scores
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def metadata_at(self, row: int) -> Dict:
+        """Métadonnées de la ligne `row`, au format des métadonnées Chroma."""
+        return {col: values[row] for col, values in self._metadata.items()}
+
+    def retrieve_batch(self, query_vectors, n_results: int = 5, **filters) -> List[Tuple[List[str], List[Dict], List[float]]]:
+        """
+        Recherche groupée : un seul parcours de la matrice pour toutes les requêtes.
+
+        Returns:
+            List[Tuple[List[str], List[Dict], List[float]]]: (chunks, métadonnées, distances) par requête.
+            Les métadonnées incluent l'identifiant du chunk ("chunk_id").
+        """
+        idx, scores = self.search(query_vectors, k=n_results, rows=self.metadata_index.rows(**filters))
+        results = []
+        for rows, sims in zip(idx.tolist(), scores):
+            docs = [self.documents[r] for r in rows]
+            metas = [{**self.metadata_at(r), "chunk_id": self.chunk_ids[r]} for r in rows]
+            results.append((docs, metas, (2.0 - 2.0 * sims).tolist()))
+        return results
+
+    def retrieve_similar_docs(self, query_vector, n_results: int = 5, **filters) -> Tuple[List[str], List[Dict], List[float]]:
+        """
+        Même contrat que RAGAnalyzer.retrieve_similar_docs avec Chroma.
+
+        Args:
+            filters: Filtres de métadonnées (label, subject, date_from, date_to), résolus
+                par le MetadataIndex avant la recherche.
+
+        Returns:
+            Tuple[List[str], List[Dict], List[float]]: (chunks, métadonnées, distances).
+            Les distances sont des L2 au carré (2 - 2 * cosinus), comme la distance
+            par défaut de Chroma.
+        """
+        return self.retrieve_batch([query_vector], n_results=n_results, **filters)[0]
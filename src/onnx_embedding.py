@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import onnxruntime as ort
+from huggingface_hub import hf_hub_download
+from tokenizers import Tokenizer
+from typing import List
+from src.chunking import MODEL_TOKENIZERS, WordChunker
+from src.embedding import OllamaEmbedder
+from src.embedding_cache import EmbeddingCache
+
+
+class OnnxEmbedder(OllamaEmbedder):
+    """
+    Embeddings calculés dans le processus avec ONNX Runtime (CPU), sans passer par le
+    serveur Ollama : même interface que OllamaEmbedder (split_text, embed_texts,
+    embed_dataframe, cache, checkpoints).
+
+    Le modèle est l'export ONNX de sentence-transformers/all-MiniLM-L6-v2, c'est-à-dire le
+    modèle servi par Ollama sous le nom "all-minilm" : mean pooling sur les tokens puis
+    normalisation L2, les vecteurs sont donc compatibles avec les index existants.
+    """
+
+    in_process = True
+
+    # Fichiers ONNX publiés avec le modèle : précision complète, ou poids int8 (quantification dynamique)
+    ONNX_FILES = {False: "onnx/model.onnx", True: "onnx/model_quint8_avx2.onnx"}
+
+    def __init__(self, model_name: str = "all-minilm", chunk_size: int = 200, overlap: int = 50, batch_size: int = 32,
+                 max_workers: int = 1, cache: EmbeddingCache = None, chunker: WordChunker = None,
+                 model_path: str = None, quantize: bool = False, num_threads: int = None):
+        """
+        Args:
+            model_name (str): Modèle d'embedding (clé de MODEL_TOKENIZERS, par défaut 'all-minilm').
+            batch_size (int): Nombre de textes par inférence (padding à la longueur du plus long).
+            max_workers (int): Nombre de batchs exécutés en parallèle ; ONNX Runtime
+                parallélise déjà chaque inférence sur `num_threads` threads.
+            model_path (str): Répertoire local contenant tokenizer.json et onnx/model*.onnx
+                (sinon téléchargés depuis le Hub Hugging Face).
+            quantize (bool): Utilise les poids int8 (plus rapide, vecteurs très légèrement différents).
+            num_threads (int): Threads ONNX Runtime par inférence (par défaut : tous les cœurs).
+            Les autres arguments sont ceux de OllamaEmbedder.
+        """
+        if model_name not in MODEL_TOKENIZERS:
+            raise ValueError(f"Modèle '{model_name}' inconnu, modèles disponibles : {list(MODEL_TOKENIZERS)}")
+        super().__init__(model_name=model_name, chunk_size=chunk_size, overlap=overlap, batch_size=batch_size,
+                         max_workers=max_workers, cache=cache, chunker=chunker)
+        hub_id, self.max_tokens = MODEL_TOKENIZERS[model_name]
+        self.quantize = quantize
+        self.cache_key = f"{model_name}:onnx-{'int8' if quantize else 'fp32'}"
+        onnx_path = self._model_file(hub_id, model_path, self.ONNX_FILES[quantize])
+
+        self.tokenizer = Tokenizer.from_file(self._model_file(hub_id, model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_tokens)
+        self.tokenizer.enable_padding() # Padding à la longueur du plus long texte du batch
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        print(f"[INIT] Modèle ONNX chargé : {onnx_path} ({'int8' if quantize else 'fp32'}, {options.intra_op_num_threads} threads)")
+
+    @staticmethod
+    def _model_file(hub_id: str, model_path: str, filename: str) -> str:
+        if model_path is None:
+            return hf_hub_download(hub_id, filename)
+        for candidate in (os.path.join(model_path, filename), os.path.join(model_path, os.path.basename(filename))):
+            if os.path.exists(candidate):
+                return candidate
+        raise FileNotFoundError(f"'{filename}' introuvable dans '{model_path}'")
+
+    # -----------------------------
+    # Vectorisation d'un batch de textes
+    # -----------------------------
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Vectorise un batch de textes en une inférence : mean pooling des états cachés sur les
+        tokens réels (masque d'attention), puis normalisation L2.
+        """
+        encodings = self.tokenizer.encode_batch(list(texts))
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+        mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.where(norms > 0, norms, 1.0)).tolist()
@@ -2,7 +2,40 @@ import pandas as pd
 from abc import ABC, abstractmethod
 import re
 import os
-from typing import List
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+
+
+# Patterns used by DataCleaner.clean_text, compiled once
+WHITESPACE_PATTERN = re.compile(r'\s+')
+URL_PATTERN = re.compile(r'http\S+')
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+# ASCII characters removed by NON_ALPHANUMERIC_PATTERN, as a str.translate table
+ASCII_NON_ALPHANUMERIC_TABLE = {i: None for i in range(128) if not re.fullmatch(r'[a-zA-Z0-9\s]', chr(i))}
+
+
+def clean_strings(values: List[str], lower: bool = False) -> List[str]:
+    """
+    Strip, optionally lowercase, then clean a list of strings in a single pass.
+    Same result as str.strip() -> str.lower() -> DataCleaner.clean_text() on each value:
+    - on a stripped string, ' '.join(v.split()) is exactly WHITESPACE_PATTERN.sub(' ', v);
+    - URL_PATTERN only runs when 'http' is present;
+    - pure-ASCII strings drop non-alphanumeric characters with str.translate.
+    Defined at module level so it can be sent to worker processes.
+    """
+    cleaned = []
+    for v in values:
+        v = v.strip()
+        if lower:
+            v = v.lower()
+        v = ' '.join(v.split())
+        if 'http' in v:
+            v = URL_PATTERN.sub('', v)
+        cleaned.append(v.translate(ASCII_NON_ALPHANUMERIC_TABLE) if v.isascii() else NON_ALPHANUMERIC_PATTERN.sub('', v))
+    return cleaned
 
 
 class DataLoader(ABC):
@@ -45,6 +78,24 @@ class CSVLoader(DataLoader):
         print(f"[DEBUG] Columns: {self.df.columns.tolist()}")
         return self.df
 
+    def iter_csv(self, path, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+        """
+        Stream a CSV file as DataFrames of at most batch_size rows,
+        so the whole file is never held in memory.
+
+        Args:
+            path (str): Path to the CSV file.
+            batch_size (int): Number of rows per batch.
+
+        Yields:
+            pd.DataFrame: Consecutive row batches (with their original row index).
+        """
+        print(f"[INFO] Start streaming CSV from: {path} (batch_size={batch_size})")
+        self.path = path
+        with pd.read_csv(self.path, chunksize=batch_size) as reader:
+            for batch in reader:
+                yield batch
+
 class DataCleaner:
     """
     Class to clean a pandas DataFrame.
@@ -118,9 +169,9 @@ class DataCleaner:
         """
         Clean a string by removing extra spaces, URLs, and non-alphanumeric characters.
         """
-        text = re.sub(r'\s+', ' ', text)          
-        text = re.sub(r'http\S+', '', text)
-        text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
+        text = URL_PATTERN.sub('', text)
+        text = NON_ALPHANUMERIC_PATTERN.sub('', text)
         return text
 
     def clean_all_text_columns(self):
@@ -134,6 +185,62 @@ class DataCleaner:
         print(f"[INFO] clean_all_text_columns: All string columns cleaned")
         return self
     
+    def clean_pipeline(self, n_jobs: int = 1, chunk_size: int = 10000):
+        """
+        Fused equivalent of remove_spaces().lower_case().date_format().clean_all_text_columns().
+
+        Each string cell is stripped, lowercased ('text' only) and cleaned in a single pass
+        with precompiled patterns. With n_jobs > 1, columns are split into chunks of
+        chunk_size values and cleaned in a process pool.
+
+        Args:
+            n_jobs (int): Number of worker processes (1 = no pool).
+            chunk_size (int): Number of values sent to a worker at once.
+        """
+        if 'date' in self.df.columns and self.df['date'].dtype == 'object':
+            self.df['date'] = self.df['date'].str.strip()
+        if 'text' in self.df.columns and self.df['text'].dtype != 'object':
+            self.df['text'] = self.df['text'].str.lower()
+        self.date_format()
+
+        text_cols = [col for col in self.df.columns if self.df[col].dtype == 'object']
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                for col in text_cols:
+                    self.df[col] = self._clean_column(self.df[col], col == 'text', executor, chunk_size)
+        else:
+            for col in text_cols:
+                self.df[col] = self._clean_column(self.df[col], col == 'text')
+        print(f"[INFO] clean_pipeline: {len(text_cols)} string columns cleaned (n_jobs={n_jobs})")
+        return self
+
+    @staticmethod
+    def _clean_column(series: pd.Series, lower: bool, executor: ProcessPoolExecutor = None, chunk_size: int = 10000) -> pd.Series:
+        """
+        Clean one object column the way the chained methods would.
+        String cells go through clean_strings; other cells (NaN, None, numbers...) follow
+        the original pandas semantics (.str.strip() then astype(str)).
+        """
+        values = series.to_numpy(dtype=object)
+        is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+        strings = values[is_str].tolist()
+
+        if executor is not None and len(strings) > chunk_size:
+            chunks = [strings[i:i + chunk_size] for i in range(0, len(strings), chunk_size)]
+            cleaned = [v for part in executor.map(clean_strings, chunks, [lower] * len(chunks)) for v in part]
+        else:
+            cleaned = clean_strings(strings, lower)
+
+        out = np.empty(len(values), dtype=object)
+        out[is_str] = cleaned
+        if not is_str.all():
+            # Leading "" keeps the .str accessor usable when no other value is a string
+            rest = pd.Series([""] + values[~is_str].tolist(), dtype=object).str.strip()
+            if lower:
+                rest = rest.str.lower()
+            out[~is_str] = rest.astype(str).map(DataCleaner.clean_text).to_numpy()[1:]
+        return pd.Series(out, index=series.index, name=series.name)
+
     def save_csv(self, path: str, index=False):
         """
         Save the current DataFrame to a CSV file.
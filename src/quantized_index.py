@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Tuple
+from src.numpy_index import NumpySearchIndex
+from src.vector_store import EmbeddingStore
+
+
+def kmeans(data: np.ndarray, n_clusters: int, n_iter: int = 15, seed: int = 0) -> np.ndarray:
+    """K-means (Lloyd) en NumPy ; retourne les centroïdes (n_clusters x dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=len(data) < n_clusters)].copy()
+    for _ in range(n_iter):
+        assign = nearest_centroid(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=n_clusters)
+        filled = counts > 0 # Un cluster vide garde son centroïde
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def nearest_centroid(data: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """Indice du centroïde le plus proche (L2) de chaque vecteur, calculé par blocs."""
+    c_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block_size):
+        block = data[start:start + block_size]
+        out[start:start + len(block)] = np.argmin(c_norms - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+class QuantizedSearchIndex(NumpySearchIndex):
+    """
+    Index compressé construit sur un EmbeddingStore, avec re-ranking exact.
+
+    Méthodes de compression :
+    - "int8" : quantification scalaire par dimension (1 octet par composante, ~4x moins de mémoire) ;
+    - "pq" : quantification produit (m sous-espaces x 256 centroïdes, m octets par vecteur,
+      ~16x moins de mémoire pour 384 dimensions et m=96).
+
+    La recherche parcourt les codes compressés (seuls gardés en RAM) pour sélectionner
+    `rerank_factor * k` candidats, puis recalcule leur score exact sur les vecteurs float32
+    lus dans la matrice projetée en mémoire (seules ces lignes sont lues).
+    """
+
+    METHODS = ("int8", "pq")
+
+    def __init__(self, store_dir: str, method: str = "int8", rerank_factor: int = 10,
+                 pq_subspaces: int = 96, block_size: int = 65536):
+        """
+        Args:
+            store_dir (str): Répertoire de l'EmbeddingStore. Les codes y sont écrits
+                (int8_* / pq_*) à la première utilisation, et recalculés si le store
+                a été réécrit depuis (voir store_fingerprint).
+            method (str): "int8" ou "pq".
+            rerank_factor (int): Nombre de candidats re-classés exactement, en multiple de k.
+            pq_subspaces (int): Nombre de sous-espaces (la dimension doit en être un multiple).
+            block_size (int): Nombre de vecteurs traités par bloc.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Méthode '{method}' inconnue, méthodes disponibles : {self.METHODS}")
+        super().__init__(store_dir, block_size=block_size)
+        self.method = method
+        self.rerank_factor = rerank_factor
+        self.pq_subspaces = pq_subspaces
+        self.store_dir = store_dir
+        if method == "int8":
+            self.scales, self.codes = self._load_or_build("int8", self._build_int8)
+        else:
+            self.codebooks, self.codes = self._load_or_build("pq", self._build_pq)
+        ratio = self.embeddings.nbytes / max(self.memory_bytes(), 1)
+        print(f"[INFO] Index {method} : {self.memory_bytes() / 1e6:.1f} Mo en mémoire (compression x{ratio:.1f})")
+
+    # -----------------------------
+    # Construction / chargement des codes
+    # -----------------------------
+    def store_fingerprint(self, sample_bytes: int = 1 << 20) -> dict:
+        """
+        Empreinte de embeddings.npy : taille, date de modification et SHA-1 du début et de la
+        fin du fichier. Un store réécrit (nouvelles données, autre modèle, autre découpage),
+        même avec le même nombre de chunks, invalide ainsi les codes déjà calculés.
+        """
+        path = EmbeddingStore(self.store_dir).embeddings_path
+        stat = os.stat(path)
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            digest.update(f.read(sample_bytes))
+            f.seek(max(stat.st_size - sample_bytes, 0))
+            digest.update(f.read(sample_bytes))
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+    def _load_or_build(self, prefix: str, build) -> Tuple[np.ndarray, np.ndarray]:
+        params_path = os.path.join(self.store_dir, f"{prefix}_params.npy")
+        codes_path = os.path.join(self.store_dir, f"{prefix}_codes.npy")
+        source_path = os.path.join(self.store_dir, f"{prefix}_source.json")
+        fingerprint = self.store_fingerprint()
+        if all(os.path.exists(p) for p in (params_path, codes_path, source_path)):
+            with open(source_path, encoding="utf-8") as f:
+                source = json.load(f)
+            params, codes = np.load(params_path), np.load(codes_path)
+            if source == fingerprint and len(codes) == len(self) and \
+                    (prefix != "pq" or params.shape[0] == self.pq_subspaces):
+                return params, codes
+        print(f"[INFO] Construction de l'index {prefix} sur {len(self)} vecteurs...")
+        params, codes = build()
+        np.save(params_path, params)
+        np.save(codes_path, codes)
+        with open(source_path, "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f)
+        return params, codes
+
+    def _build_int8(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Échelle par dimension = max |x| / 127 ; codes = round(x / échelle)."""
+        scales = np.zeros(self.embeddings.shape[1], dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            block = np.abs(self.embeddings[start:start + self.block_size])
+            scales = np.maximum(scales, block.max(axis=0))
+        scales = np.where(scales > 0, scales / 127.0, 1.0).astype(np.float32)
+        codes = np.empty(self.embeddings.shape, dtype=np.int8)
+        for start in range(0, len(self), self.block_size):
+            block = self.embeddings[start:start + self.block_size]
+            codes[start:start + len(block)] = np.clip(np.rint(block / scales), -127, 127)
+        return scales, codes
+
+    def _build_pq(self, train_size: int = 50000) -> Tuple[np.ndarray, np.ndarray]:
+        """Codebooks (m x 256 x dim/m) appris par k-means sur un échantillon, puis encodage."""
+        dim, m = self.embeddings.shape[1], self.pq_subspaces
+        if dim % m:
+            raise ValueError(f"La dimension ({dim}) doit être un multiple de pq_subspaces ({m}).")
+        sub = dim // m
+        rng = np.random.default_rng(0)
+        sample = np.asarray(self.embeddings[np.sort(rng.choice(len(self), min(train_size, len(self)), replace=False))])
+        codebooks = np.stack([kmeans(sample[:, j * sub:(j + 1) * sub], 256) for j in range(m)]).astype(np.float32)
+
+        codes = np.empty((len(self), m), dtype=np.uint8)
+        for start in range(0, len(self), self.block_size):
+            block = np.asarray(self.embeddings[start:start + self.block_size])
+            for j in range(m):
+                codes[start:start + len(block), j] = nearest_centroid(block[:, j * sub:(j + 1) * sub], codebooks[j])
+        return codebooks, codes
+
+    def memory_bytes(self) -> int:
+        """Mémoire occupée par l'index compressé (codes + paramètres)."""
+        params = self.scales if self.method == "int8" else self.codebooks
+        return self.codes.nbytes + params.nbytes
+
+    # -----------------------------
+    # Recherche
+    # -----------------------------
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Similarités approchées (n_requêtes x bloc) calculées sur les codes compressés."""
+        if self.method == "int8":
+            return (queries * self.scales) @ codes.T.astype(np.float32)
+        # PQ : table des produits scalaires requête/centroïde par sous-espace, puis somme des entrées
+        m, sub = self.pq_subspaces, queries.shape[1] // self.pq_subspaces
+        lut = np.einsum("qmd,mcd->qmc", queries.reshape(len(queries), m, sub), self.codebooks) # (q x m x 256)
+        # Accumulation sous-espace par sous-espace : pas de tableau intermédiaire (q x bloc x m)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j in range(m):
+            scores += lut[:, j, codes[:, j]]
+        return scores
+
+    def search(self, query_vectors, k: int = 5, rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche approchée sur les codes, puis re-ranking exact des meilleurs candidats.
+
+        Args:
+            rows (np.ndarray): Sous-ensemble de lignes candidates, toutes les lignes si None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indices, similarités exactes), (n_requêtes x k).
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        n = len(self) if rows is None else len(rows)
+        k = min(k, n)
+        n_candidates = min(max(k * self.rerank_factor, k), n)
+
+        cand_idx = np.empty((len(queries), 0), dtype=np.int64)
+        cand_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, self.block_size):
+            if rows is None:
+                block_rows = np.arange(start, min(start + self.block_size, n))
+                codes = self.codes[start:start + self.block_size]
+            else:
+                block_rows = rows[start:start + self.block_size]
+                codes = self.codes[block_rows]
+            scores = self._approximate_scores(queries, codes)
+            idx = np.concatenate([cand_idx, np.broadcast_to(block_rows, scores.shape)], axis=1)
+            all_scores = np.concatenate([cand_scores, scores], axis=1)
+            if idx.shape[1] > n_candidates:
+                keep = np.argpartition(-all_scores, n_candidates - 1, axis=1)[:, :n_candidates]
+                idx, all_scores = np.take_along_axis(idx, keep, axis=1), np.take_along_axis(all_scores, keep, axis=1)
+            cand_idx, cand_scores = idx, all_scores
+
+        # Re-ranking exact sur les vecteurs float32 des candidats
+        best_idx = np.empty((len(queries), k), dtype=np.int64)
+        best_scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, (q, cand_rows) in enumerate(zip(queries, cand_idx)):
+            cand_rows = np.sort(cand_rows) # Lecture séquentielle dans le fichier projeté
+            exact = np.asarray(self.embeddings[cand_rows]) @ q
+            order = np.argsort(-exact, kind="stable")[:k]
+            best_idx[i], best_scores[i] = cand_rows[order], exact[order]
+        return best_idx, best_scores
+
+
+def recall_at_k(index: NumpySearchIndex, reference: NumpySearchIndex, queries: np.ndarray, k: int = 5) -> float:
+    """
+    Rappel@k moyen de `index` par rapport à la recherche exacte `reference`
+    (proportion des k vrais plus proches voisins retrouvés).
+    """
+    found, _ = index.search(queries, k=k)
+    exact, _ = reference.search(queries, k=k)
+    return float(np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found.tolist(), exact.tolist())]))
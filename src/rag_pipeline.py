@@ -1,7 +1,16 @@
 from src.embedding import OllamaEmbedder
 from src.retrieval import RAGAnalyzer
-from src.storage_chroma import ChromaStorage
-from typing import List, Dict, Tuple
+from src.knn_classifier import KNNVoteClassifier
+from src.response_cache import ResponseCache
+from src.telemetry import AnalysisTrace, PipelineTelemetry
+from src.verdict import VerdictResult, VerdictStream, parse_reason, parse_verdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 
 class RAGPipeline:
@@ -18,6 +27,14 @@ class RAGPipeline:
         chroma_path: str,
         collection_name: str,
         embedding_model: str = "all-minilm",
+        cache_path: str = None,
+        backend: str = "chroma",
+        store_path: str = "data/processed/embedded_chunks_normalized",
+        knn_classifier: KNNVoteClassifier = None,
+        response_cache: ResponseCache = None,
+        telemetry: PipelineTelemetry = None,
+        embedder: OllamaEmbedder = None,
+        bm25_path: str = None,
     ):
         """
         Initialise le pipeline avec les composants nécessaires
@@ -25,17 +42,51 @@ class RAGPipeline:
             chroma_path (str): Chemin de la base vectorielle ChromaDB ("vector_db").
             collection_name (str): Nom de la collection à interroger ("news_articles")
             embedding_model (str): Nom du modèle d'embedding ("all-minilm).
+            cache_path (str): Chemin du cache d'embeddings SQLite (optionnel).
+            backend (str): Moteur de recherche ("chroma", "numpy", "int8" ou "pq", voir RAGAnalyzer).
+            store_path (str): Répertoire de l'EmbeddingStore utilisé par les backends autres que "chroma".
+            knn_classifier (KNNVoteClassifier): Vote des voisins (optionnel) : si sa confiance
+                dépasse le seuil calibré, le verdict est rendu sans appeler le LLM.
+            response_cache (ResponseCache): Cache des réponses (optionnel) : un article déjà
+                analysé, ou quasi identique, est servi sans recherche ni génération.
+            telemetry (PipelineTelemetry): Instrumentation (durées par étape, tokens Ollama,
+                spans OpenTelemetry, journal JSON). Par défaut : mesures en mémoire seulement.
+            embedder (OllamaEmbedder): Embedder des requêtes (optionnel), par exemple un
+                OnnxEmbedder qui vectorise dans le processus sans appel HTTP.
+            bm25_path (str): Répertoire de l'index BM25 (optionnel) : recherche hybride
+                lexicale + vectorielle (voir RAGAnalyzer).
         """
-        print(
-            f"[INIT] Initialisation du pipeline RAG avec modèle '{embedding_model}'..."
+        logger.info("Initialisation du pipeline RAG avec modèle '%s'...", embedding_model)
+        self.retriever = RAGAnalyzer(
+            chroma_path,
+            collection_name,
+            embedding_model,
+            cache_path=cache_path,
+            backend=backend,
+            store_path=store_path,
+            embedder=embedder,
+            bm25_path=bm25_path,
         )
-        self.embedder = OllamaEmbedder(model_name=embedding_model)
-        self.retriever = RAGAnalyzer(chroma_path, collection_name, embedding_model)
+        self.embedder = self.retriever.embedder
+        self.batch_stats = {} # Débits par étape de la dernière analyse groupée
+        self.knn_classifier = knn_classifier
+        self.knn_stats = {"requests": 0, "short_circuited": 0}
+        self._knn_lock = threading.Lock()
+        self.embedding_model = embedding_model
+        self.response_cache = response_cache
+        self.telemetry = telemetry or PipelineTelemetry()
 
     # Analyse complète d'un article utilisateur
 
     def analyze_article(
-        self, text: str, model_name: str = "llama3.2", n_results: int = 5
+        self,
+        text: str,
+        model_name: str = "llama3.2",
+        n_results: int = 5,
+        label=None,
+        subject=None,
+        date_from=None,
+        date_to=None,
     ) -> Tuple[str, List[str], List[Dict]]:
         """
         Analyse un texte utilisateur en le comparant à la base vectorielle
@@ -44,31 +95,390 @@ class RAGPipeline:
             text (str): Texte de l'article à analyser.
             model_name (str): Modèle de génération textuelle ("llama3.2 ou phi3:mini").
             n_results (int): Nombre de chunks similaires à récupérer
+            label, subject, date_from, date_to: Filtres de métadonnées appliqués à la
+                recherche (voir RAGAnalyzer.retrieve_similar_docs)
 
         Return:
             str: Réponse générée par le modèle
         """
+        filters = {"label": label, "subject": subject, "date_from": date_from, "date_to": date_to}
+        with self.telemetry.analysis(model=model_name, n_results=n_results) as run:
+            scope, query_vector, cached = self._vectorize_or_cached(text, model_name, n_results, filters, run)
+            if cached is not None:
+                return cached["response"], cached["docs"], cached["metas"]
+
+            docs, metas, distances = self._search(query_vector, n_results, run, query_text=text, **filters)
+
+            shortcut = self._knn_shortcut(metas, distances, run)
+            if shortcut is not None:
+                logger.info("Verdict rendu par le vote des voisins (LLM non appelé)")
+                self._cache_response(scope, text, query_vector, shortcut.raw, docs, metas)
+                return shortcut.raw, docs, metas
+
+            prompt = self._build_prompt(text, docs, metas, run)
+
+            logger.debug("Etape 5 - Envoi du prompt au modèle...")
+            run.attributes["outcome"] = "llm"
+            with run.stage("generate"):
+                response = self.retriever.generate_response(prompt, model_name, stats=run.ollama)
+            self._cache_response(scope, text, query_vector, response, docs, metas)
+
+            logger.info("Réponse générée")
+            return response, docs, metas
+
+    def stream_article(
+        self,
+        text: str,
+        model_name: str = "llama3.2",
+        n_results: int = 5,
+        stop_after: str = None,
+        **filters,
+    ) -> Tuple[VerdictStream, List[str], List[Dict]]:
+        """
+        Variante en flux de analyze_article : la recherche est faite immédiatement, la réponse
+        est un VerdictStream à itérer pour recevoir les tokens au fil de la génération.
+
+        Args:
+            stop_after (str): None, "verdict" ou "reason" (arrêt anticipé, voir VerdictStream).
+            filters: Filtres de métadonnées (label, subject, date_from, date_to).
+
+        Return:
+            Tuple[VerdictStream, List[str], List[Dict]]: (flux de la réponse, docs, metas)
+        """
+        # Le suivi reste ouvert jusqu'à la fin du flux (voir _traced_tokens)
+        run = self.telemetry.start("rag.stream_article", model=model_name, n_results=n_results)
+        try:
+            scope, query_vector, cached = self._vectorize_or_cached(text, model_name, n_results, filters, run)
+            if cached is not None:
+                run.finish()
+                return VerdictStream(iter([cached["response"]]), stop_after=stop_after), cached["docs"], cached["metas"]
+
+            docs, metas, distances = self._search(query_vector, n_results, run, query_text=text, **filters)
+            shortcut = self._knn_shortcut(metas, distances, run)
+            if shortcut is not None:
+                run.finish()
+                self._cache_response(scope, text, query_vector, shortcut.raw, docs, metas)
+                return VerdictStream(iter([shortcut.raw]), stop_after=stop_after), docs, metas
+
+            prompt = self._build_prompt(text, docs, metas, run)
+        except BaseException:
+            run.finish()
+            raise
+        logger.debug("Etape 5 - Envoi du prompt au modèle (flux)...")
+        run.attributes["outcome"] = "llm"
+        tokens = self._traced_tokens(self.retriever.stream_tokens(prompt, model_name, stats=run.ollama), run)
+        if self.response_cache is not None:
+            tokens = self._caching_tokens(tokens, scope, text, query_vector, docs, metas)
+        return VerdictStream(tokens, stop_after=stop_after), docs, metas
+
+    def fast_verdict(
+        self,
+        text: str,
+        model_name: str = "llama3.2",
+        n_results: int = 5,
+        num_predict: int = 48,
+        **filters,
+    ) -> Tuple[VerdictResult, List[str], List[Dict]]:
+        """
+        Mode verdict rapide : sortie JSON contrainte et courte, sans explication.
+
+        L'explication peut être demandée ensuite avec `explain` (second appel au modèle).
+
+        Args:
+            num_predict (int): Nombre maximal de tokens générés.
+            filters: Filtres de métadonnées (label, subject, date_from, date_to).
+
+        Return:
+            Tuple[VerdictResult, List[str], List[Dict]]: (verdict typé, docs, metas)
+        """
+        with self.telemetry.analysis("rag.fast_verdict", model=model_name, n_results=n_results) as run:
+            with run.stage("embed"):
+                query_vector = self.retriever.vectorize_query(text)
+            docs, metas, distances = self._search(query_vector, n_results, run, query_text=text, **filters)
+            shortcut = self._knn_shortcut(metas, distances, run)
+            if shortcut is not None:
+                return shortcut, docs, metas
+            with run.stage("prompt"):
+                prompt = self.retriever.build_verdict_prompt(text, docs, metas)
+            run.attributes["outcome"] = "llm"
+            with run.stage("generate"):
+                result = self.retriever.generate_verdict(
+                    prompt, metas, model_name, num_predict=num_predict, stats=run.ollama
+                )
+            logger.info("Verdict : %s (confiance %.2f)", result.verdict, result.confidence)
+            return result, docs, metas
+
+    def explain(
+        self,
+        text: str,
+        result: VerdictResult,
+        docs: List[str],
+        metas: List[Dict],
+        model_name: str = "llama3.2",
+    ) -> str:
+        """
+        Justification à la demande d'un verdict rendu par `fast_verdict` ; elle est
+        aussi conservée dans `result.explanation`.
+        """
+        context = self.retriever.build_context(docs, metas)
+        prompt = self.retriever.build_explanation_prompt(text, context, result)
+        result.explanation = self.retriever.generate_response(prompt, model_name)
+        return result.explanation
 
-        print("\n[INFO] Etape 1 - Vectorisation du texte utilisateur...")
-        query_vector = self.retriever.vectorize_query(text)
+    def _search(self, query_vector, n_results: int, run: AnalysisTrace, query_text: str = None,
+                **filters) -> Tuple[List[str], List[Dict], List[float]]:
+        """Etape 2 : recherche des chunks similaires (avec les distances, pour le vote kNN)."""
+        logger.debug("Étape 2 - Recherche des articles similaires dans la base vectorielle...")
+        with run.stage("query"):
+            return self.retriever.retrieve_similar_docs(
+                query_vector, n_results=n_results, return_distances=True, query_text=query_text, **filters
+            )
 
-        print(
-            "[INFO] Étape 2 - Recherche des articles similaires dans la base vectorielle..."
+    def _vectorize_or_cached(self, text: str, model_name: str, n_results: int, filters: Dict, run: AnalysisTrace):
+        """
+        Etape 1 avec le cache de réponses : hit exact avant la vectorisation, puis
+        recherche d'un quasi-doublon sur le vecteur de la requête.
+
+        Returns:
+            (portée du cache, vecteur de la requête, réponse en cache ou None)
+        """
+        scope = None
+        if self.response_cache is not None:
+            scope = ResponseCache.make_scope(
+                model_name, n_results, embedding_model=self.embedding_model, **filters
+            )
+            with run.stage("cache"):
+                cached = self.response_cache.get_exact(scope, text)
+            if cached is not None:
+                logger.info("Réponse servie par le cache (texte identique)")
+                run.attributes["outcome"] = "cache_exact"
+                return scope, None, cached
+
+        logger.debug("Etape 1 - Vectorisation du texte utilisateur...")
+        with run.stage("embed"):
+            query_vector = self.retriever.vectorize_query(text)
+
+        if self.response_cache is not None:
+            with run.stage("cache"):
+                similar = self.response_cache.get_similar(scope, query_vector)
+            stats = self.response_cache.stats()
+            logger.info(
+                "Cache des réponses : hit rate %.1f%% (%d exacts, %d quasi-doublons, %d misses)",
+                100 * stats["hit_rate"], stats["exact_hits"], stats["semantic_hits"], stats["misses"],
+            )
+            if similar is not None:
+                cached, similarity = similar
+                logger.info("Réponse servie par le cache (quasi-doublon, similarité %.3f)", similarity)
+                run.attributes["outcome"] = "cache_similar"
+                return scope, query_vector, cached
+        return scope, query_vector, None
+
+    def _caching_tokens(self, tokens, scope: str, text: str, query_vector, docs, metas):
+        """Transmet les tokens et met la réponse en cache une fois le flux terminé, si elle contient verdict et justification."""
+        response = ""
+        try:
+            for token in tokens:
+                response += token
+                yield token
+        finally:
+            tokens.close()
+            if parse_verdict(response) is not None and parse_reason(response):
+                self._cache_response(scope, text, query_vector, response, docs, metas)
+
+    def _traced_tokens(self, tokens, run: AnalysisTrace):
+        """Transmet les tokens en mesurant la génération (dont le délai du premier token), puis clôt le suivi."""
+        start = time.perf_counter()
+        first_token = True
+        try:
+            for token in tokens:
+                if first_token:
+                    run.attributes["first_token_ms"] = (time.perf_counter() - start) * 1000
+                    first_token = False
+                yield token
+        finally:
+            tokens.close()
+            run.record_stage("generate", (time.perf_counter() - start) * 1000)
+            run.finish()
+
+    def _cache_response(self, scope: str, text: str, query_vector, response: str, docs, metas):
+        if self.response_cache is not None:
+            self.response_cache.put(scope, text, query_vector, {"response": response, "docs": docs, "metas": metas})
+
+    def _build_prompt(self, text: str, docs: List[str], metas: List[Dict], run: AnalysisTrace) -> str:
+        """Etapes 3 et 4 : contexte et prompt."""
+        logger.debug("Étape 3 - Construction du contexte à partir des résultats...")
+        with run.stage("context"):
+            context = self.retriever.build_context(docs, metas)
+
+        logger.debug("Etape 4 - Génération du prompt pour le modèle...")
+        with run.stage("prompt"):
+            return self.retriever.build_prompt(text, context)
+
+    # Court-circuit du LLM par le vote des voisins
+
+    def _knn_shortcut(self, metas: List[Dict], distances: List[float], run: AnalysisTrace = None) -> VerdictResult:
+        """
+        Verdict du vote kNN si sa confiance dépasse le seuil, None sinon (appel au LLM).
+        La réponse textuelle (`raw`) suit le format "Verdict: ...\nReason: ..." du LLM.
+        """
+        if self.knn_classifier is None:
+            return None
+        label, confidence = self.knn_classifier.predict(metas, distances)
+        shortcut = label is not None and self.knn_classifier.is_confident(confidence)
+        with self._knn_lock:
+            self.knn_stats["requests"] += 1
+            self.knn_stats["short_circuited"] += int(shortcut)
+        if not shortcut:
+            return None
+
+        verdict = "TRUE" if label == 1 else "FAKE"
+        agreeing = [m for m in metas if m.get("label") is not None and int(m["label"]) == label]
+        reason = (
+            f"{len(agreeing)} of the {len(metas)} most similar reference excerpts are labelled {verdict} "
+            f"(similarity-weighted vote, confidence {confidence:.2f})."
         )
-        docs, metas = self.retriever.retrieve_similar_docs(
-            query_vector, n_results=n_results
+        logger.info("Vote kNN : verdict %s (confiance %.2f >= %.2f)", verdict, confidence, self.knn_classifier.threshold)
+        if run is not None:
+            run.attributes["outcome"] = "knn"
+        return VerdictResult(
+            verdict=verdict,
+            confidence=confidence,
+            cited_chunk_ids=[m.get("chunk_id") for m in agreeing if m.get("chunk_id") is not None],
+            raw=f"Verdict: {verdict}\nReason: {reason}",
+            explanation=reason,
         )
 
-        print("[INFO] Étape 3 - Construction du contexte à partir des résultats...")
-        context = self.retriever.build_context(docs, metas)
+    @property
+    def short_circuit_rate(self) -> float:
+        """Part des requêtes dont le verdict a été rendu sans LLM."""
+        with self._knn_lock:
+            requests, short_circuited = self.knn_stats["requests"], self.knn_stats["short_circuited"]
+        return short_circuited / requests if requests else 0.0
+
+    # Analyse groupée de plusieurs articles
+
+    def analyze_articles(
+        self,
+        texts: List[str],
+        model_name: str = "llama3.2",
+        n_results: int = 5,
+        max_concurrency: int = 4,
+        fast: bool = False,
+        label=None,
+        subject=None,
+        date_from=None,
+        date_to=None,
+    ) -> Iterator[Tuple[int, str, List[str], List[Dict]]]:
+        """
+        Analyse un lot d'articles : vectorisation groupée, une seule recherche multi-vecteurs,
+        puis génération avec une concurrence bornée.
+
+        Les verdicts rendus par le vote kNN (voir knn_classifier) sont produits en premier,
+        puis les résultats du LLM au fil de l'eau, dans l'ordre de fin de génération ;
+        la position de chaque article dans `texts` est renvoyée avec son résultat.
+        Les débits par étape sont disponibles dans `self.batch_stats` une fois le lot terminé.
+
+        Args:
+            texts (List[str]): Articles à analyser.
+            model_name (str): Modèle de génération textuelle.
+            n_results (int): Nombre de chunks similaires à récupérer par article.
+            max_concurrency (int): Nombre maximal de générations Ollama simultanées.
+            fast (bool): Mode verdict rapide (voir fast_verdict) : la réponse est alors
+                un VerdictResult au lieu du texte complet.
+            label, subject, date_from, date_to: Filtres de métadonnées (voir analyze_article).
+
+        Yields:
+            Tuple[int, str | VerdictResult, List[str], List[Dict]]: (position, réponse, docs, metas).
+        """
+        texts = list(texts)
+        self.batch_stats = {}
+        if not texts:
+            return
+
+        logger.info("Analyse groupée de %d articles...", len(texts))
+        run = self.telemetry.start(
+            "rag.analyze_articles", model=model_name, n_results=n_results, batch_size=len(texts)
+        )
+        try:
+            start = time.perf_counter()
+            with run.stage("embed"):
+                query_vectors = self.retriever.vectorize_queries(texts)
+            self._record_stage("embedding", len(texts), start)
+
+            start = time.perf_counter()
+            with run.stage("query"):
+                retrieved = self.retriever.retrieve_batch(
+                    query_vectors,
+                    n_results=n_results,
+                    label=label,
+                    subject=subject,
+                    date_from=date_from,
+                    date_to=date_to,
+                    return_distances=True,
+                    query_texts=texts,
+                )
+            self._record_stage("retrieval", len(texts), start)
+
+            # Verdicts rendus par le vote des voisins : produits immédiatement, sans génération
+            pending = []
+            for i, (docs, metas, distances) in enumerate(retrieved):
+                shortcut = self._knn_shortcut(metas, distances)
+                if shortcut is None:
+                    pending.append(i)
+                else:
+                    yield i, shortcut if fast else shortcut.raw, docs, metas
+            run.attributes["knn"] = len(texts) - len(pending)
+            run.attributes["llm"] = len(pending)
+
+            with run.stage("prompt"):
+                if fast:
+                    prompts = {i: self.retriever.build_verdict_prompt(texts[i], *retrieved[i][:2]) for i in pending}
+                else:
+                    prompts = {
+                        i: self.retriever.build_prompt(texts[i], self.retriever.build_context(*retrieved[i][:2]))
+                        for i in pending
+                    }
 
-        print(f"[INFO] Etape 4 - Génération du prompt pour le modèle...")
-        prompt = self.retriever.build_prompt(text, context)
+            def generate(i: int, prompt: str):
+                """Génération d'un article ; durée cumulée dans l'étape "generate" du lot."""
+                stats = {}
+                with run.stage("generate"):
+                    if fast:
+                        result = self.retriever.generate_verdict(prompt, retrieved[i][1], model_name, stats=stats)
+                    else:
+                        result = self.retriever.generate_response(prompt, model_name, stats=stats)
+                return result, stats
 
-        print(f"[INFO] Etape 5 - Envoi du prompt au modèle...")
-        response = self.retriever.generate_response(prompt, model_name)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures = {executor.submit(generate, i, prompt): i for i, prompt in prompts.items()}
+                try:
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        result, stats = future.result()
+                        for field, value in stats.items(): # Tokens et durées Ollama cumulés sur le lot
+                            run.ollama[field] = run.ollama.get(field, 0) + value
+                        docs, metas, _ = retrieved[i]
+                        yield i, result, docs, metas
+                finally:
+                    for future in futures: # Itération interrompue : les générations non démarrées sont annulées
+                        future.cancel()
+            self._record_stage("generation", len(pending), start)
+        finally:
+            run.finish()
 
-        print("\n [SUCCESS] Réponse générée : \n")
+        for stage, stats in self.batch_stats.items():
+            logger.info(
+                "%-10s : %d articles en %.2fs (%.1f articles/s)",
+                stage, stats["items"], stats["seconds"], stats["items_per_s"],
+            )
+        if self.knn_classifier is not None:
+            logger.info("vote kNN   : %.1f%% des requêtes rendues sans LLM", 100 * self.short_circuit_rate)
 
-        # return response
-        return response, docs, metas
+    def _record_stage(self, stage: str, items: int, start: float):
+        seconds = time.perf_counter() - start
+        self.batch_stats[stage] = {
+            "items": items,
+            "seconds": seconds,
+            "items_per_s": items / seconds if seconds > 0 else float("inf"),
+        }
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _ScopeVectors:
+    """
+    Vecteurs des requêtes d'une portée : matrice agrandie par doublement de capacité,
+    suppression par échange avec la dernière ligne (O(1) par entrée).
+    """
+
+    def __init__(self, dim: int):
+        self.keys = []
+        self.rows = {} # {clé: ligne}
+        self.dates = np.empty(16)
+        self.matrix = np.empty((16, dim), np.float32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set(self, key: str, created: float, vector: np.ndarray) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.matrix):
+                self.dates = np.resize(self.dates, 2 * row)
+                self.matrix = np.resize(self.matrix, (2 * row, self.matrix.shape[1]))
+            self.keys.append(key)
+            self.rows[key] = row
+        self.dates[row], self.matrix[row] = created, vector
+
+    def remove(self, key: str) -> None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row], self.rows[moved] = moved, row
+            self.dates[row], self.matrix[row] = self.dates[last], self.matrix[last]
+        self.keys.pop()
+
+
+class ResponseCache:
+    """
+    Cache persistant (SQLite) des analyses complètes, placé devant RAGPipeline.analyze_article.
+
+    - hit exact : même texte (aux espaces près) pour la même portée ;
+    - hit sémantique : vecteur de la requête à une similarité cosinus >= `similarity_threshold`
+      d'une requête déjà analysée (même article légèrement modifié), le verdict est réutilisé.
+
+    La portée d'une entrée regroupe tout ce qui change la réponse : modèle de génération,
+    n_results, modèle d'embedding et filtres de recherche (voir make_scope).
+    Les entrées expirent après `ttl` secondes ; au-delà de `max_entries`, les moins
+    récemment utilisées sont supprimées (LRU) par lots, jusqu'à 90 % de `max_entries`.
+    """
+
+    def __init__(self, path: str = "data/cache/responses.sqlite", ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 50_000, similarity_threshold: float = 0.97):
+        """
+        Args:
+            path (str): Chemin de la base SQLite (":memory:" pour un cache non persistant).
+            ttl (float): Durée de validité d'une réponse, en secondes.
+            max_entries (int): Nombre maximal de réponses conservées.
+            similarity_threshold (float): Similarité cosinus minimale d'un hit sémantique.
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, scope TEXT NOT NULL, vector BLOB, payload TEXT NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created)")
+        self._conn.commit()
+        self._index = {}
+        self._load_vectors()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self._next_purge = 0.0
+        self._purge_expired()
+        logger.info("ResponseCache '%s' (%d réponses, ttl=%.0fs)", path, self._count, ttl)
+
+    @staticmethod
+    def make_scope(model_name: str, n_results: int, **extra) -> str:
+        """Portée d'une réponse : modèle, n_results et paramètres supplémentaires (filtres, embedding)."""
+        params = {"model": model_name, "n_results": n_results, **{k: v for k, v in extra.items() if v is not None}}
+        return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(scope: str, text: str) -> str:
+        """Clé exacte : SHA-256 de (portée, texte aux espaces normalisés)."""
+        return hashlib.sha256(f"{scope}\x00{' '.join(text.split())}".encode("utf-8")).hexdigest()
+
+    # -----------------------------
+    # Index en mémoire des vecteurs (recherche des quasi-doublons)
+    # -----------------------------
+    def _load_vectors(self) -> None:
+        """Charge les vecteurs des requêtes, regroupés par portée : {portée: _ScopeVectors}."""
+        rows = self._conn.execute("SELECT key, scope, vector, created FROM responses WHERE vector IS NOT NULL")
+        for key, scope, blob, created in rows:
+            self._set_vector(scope, key, created, np.frombuffer(blob, dtype=np.float32))
+
+    def _set_vector(self, scope: str, key: str, created: float, vector: np.ndarray) -> None:
+        vectors = self._index.get(scope)
+        if vectors is None or vectors.matrix.shape[1] != len(vector):
+            vectors = self._index[scope] = _ScopeVectors(len(vector))
+        vectors.set(key, created, vector)
+
+    def _delete(self, entries) -> None:
+        """Supprime des entrées [(clé, portée)] de la base et de l'index en mémoire (sans commit)."""
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in entries])
+        self._count -= len(entries)
+        for key, scope in entries:
+            if scope in self._index:
+                self._index[scope].remove(key)
+
+    def _purge_expired(self) -> int:
+        """Supprime les entrées expirées (au plus une fois par dixième de ttl)."""
+        now = time.time()
+        if now < self._next_purge:
+            return 0
+        self._next_purge = now + self.ttl / 10
+        expired = self._conn.execute(
+            "SELECT key, scope FROM responses WHERE created < ?", (now - self.ttl,)
+        ).fetchall()
+        self._delete(expired)
+        self._conn.commit()
+        return len(expired)
+
+    def _evict(self) -> None:
+        """LRU par lot : ramène le cache à 90 % de max_entries."""
+        self._next_purge = 0.0
+        self._purge_expired()
+        target = math.ceil(0.9 * self.max_entries)
+        if self._count > target:
+            self._delete(self._conn.execute(
+                "SELECT key, scope FROM responses ORDER BY last_access ASC LIMIT ?", (self._count - target,)
+            ).fetchall())
+            self._conn.commit()
+
+    # -----------------------------
+    # Lecture / écriture
+    # -----------------------------
+    def _fetch(self, key: str) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT payload FROM responses WHERE key = ? AND created >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return json.loads(row[0])
+
+    def get_exact(self, scope: str, text: str) -> Optional[dict]:
+        """Réponse enregistrée pour ce texte exact (None sinon ; ne compte pas encore de miss)."""
+        with self._lock:
+            payload = self._fetch(self.make_key(scope, text))
+            if payload is not None:
+                self.exact_hits += 1
+            return payload
+
+    def get_similar(self, scope: str, vector) -> Optional[Tuple[dict, float]]:
+        """
+        Réponse d'une requête quasi identique (similarité cosinus >= similarity_threshold).
+        Un échec est compté comme miss : cet appel suit toujours get_exact.
+
+        Returns:
+            Optional[Tuple[dict, float]]: (réponse, similarité) ou None.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            vectors = self._index.get(scope)
+            if vectors is not None and len(vectors) and vectors.matrix.shape[1] == len(query):
+                n = len(vectors)
+                sims = np.where(vectors.dates[:n] >= time.time() - self.ttl, vectors.matrix[:n] @ query, -np.inf)
+                best = int(np.argmax(sims))
+                if sims[best] >= self.similarity_threshold:
+                    payload = self._fetch(vectors.keys[best])
+                    if payload is not None:
+                        self.semantic_hits += 1
+                        return payload, float(sims[best])
+            self.misses += 1
+            return None
+
+    def put(self, scope: str, text: str, vector, payload: dict) -> None:
+        """Enregistre une réponse (payload sérialisable en JSON), puis applique TTL et LRU."""
+        key = self.make_key(scope, text)
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, blob, json.dumps(payload, default=str), now, now),
+            )
+            self._conn.commit()
+            self._count += not exists
+            if blob is not None:
+                self._set_vector(scope, key, now, np.frombuffer(blob, dtype=np.float32))
+            elif scope in self._index:
+                self._index[scope].remove(key)
+            if self._count > self.max_entries:
+                self._evict()
+            else:
+                self._purge_expired()
+
+    # -----------------------------
+    # Statistiques
+    # -----------------------------
+    def stats(self) -> dict:
+        """Compteurs de hits (exacts / sémantiques) et de misses depuis l'ouverture du cache."""
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": self._count,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
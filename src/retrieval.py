@@ -1,24 +1,94 @@
+import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import ollama
 import chromadb
 # from chromadb.utils import embedding_functions
 from tqdm import tqdm
 from src import embedding
 from src.embedding import OllamaEmbedder
+from src.embedding_cache import EmbeddingCache
+from src.bm25_index import BM25Index, reciprocal_rank_fusion
+from src.numpy_index import NumpySearchIndex
+from src.quantized_index import QuantizedSearchIndex
+from src.metadata_index import chroma_where
+from src.storage_chroma import ChromaStorage
+from src.verdict import VERDICT_SCHEMA, VerdictResult, VerdictStream
+from src.telemetry import ollama_stats
+
+logger = logging.getLogger(__name__)
+
+# Pool partagé par tous les analyseurs pour les recherches BM25 (threads créés à la demande)
+_LEXICAL_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
 
 class RAGAnalyzer:
     """
     Analyse d'un article en se basant sur les données de la base vectorielle.
     """
+
+    BACKENDS = ("chroma", "numpy", "int8", "pq")
+
     def __init__(self, chroma_path="data/vector_db", 
                 collection_name="news_articles", 
-                embedding_model="all-minilm" ):
-        # Connexion à la base vectorielle
-        self.client = chromadb.PersistentClient(path=chroma_path)
-        self.collection = self.client.get_collection(collection_name)
-        print(f"[INFO] Collection '{collection_name}' chargée depuis '{chroma_path}'")
+                embedding_model="all-minilm",
+                cache_path=None,
+                backend="chroma",
+                store_path="data/processed/embedded_chunks_normalized",
+                embedder: OllamaEmbedder = None,
+                bm25_path=None,
+                rrf_k=60):
+        """
+        Args:
+            cache_path (str): Chemin du cache d'embeddings SQLite (optionnel) : une requête
+                déjà soumise n'est pas re-vectorisée.
+            backend (str): Moteur de recherche : "chroma" (collection.query), "numpy"
+                (recherche exacte en mémoire sur l'EmbeddingStore, voir NumpySearchIndex),
+                "int8" ou "pq" (index compressé avec re-ranking exact, voir QuantizedSearchIndex).
+            store_path (str): Répertoire de l'EmbeddingStore (backends autres que "chroma").
+            embedder (OllamaEmbedder): Embedder des requêtes (optionnel), par exemple un
+                OnnxEmbedder local. Par défaut : OllamaEmbedder(embedding_model).
+            bm25_path (str): Répertoire de l'index BM25 (optionnel, voir BM25Index.build) :
+                recherche hybride, les chunks trouvés par la recherche lexicale (noms propres,
+                nombres, citations exactes) sont fusionnés avec les résultats vectoriels.
+            rrf_k (int): Constante de la Reciprocal Rank Fusion (60 par défaut).
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend '{backend}' inconnu, backends disponibles : {self.BACKENDS}")
+        self.backend = backend
+        self.index = None
+        if backend == "chroma":
+            # Connexion à la base vectorielle
+            self.client = chromadb.PersistentClient(path=chroma_path)
+            self.collection = self.client.get_collection(collection_name)
+            logger.info("Collection '%s' chargée depuis '%s'", collection_name, chroma_path)
+            if ChromaStorage.needs_date_backfill(self.collection):
+                logger.warning(
+                    "Collection '%s' sans champ '%s' : les filtres de dates ne renverront aucun résultat. "
+                    "Relancer build_vector_db.py --sync (ou reconstruire la base) pour l'ajouter.",
+                    collection_name, ChromaStorage.DATE_NUMERIC_COLUMN,
+                )
+        else:
+            self.client, self.collection = None, None
+            if backend == "numpy":
+                self.index = NumpySearchIndex(store_path)
+            else:
+                self.index = QuantizedSearchIndex(store_path, method=backend)
         # Initialisation de l'embeddeur
-        self.embedder = OllamaEmbedder(model_name=embedding_model)
+        cache = EmbeddingCache(cache_path) if cache_path else None
+        if embedder is not None:
+            if embedder.cache is None:
+                embedder.cache = cache
+            self.embedder = embedder
+        else:
+            self.embedder = OllamaEmbedder(model_name=embedding_model, cache=cache)
+        # Index lexical : interrogé dans un thread pendant la recherche vectorielle
+        self.lexical = BM25Index(bm25_path) if bm25_path else None
+        if self.lexical is not None:
+            if self.index is not None and len(self.lexical) != len(self.index):
+                raise ValueError(f"Index BM25 ({len(self.lexical)} chunks) non aligné sur le store ({len(self.index)} chunks)")
+            if self.index is None and not len(self.lexical.chunk_ids):
+                raise ValueError("Index BM25 construit sans chunk_ids : requis pour le backend 'chroma'")
+        self.rrf_k = rrf_k
     
     # Vectorisation et normalisation du texte utilisateur
     def vectorize_query(self, text: str) -> list:
@@ -30,31 +100,154 @@ class RAGAnalyzer:
         embeddings = self.embedder.embed_texts([text])
         return embeddings[0] if embeddings else []
 
+    def vectorize_queries(self, texts: list) -> list:
+        """
+        Vectorise et normalise un lot de textes utilisateur en un seul passage
+        (batchs Ollama parallèles, voir OllamaEmbedder.embed_texts).
+        """
+        empty = [i for i, t in enumerate(texts) if not t.strip()]
+        if empty:
+            raise ValueError(f"Textes utilisateur vides aux positions {empty}")
+        return self.embedder.embed_texts(texts)
+
     
     # Recherche dans la base vectorielle de documents similaires
-    def retrieve_similar_docs(self, query_vector, n_results=5):
+    def retrieve_similar_docs(self, query_vector, n_results=5, label=None, subject=None,
+                              date_from=None, date_to=None, return_distances=False, query_text=None):
         """
         Recherche les documents les plus similaires à un vecteur
+
+        Les filtres sont appliqués avant la recherche (clause `where` pour Chroma, listes de
+        postings du MetadataIndex pour les autres backends) : les n_results documents
+        retournés satisfont tous les filtres.
+
+        Args:
+            label: Label(s) acceptés (0 = FAKE, 1 = TRUE).
+            subject: Sujet(s) acceptés (ex. "politicsNews").
+            date_from: Date minimale incluse ("AAAA-MM-JJ", datetime ou entier AAAAMMJJ).
+            date_to: Date maximale incluse.
+            return_distances (bool): Renvoie aussi les distances (docs, metas, distances).
+            query_text (str): Texte de la requête : si un index BM25 est chargé, recherche
+                hybride (voir _hybrid_batch). Les distances restent les distances vectorielles.
         """
-        results = self.collection.query(query_embeddings=[query_vector], n_results=n_results)
-        docs = results["documents"][0]
-        metas = results["metadatas"][0]
-        distances = results["distances"][0]
+        filters = {"label": label, "subject": subject, "date_from": date_from, "date_to": date_to}
+        if self.lexical is not None and query_text:
+            docs, metas, distances = self._hybrid_batch([query_vector], [query_text], n_results, filters)[0]
+        elif self.index is not None:
+            docs, metas, distances = self.index.retrieve_similar_docs(query_vector, n_results=n_results, **filters)
+        else:
+            results = self.collection.query(query_embeddings=[query_vector], n_results=n_results,
+                                            where=chroma_where(**filters))
+            docs = results["documents"][0]
+            metas = self._with_chunk_ids(results["metadatas"][0], results["ids"][0])
+            distances = results["distances"][0]
         
-        print(f"\n[INFO] {len(docs)} documents similaires retrouvés :")
-        for d, dist in zip(docs, distances):
-            print(f" - distance={dist:.4f}")
-            print(f" - extrait={d}")
+        logger.info("%d documents similaires retrouvés", len(docs))
+        if logger.isEnabledFor(logging.DEBUG): # Extraits complets : seulement en mode debug
+            for d, dist in zip(docs, distances):
+                logger.debug(" - distance=%.4f extrait=%s", dist, d)
             
+        if return_distances:
+            return docs, metas, distances
         return docs, metas
     
+    def retrieve_batch(self, query_vectors, n_results=5, label=None, subject=None,
+                       date_from=None, date_to=None, return_distances=False, query_texts=None):
+        """
+        Recherche groupée : une seule requête multi-vecteurs (Chroma) ou un seul parcours
+        de l'index pour tous les vecteurs. Mêmes filtres que retrieve_similar_docs.
+
+        Args:
+            query_texts (list): Textes des requêtes (recherche hybride si un index BM25 est chargé).
+
+        Returns:
+            list: Un tuple (docs, metas) par vecteur, dans l'ordre des requêtes
+            ((docs, metas, distances) si return_distances).
+        """
+        if len(query_vectors) == 0:
+            return []
+        filters = {"label": label, "subject": subject, "date_from": date_from, "date_to": date_to}
+        if self.lexical is not None and query_texts is not None:
+            results = self._hybrid_batch(query_vectors, query_texts, n_results, filters)
+        else:
+            results = self._vector_batch(query_vectors, n_results, filters)
+        if return_distances:
+            return results
+        return [(docs, metas) for docs, metas, _ in results]
+
+    def _vector_batch(self, query_vectors, n_results, filters):
+        """Recherche vectorielle groupée : (docs, metas, distances) par vecteur."""
+        if self.index is not None:
+            return self.index.retrieve_batch(query_vectors, n_results=n_results, **filters)
+        raw = self.collection.query(query_embeddings=list(query_vectors), n_results=n_results,
+                                    where=chroma_where(**filters))
+        return [(docs, self._with_chunk_ids(metas, ids), distances) for docs, metas, ids, distances
+                in zip(raw["documents"], raw["metadatas"], raw["ids"], raw["distances"])]
+
+    # Recherche hybride (BM25 + vecteurs)
+    def _hybrid_batch(self, query_vectors, query_texts, n_results, filters):
+        """
+        Recherche hybride : pour chaque requête, les recherches lexicale (BM25, dans le pool
+        partagé _LEXICAL_POOL) et vectorielle s'exécutent en parallèle sur max(4 x n_results, 20) candidats,
+        puis les deux classements sont fusionnés par Reciprocal Rank Fusion (clé : chunk_id).
+
+        Les chunks trouvés uniquement par BM25 reçoivent leur distance vectorielle réelle
+        (calculée à partir de leur embedding), le vote kNN reste donc cohérent.
+        """
+        n_candidates = max(n_results * 4, 20)
+        lexical = [_LEXICAL_POOL.submit(self._lexical_rows, text, n_candidates, filters) for text in query_texts]
+        vector = self._vector_batch(query_vectors, n_candidates, filters)
+        return [
+            self._fuse(np.asarray(q, dtype=np.float32), vec, rows.result(), n_results, filters)
+            for q, vec, rows in zip(query_vectors, vector, lexical)
+        ]
+
+    def _lexical_rows(self, text, k, filters):
+        """Lignes BM25 des k meilleurs chunks, filtres de métadonnées appliqués si possible avant le score."""
+        if self.index is not None:
+            # Mêmes lignes que l'EmbeddingStore : les filtres sont résolus par le MetadataIndex
+            return self.lexical.search(text, k=k, rows=self.index.metadata_index.rows(**filters))[0]
+        # Chroma : filtres appliqués après coup (collection.get), d'où une marge de candidats
+        filtered = any(v is not None for v in filters.values())
+        return self.lexical.search(text, k=k * 4 if filtered else k)[0]
+
+    def _fuse(self, query_vector, vector_result, lexical_rows, n_results, filters):
+        docs, metas, distances = vector_result
+        found = {m["chunk_id"]: (d, m, dist) for d, m, dist in zip(docs, metas, distances)}
+        if self.index is not None:
+            lexical_ids = [self.index.chunk_ids[r] for r in lexical_rows]
+            for row, chunk_id in zip(lexical_rows.tolist(), lexical_ids):
+                if chunk_id not in found:
+                    distance = 2.0 - 2.0 * float(np.dot(query_vector, self.index.embeddings[row]))
+                    found[chunk_id] = (self.index.documents[row],
+                                       {**self.index.metadata_at(row), "chunk_id": chunk_id}, distance)
+        else:
+            lexical_ids = [c.decode("utf-8") for c in self.lexical.chunk_ids[lexical_rows]]
+            missing = [c for c in dict.fromkeys(lexical_ids) if c not in found]
+            if missing:
+                res = self.collection.get(ids=missing, where=chroma_where(**filters),
+                                          include=["documents", "metadatas", "embeddings"])
+                for chunk_id, doc, meta, emb in zip(res["ids"], res["documents"], res["metadatas"], res["embeddings"]):
+                    distance = 2.0 - 2.0 * float(np.dot(query_vector, np.asarray(emb, dtype=np.float32)))
+                    found[chunk_id] = (doc, {**(meta or {}), "chunk_id": chunk_id}, distance)
+            lexical_ids = [c for c in lexical_ids if c in found] # Chunks exclus par les filtres retirés
+
+        fused = reciprocal_rank_fusion([[m["chunk_id"] for m in metas], lexical_ids], k=self.rrf_k)[:n_results]
+        hits = [found[chunk_id] for chunk_id, _ in fused]
+        return [d for d, _, _ in hits], [m for _, m, _ in hits], [dist for _, _, dist in hits]
+
+    @staticmethod
+    def _with_chunk_ids(metas, ids):
+        """Ajoute l'id Chroma de chaque chunk à ses métadonnées (clé "chunk_id", citée par les verdicts)."""
+        return [{**(m or {}), "chunk_id": id_} for m, id_ in zip(metas, ids)]
+
     # Création du contexte
     def build_context(self, docs, metas):
         """
         Assemble les chunks retrouvés en un texte de contexte.
         """
         context = "\n\n".join([f"[{m.get('date', 'unknown')}] ({m.get('label', '?')}): {doc}" for doc, m in zip(docs, metas)])
-        print(f"[CONTEXT] {context}")
+        logger.debug("Contexte : %s", context)
         return context
     
     # Création du prompt
@@ -88,14 +281,20 @@ class RAGAnalyzer:
     
     # Génération du verdict avec le modèle LLM choisi
     
-    def generate_response(self, prompt: str, model_name="llama3.2") -> str:
+    def generate_response(self, prompt: str, model_name="llama3.2", stats: dict = None) -> str:
         """
         Envoie le prompt au modèle Ollama et récupère la réponse complète.
         Compatible avec les versions récentes d’Ollama (stream ou non-stream).
+
+        Args:
+            stats (dict): Si fourni, reçoit les statistiques de la génération (tokens du prompt
+                et de la réponse, durées : voir telemetry.ollama_stats).
         """
-        print(f"\n[INFO] Génération de la réponse avec le modèle {model_name}...")
+        logger.info("Génération de la réponse avec le modèle %s...", model_name)
 
         response = ollama.generate(model=model_name, prompt=prompt, stream=False)
+        if stats is not None:
+            stats.update(ollama_stats(response))
 
         # Certaines versions de Ollama renvoient directement une clé "response"
         if isinstance(response, dict):
@@ -103,4 +302,110 @@ class RAGAnalyzer:
         elif hasattr(response, "response"):
             return response.response
         else:
-            return str(response)
\ No newline at end of file
+            return str(response)
+
+    # Génération en flux (tokens au fil de l'eau)
+
+    def stream_tokens(self, prompt: str, model_name="llama3.2", stats: dict = None):
+        """
+        Générateur des fragments de texte produits par le modèle (`ollama.generate` en mode stream).
+        Fermer le générateur ferme la connexion, ce qui interrompt la génération côté Ollama.
+
+        Args:
+            stats (dict): Si fourni, reçoit les statistiques du dernier fragment (fin de génération).
+        """
+        logger.info("Génération en flux avec le modèle %s...", model_name)
+        stream = ollama.generate(model=model_name, prompt=prompt, stream=True)
+        try:
+            for chunk in stream:
+                if stats is not None:
+                    stats.update(ollama_stats(chunk))
+                token = chunk.get("response", "") if isinstance(chunk, dict) else getattr(chunk, "response", "")
+                if token:
+                    yield token
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def stream_response(self, prompt: str, model_name="llama3.2", stop_after: str = None,
+                        stats: dict = None) -> VerdictStream:
+        """
+        Variante en flux de generate_response : renvoie un VerdictStream qui produit les tokens
+        dès leur arrivée et expose le verdict dès qu'il apparaît.
+
+        Args:
+            stop_after (str): None, "verdict" ou "reason" : arrête la génération dès que
+                cette partie du format de réponse est complète (voir VerdictStream).
+        """
+        return VerdictStream(self.stream_tokens(prompt, model_name, stats=stats), stop_after=stop_after)
+
+    # Mode verdict rapide (sortie JSON courte)
+
+    def build_verdict_prompt(self, user_text: str, docs, metas) -> str:
+        """
+        Prompt du mode verdict rapide : extraits numérotés, réponse JSON sans explication
+        (voir VERDICT_SCHEMA).
+        """
+        context = "\n\n".join(
+            f"[{i}] [{m.get('date', 'unknown')}] ({m.get('label', '?')}): {doc}"
+            for i, (doc, m) in enumerate(zip(docs, metas), start=1)
+        )
+        prompt = f"""
+        You are a fact-checking assistant.
+        Use only the numbered context excerpts to decide if the article is TRUE (label = 1) or FAKE (label = 0).
+
+        ### CONTEXT
+
+        {context}
+
+        ### ARTICLE TO ANALYZE
+
+        {user_text}
+
+        ### RESPONSE FORMAT
+
+        Answer with JSON only, no explanation:
+        {{"verdict": "TRUE" or "FAKE", "confidence": number between 0 and 1, "cited": [numbers of the excerpts used]}}
+        """
+        return prompt.strip()
+
+    def generate_verdict(self, prompt: str, metas, model_name="llama3.2", num_predict: int = 48,
+                         stats: dict = None) -> VerdictResult:
+        """
+        Génère un verdict court et structuré : sortie contrainte par VERDICT_SCHEMA et
+        limitée à `num_predict` tokens (quelques dizaines au lieu d'un paragraphe).
+
+        Args:
+            metas: Métadonnées des extraits du prompt (leur "chunk_id" sert aux citations).
+            num_predict (int): Nombre maximal de tokens générés.
+            stats (dict): Si fourni, reçoit les statistiques de la génération (voir generate_response).
+        """
+        response = ollama.generate(
+            model=model_name,
+            prompt=prompt,
+            format=VERDICT_SCHEMA,
+            options={"num_predict": num_predict, "temperature": 0},
+            stream=False,
+        )
+        if stats is not None:
+            stats.update(ollama_stats(response))
+        raw = response.get("response", "") if isinstance(response, dict) else getattr(response, "response", "")
+        return VerdictResult.from_response(raw, [m.get("chunk_id") for m in metas])
+
+    def build_explanation_prompt(self, user_text: str, context: str, result: VerdictResult) -> str:
+        """Prompt de la justification à la demande d'un verdict déjà rendu."""
+        prompt = f"""
+        You are a fact-checking assistant.
+        The article below was classified as {result.verdict} using the context.
+        Explain briefly why, based only on the retrieved context.
+
+        ### CONTEXT
+
+        {context}
+
+        ### ARTICLE TO ANALYZE
+
+        {user_text}
+        """
+        return prompt.strip()
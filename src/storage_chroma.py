@@ -1,6 +1,13 @@
+import hashlib
+import json
+import os
+import time
 import pandas as pd
 import numpy as np
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from src.vector_store import EmbeddingStore
 # from chromadb.config import Settings
 from tqdm import tqdm
 
@@ -10,6 +17,13 @@ class ChromaStorage:
     dans une base vectorielle ChromaDB.
     """
 
+    # Colonnes de la table des chunks stockées comme métadonnées Chroma
+    METADATA_COLUMNS = ("index_article", "label", "subject", "date", "article_id")
+    # Colonnes d'un article prises en compte dans son empreinte
+    FINGERPRINT_COLUMNS = ("title", "text", "subject", "date", "label")
+    # Date numérique triable (AAAAMMJJ, 0 si inconnue) utilisée par les filtres de plage de dates
+    DATE_NUMERIC_COLUMN = "date_int"
+
     def __init__(self, persist_dir="data/vector_db", collection_name="articles"):
         """
         Initialise la base Chroma.
@@ -19,6 +33,7 @@ class ChromaStorage:
             collection_name (str): Nom de la collection.
         """
         self.client = chromadb.PersistentClient(path=persist_dir)
+        self.persist_dir = persist_dir
         self.collection_name = collection_name
 
         # Vérifie si la collection existe déjà, sinon la crée
@@ -26,6 +41,8 @@ class ChromaStorage:
         if collection_name in existing:
             self.collection = self.client.get_collection(collection_name)
             print(f"[INFO] Collection '{collection_name}' chargée depuis {persist_dir}")
+            if self.needs_date_backfill(self.collection):
+                self.backfill_date_int()
         else:
             self.collection = self.client.create_collection(collection_name)
             print(f"[INFO] Nouvelle collection '{collection_name}' créée dans {persist_dir}")
@@ -46,37 +63,351 @@ class ChromaStorage:
         print(f"[INFO] {len(df)} lignes chargées depuis {csv_path}")
         return df
 
+    # --------------------------------------------------
+    # Chargement / export du store binaire (matrice .npy + Parquet)
+    # --------------------------------------------------
+    def load_embedded_store(self, store_dir: str):
+        """
+        Charge un EmbeddingStore sans re-parsing : la matrice est projetée en mémoire.
+
+        Args:
+            store_dir (str): Répertoire du store.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: (métadonnées, matrice d'embeddings float32)
+        """
+        return EmbeddingStore(store_dir).load(mmap=True)
+
+    def export_to_store(self, store_dir: str, batch_size: int = 5000):
+        """
+        Exporte le contenu de la collection Chroma dans un EmbeddingStore.
+
+        Args:
+            store_dir (str): Répertoire du store à écrire.
+            batch_size (int): Nombre d'éléments lus par requête.
+        """
+        total = self.collection.count()
+        rows, vectors = [], []
+        for offset in tqdm(range(0, total, batch_size), desc="Export depuis ChromaDB"):
+            res = self.collection.get(
+                limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            for id_, doc, meta in zip(res["ids"], res["documents"], res["metadatas"]):
+                rows.append({"chunk_id": id_, "chunk": doc, **(meta or {})})
+            vectors.append(np.asarray(res["embeddings"], dtype=np.float32))
+
+        df = pd.DataFrame(rows)
+        embeddings = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        EmbeddingStore(store_dir).write(df, embeddings)
+
     # --------------------------------------------------
     # Insertion des embeddings dans Chroma
     # --------------------------------------------------
-    def insert_into_chroma(self, df: pd.DataFrame, batch_size: int = 100):
+    @staticmethod
+    def make_chunk_ids(df: pd.DataFrame) -> List[str]:
         """
-        Insère les données vectorielles dans ChromaDB par batchs.
+        Identifiants stables, dérivés du contenu (indépendants de la position des lignes) :
+        - '<article_id>_<chunk_index>' si la table contient une empreinte d'article ;
+        - sinon SHA-1 du chunk et de ses métadonnées (label, subject, date).
+        Réinsérer les mêmes chunks produit donc les mêmes ids.
+        """
+        if {"article_id", "chunk_index"}.issubset(df.columns):
+            return (df["article_id"].astype(str) + "_" + df["chunk_index"].astype(str)).tolist()
+        parts = [df["chunk"].astype(str)] + [
+            df[col].astype(str) for col in ("label", "subject", "date") if col in df.columns
+        ]
+        keys = parts[0].str.cat(parts[1:], sep="\x1f") if len(parts) > 1 else parts[0]
+        return [hashlib.sha1(k.encode("utf-8")).hexdigest() for k in keys.tolist()]
+
+    @classmethod
+    def metadata_columns(cls, df: pd.DataFrame) -> Dict[str, list]:
+        """Colonnes de métadonnées converties une fois pour toutes en listes de types Python natifs."""
+        columns = {}
+        for col in cls.METADATA_COLUMNS:
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                values = values.dt.strftime("%Y-%m-%d") # Même représentation que l'ancien aller-retour CSV
+            columns[col] = values.tolist()
+        if "date" in df.columns:
+            columns[cls.DATE_NUMERIC_COLUMN] = cls.date_to_int(df["date"]).tolist()
+        return columns
+
+    @staticmethod
+    def date_to_int(dates) -> np.ndarray:
+        """
+        Convertit des dates (datetime ou chaînes) en entiers AAAAMMJJ, comparables avec
+        les opérateurs $gte / $lte de Chroma. Les dates invalides ou manquantes valent 0.
+        """
+        dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+        values = dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+        return values.fillna(0).astype(np.int64).to_numpy()
+
+    @classmethod
+    def needs_date_backfill(cls, collection) -> bool:
+        """
+        Vrai si la collection a été construite avant l'ajout de `date_int` : les filtres
+        de dates ne renverraient alors aucun résultat (vérifié sur un enregistrement).
+        """
+        metadatas = collection.peek(1)["metadatas"] or [None]
+        meta = metadatas[0] or {}
+        return "date" in meta and cls.DATE_NUMERIC_COLUMN not in meta
+
+    def backfill_date_int(self, batch_size: int = 5000) -> int:
+        """
+        Ajoute `date_int` aux chunks qui ne l'ont pas, par mise à jour des seules métadonnées
+        (ni embeddings ni documents réécrits).
+
+        Returns:
+            int: Nombre de chunks mis à jour.
+        """
+        total, updated = self.collection.count(), 0
+        print(f"[INFO] Ajout de '{self.DATE_NUMERIC_COLUMN}' aux métadonnées de {total} chunks (collection antérieure)")
+        for offset in tqdm(range(0, total, batch_size), desc="Ajout des dates numériques"):
+            res = self.collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            missing = [
+                (id_, meta["date"]) for id_, meta in zip(res["ids"], res["metadatas"])
+                if meta and "date" in meta and self.DATE_NUMERIC_COLUMN not in meta
+            ]
+            if missing:
+                ids, dates = zip(*missing)
+                values = self.date_to_int(list(dates)).tolist()
+                self.collection.update(ids=list(ids), metadatas=[{self.DATE_NUMERIC_COLUMN: v} for v in values])
+                updated += len(ids)
+        print(f"[SAVE] {updated} chunks mis à jour")
+        return updated
+
+    def insert_into_chroma(self, df: pd.DataFrame, batch_size: int = None, embeddings: np.ndarray = None,
+                           prefetch: int = 2):
+        """
+        Insère (ou met à jour) les données vectorielles dans ChromaDB par batchs.
+
+        Les ids sont dérivés du contenu (voir make_chunk_ids) et l'écriture utilise `upsert` :
+        relancer l'insertion ne crée pas de doublons. Les batchs sont préparés dans un thread
+        à partir de colonnes contiguës, pendant que le batch précédent est écrit.
 
         Args:
-            df (pd.DataFrame): DataFrame contenant les chunks + embeddings.
-            batch_size (int): Taille des batchs d'insertion.
+            df (pd.DataFrame): DataFrame contenant les chunks (+ colonne 'embedding' si
+                `embeddings` n'est pas fourni).
+            batch_size (int): Taille des batchs d'insertion (par défaut et au maximum :
+                la taille de batch maximale acceptée par Chroma).
+            embeddings (np.ndarray): Matrice d'embeddings alignée sur df (ex. store en memory-map).
+            prefetch (int): Nombre de batchs préparés à l'avance (au moins 1).
         """
+        if prefetch < 1:
+            raise ValueError(f"prefetch doit être >= 1 (reçu : {prefetch}).")
         total = len(df)
-        print(f"[INFO] Insertion de {total} documents dans ChromaDB...")
+        max_batch_size = self.client.get_max_batch_size()
+        batch_size = min(batch_size or max_batch_size, max_batch_size)
+        print(f"[INFO] Insertion de {total} documents dans ChromaDB (batchs de {batch_size})...")
+        t0 = time.perf_counter()
 
-        for i in tqdm(range(0, total, batch_size), desc="Insertion dans ChromaDB"):
-            batch = df.iloc[i:i + batch_size]
+        # Données contiguës préparées une seule fois
+        ids = self.make_chunk_ids(df)
+        documents = df["chunk"].tolist()
+        metadata_columns = self.metadata_columns(df)
+        if embeddings is None:
+            embeddings = np.vstack(df["embedding"].to_numpy()) if total else np.empty((0, 0))
 
-            ids = [f"doc_{idx}" for idx in batch.index]
-            documents = batch["chunk"].tolist()
-            embeddings = batch["embedding"].tolist()
+        def prepare(start: int) -> dict:
+            end = min(start + batch_size, total)
+            batch_ids = ids[start:end]
+            names = list(metadata_columns)
+            metadatas = [dict(zip(names, values)) for values in zip(*(metadata_columns[n][start:end] for n in names))]
+            rows = range(end - start)
+            if len(set(batch_ids)) < len(batch_ids):
+                # Chunks identiques dans le même batch : on garde la dernière occurrence
+                last = {id_: i for i, id_ in enumerate(batch_ids)}
+                rows = sorted(last.values())
+            return {
+                "ids": [batch_ids[i] for i in rows],
+                "documents": [documents[start + i] for i in rows],
+                "embeddings": np.asarray(embeddings[start:end], dtype=np.float32)[list(rows)], # Tranche de la matrice, sans parsing
+                "metadatas": [metadatas[i] for i in rows] if metadatas else None,
+            }
 
-            # Métadonnées optionnelles
-            metadatas = batch[["index_article", "label", "subject", "date"]].to_dict(orient="records")
+        starts = list(range(0, total, batch_size))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = [executor.submit(prepare, start) for start in starts[:prefetch]]
+            for k in tqdm(range(len(starts)), desc="Insertion dans ChromaDB"):
+                batch = pending.pop(0).result()
+                if k + prefetch < len(starts):
+                    pending.append(executor.submit(prepare, starts[k + prefetch])) # Préparation pendant l'écriture
+                self.collection.upsert(**batch)
 
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                embeddings=embeddings,
-                metadatas=metadatas
-            )
+        elapsed = time.perf_counter() - t0
+        print(f"[INFO] Débit d'insertion : {total / elapsed if elapsed > 0 else float('inf'):.0f} lignes/s ({elapsed:.1f}s)")
+        print(f"[SUCCÈS] {total} documents insérés/mis à jour dans la collection '{self.collection_name}'.")
+
+    # --------------------------------------------------
+    # Synchronisation incrémentale
+    # --------------------------------------------------
+    @classmethod
+    def fingerprint_articles(cls, df: pd.DataFrame) -> pd.Series:
+        """
+        Empreinte (SHA-1) de chaque article à partir de son contenu
+        (titre, texte, sujet, date, label) : elle change dès que l'article change.
+        """
+        columns = [col for col in cls.FINGERPRINT_COLUMNS if col in df.columns]
+        parts = [df[col].astype(str) for col in columns]
+        keys = parts[0].str.cat(parts[1:], sep="\x1f") if len(parts) > 1 else parts[0]
+        return pd.Series(
+            [hashlib.sha1(k.encode("utf-8")).hexdigest()[:20] for k in keys.tolist()], index=df.index
+        )
+
+    def manifest_path(self) -> str:
+        """Chemin du manifeste des articles indexés dans la collection."""
+        return os.path.join(self.persist_dir, f"{self.collection_name}_manifest.json")
+
+    def load_manifest(self) -> Dict[str, dict]:
+        """
+        Manifeste {empreinte d'article: {"n_chunks": ..., "key": ...}} (vide si absent).
+        Les chunks d'un article ont pour ids '<empreinte>_<i>', ou la liste "ids" de l'entrée
+        si l'article vient d'une construction complète (voir bootstrap_manifest).
+        """
+        if not os.path.exists(self.manifest_path()):
+            return {}
+        with open(self.manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: Dict[str, dict]):
+        """Écrit le manifeste de façon atomique."""
+        os.makedirs(self.persist_dir, exist_ok=True)
+        tmp_path = self.manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path())
+
+    def bootstrap_manifest(self, df: pd.DataFrame, embedder, text_col: str = "text", key_col: str = "title",
+                           batch_size: int = 5000) -> Dict[str, dict]:
+        """
+        Reconstruit le manifeste d'une collection construite sans synchronisation (construction
+        complète de build_vector_db.py, ids de make_chunk_ids).
+
+        Chaque article de `df` est redécoupé et les ids de ses chunks recalculés (make_chunk_ids :
+        empreinte du texte du chunk et de ses métadonnées) :
+        - tous présents dans la collection : l'article est inscrit sous son empreinte, avec ces ids ;
+        - les chunks stockés qu'aucun article ne réclame (articles modifiés ou supprimés depuis)
+          sont inscrits, par `index_article`, sous des entrées "legacy_<index_article>" que la
+          synchronisation supprime.
+
+        Args:
+            df (pd.DataFrame): Jeu de données nettoyé, index positionnel (comme à la construction).
+            embedder (OllamaEmbedder): Embedder de la construction (même découpage).
+        """
+        stored = {} # {id: index_article}
+        total = self.collection.count()
+        for offset in tqdm(range(0, total, batch_size), desc="Lecture de la collection (manifeste)"):
+            res = self.collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            stored.update({id_: (meta or {}).get("index_article") for id_, meta in zip(res["ids"], res["metadatas"])})
+
+        chunks_df = embedder.build_chunks(df, text_col)
+        chunks_df["chunk_id"] = self.make_chunk_ids(chunks_df)
+        fingerprints = self.fingerprint_articles(df)
+        keys = df[key_col].astype(str) if key_col in df.columns else pd.Series(None, index=df.index)
+
+        manifest, claimed = {}, set()
+        for i, ids in chunks_df.groupby("index_article", sort=False)["chunk_id"]:
+            ids = list(dict.fromkeys(ids))
+            if all(id_ in stored for id_ in ids):
+                entry = manifest.setdefault(fingerprints.loc[i], {"n_chunks": 0, "key": keys.loc[i], "ids": []})
+                entry["ids"] = list(dict.fromkeys(entry["ids"] + ids))
+                entry["n_chunks"] = len(entry["ids"])
+                claimed.update(ids)
+
+        legacy = {}
+        for id_, i in stored.items():
+            if id_ not in claimed:
+                legacy.setdefault(i, []).append(id_)
+        for i, ids in legacy.items():
+            # Clé de l'article à la même position (souvent le même article, modifié) : sert
+            # seulement à distinguer « modifié » de « supprimé + ajouté » dans les statistiques
+            key = keys.loc[i] if isinstance(i, (int, np.integer)) and i in keys.index else None
+            manifest[f"legacy_{i}"] = {"n_chunks": len(ids), "key": key, "ids": ids}
+        print(f"[SYNC] Manifeste reconstruit depuis la collection : {len(manifest) - len(legacy)} articles "
+              f"retrouvés à l'identique, {sum(map(len, legacy.values()))} chunks à remplacer")
+        return manifest
+
+    def sync_articles(self, df: pd.DataFrame, embedder, text_col: str = "text", key_col: str = "title") -> dict:
+        """
+        Met à jour la collection de façon incrémentale à partir du jeu de données nettoyé complet.
+
+        Chaque article est identifié par son empreinte de contenu. En comparant avec le
+        manifeste des articles déjà indexés :
+        - les articles nouveaux ou modifiés sont découpés, vectorisés et insérés ;
+        - les articles supprimés ou modifiés voient leurs anciens chunks supprimés ;
+        - les articles inchangés ne coûtent rien.
+        Une collection non vide sans manifeste (construction complète) est d'abord inventoriée
+        (voir bootstrap_manifest).
+
+        Args:
+            df (pd.DataFrame): Jeu de données nettoyé (un article par ligne), dans l'ordre de la
+                construction : la position d'un article correspond à son index_article.
+            embedder (OllamaEmbedder): Embedder utilisé pour le chunking et la vectorisation.
+            text_col (str): Colonne de texte à découper.
+            key_col (str): Colonne identifiant un article d'une version à l'autre (ex. titre),
+                utilisée uniquement pour distinguer « modifié » de « supprimé + ajouté ».
+
+        Returns:
+            dict: Nombre d'articles ajoutés, modifiés, supprimés, inchangés et de chunks écrits/supprimés.
+        """
+        df = df.reset_index(drop=True) # Index positionnel : index_article = position de l'article
+        manifest = self.load_manifest()
+        if not manifest and self.collection.count() > 0:
+            # Collection issue d'une construction complète : manifeste déduit de son contenu
+            manifest = self.bootstrap_manifest(df, embedder, text_col, key_col)
+
+        fingerprints = self.fingerprint_articles(df)
+        df = df[~fingerprints.duplicated()] # Articles strictement identiques : une seule fois
+        fingerprints = fingerprints.loc[df.index]
+        current = set(fingerprints)
+        removed = [fp for fp in manifest if fp not in current]
+        added_mask = ~fingerprints.isin(manifest.keys())
+
+        has_key = key_col in df.columns
+        removed_keys = {manifest[fp].get("key") for fp in removed}
+        n_updated = int(df.loc[added_mask, key_col].astype(str).isin(removed_keys).sum()) if has_key else 0
+
+        # Suppression des chunks des articles retirés ou modifiés (sauf ids encore utilisés
+        # par un article conservé : chunks identiques dédoublonnés par make_chunk_ids)
+        def chunk_ids(fp: str) -> List[str]:
+            return manifest[fp].get("ids") or [f"{fp}_{i}" for i in range(manifest[fp]["n_chunks"])]
 
-        print(f"[SUCCÈS] {total} documents insérés dans la collection '{self.collection_name}'.")
+        removed_set = set(removed)
+        kept_ids = {id_ for fp in manifest if fp not in removed_set and "ids" in manifest[fp] for id_ in manifest[fp]["ids"]}
+        ids_to_delete = [id_ for fp in removed for id_ in chunk_ids(fp) if id_ not in kept_ids]
+        max_batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(ids_to_delete), max_batch_size):
+            self.collection.delete(ids=ids_to_delete[start:start + max_batch_size])
+        for fp in removed:
+            del manifest[fp]
 
+        # Découpage + vectorisation des seuls articles nouveaux ou modifiés
+        new_articles = df[added_mask.to_numpy()]
+        n_chunks_added = 0
+        if not new_articles.empty:
+            chunks_df = embedder.build_chunks(new_articles.copy(), text_col)
+            if not chunks_df.empty:
+                chunks_df["article_id"] = fingerprints.loc[chunks_df["index_article"]].to_numpy()
+                chunks_df["embedding"] = embedder.embed_texts(chunks_df["chunk"].tolist())
+                self.insert_into_chroma(chunks_df)
+                n_chunks_added = len(chunks_df)
+                counts = chunks_df["article_id"].value_counts().to_dict()
+            else:
+                counts = {}
+            keys = new_articles[key_col].astype(str) if has_key else pd.Series(None, index=new_articles.index)
+            for idx, fp in fingerprints.loc[new_articles.index].items():
+                manifest[fp] = {"n_chunks": int(counts.get(fp, 0)), "key": keys.loc[idx]}
 
+        self.save_manifest(manifest)
+        stats = {
+            "added": int(added_mask.sum()) - n_updated,
+            "updated": n_updated,
+            "removed": len(removed) - n_updated,
+            "unchanged": int((~added_mask).sum()),
+            "chunks_added": n_chunks_added,
+            "chunks_deleted": len(ids_to_delete),
+        }
+        print(f"[SYNC] {stats}")
+        return stats
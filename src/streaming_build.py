@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+import pandas as pd
+from typing import Iterable, Iterator, List, Tuple
+from src.preprocessing import CSVLoader, DataCleaner
+from src.embedding import OllamaEmbedder
+from src.storage_chroma import ChromaStorage
+
+
+_END = object() # Marqueur de fin de flux entre deux étapes
+
+
+def bounded_stage(items: Iterable, maxsize: int = 2) -> Iterator:
+    """
+    Exécute un générateur dans un thread et expose ses éléments via une file bornée.
+
+    Quand la file est pleine, le thread producteur est bloqué (back-pressure) :
+    une étape rapide ne peut jamais avoir plus de `maxsize` batchs d'avance
+    sur l'étape suivante. Une exception du producteur est relancée côté consommateur.
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put(_END)
+        except BaseException as e: # Transmis au consommateur
+            q.put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set() # Libère le producteur si le consommateur s'arrête avant la fin
+
+
+class StreamingVectorDBBuilder:
+    """
+    Construction de la base vectorielle en flux : chargement, nettoyage, chunking,
+    embedding et insertion dans Chroma s'enchaînent par batchs de lignes bornés.
+
+    Seuls quelques batchs sont en mémoire à un instant donné (files bornées entre
+    les étapes), quelle que soit la taille du corpus.
+    """
+
+    def __init__(self, embedder: OllamaEmbedder, storage: ChromaStorage,
+                 batch_size: int = 2000, queue_size: int = 2):
+        """
+        Args:
+            embedder (OllamaEmbedder): Embedder utilisé pour le chunking et la vectorisation.
+            storage (ChromaStorage): Collection Chroma de destination.
+            batch_size (int): Nombre d'articles lus par batch.
+            queue_size (int): Nombre maximal de batchs en attente entre deux étapes.
+        """
+        self.embedder = embedder
+        self.storage = storage
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.loader = CSVLoader()
+
+    # -----------------------------
+    # Étapes du pipeline (générateurs)
+    # -----------------------------
+    def load_and_clean(self, sources: List[Tuple[str, int]]) -> Iterator[pd.DataFrame]:
+        """
+        Lit chaque CSV par batchs, applique le label et le nettoyage.
+        Les doublons de 'text' sont supprimés à l'échelle de chaque fichier,
+        comme drop_empty_rows_and_duplicated sur le fichier complet.
+        """
+        next_index = 0 # Numérotation continue des articles, comme DatasetMerger.merge(ignore_index=True)
+        for path, label in sources:
+            seen = set() # Hash des textes déjà vus dans ce fichier
+            for batch in self.loader.iter_csv(path, batch_size=self.batch_size):
+                cleaner = DataCleaner(batch).add_label(label).drop_empty_rows_and_duplicated()
+                hashes = cleaner.df["text"].map(hash)
+                is_new = ~hashes.isin(seen)
+                seen.update(hashes)
+                cleaner.df = cleaner.df[is_new.to_numpy()]
+                cleaned = cleaner.clean_pipeline().df
+                if cleaned.empty:
+                    continue
+                cleaned.index = pd.RangeIndex(next_index, next_index + len(cleaned))
+                next_index += len(cleaned)
+                yield cleaned
+
+    def chunk(self, articles: Iterable[pd.DataFrame], text_col: str = "text") -> Iterator[pd.DataFrame]:
+        """Découpe chaque batch d'articles en chunks, avec une numérotation globale des chunks."""
+        next_index = 0
+        for batch in articles:
+            chunks_df = self.embedder.build_chunks(batch, text_col)
+            if chunks_df.empty:
+                continue
+            chunks_df.index = pd.RangeIndex(next_index, next_index + len(chunks_df))
+            next_index += len(chunks_df)
+            yield chunks_df
+
+    def embed(self, chunk_batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Ajoute la colonne 'embedding' à chaque batch de chunks."""
+        for chunks_df in chunk_batches:
+            t0 = time.perf_counter()
+            chunks_df["embedding"] = self.embedder.embed_texts(chunks_df["chunk"].tolist())
+            elapsed = time.perf_counter() - t0
+            print(f"[STREAM] {len(chunks_df)} chunks vectorisés en {elapsed:.1f}s ({len(chunks_df) / max(elapsed, 1e-9):.1f} chunks/s)")
+            yield chunks_df
+
+    # -----------------------------
+    # Exécution complète
+    # -----------------------------
+    def run(self, sources: List[Tuple[str, int]], text_col: str = "text") -> int:
+        """
+        Exécute le pipeline complet.
+
+        Args:
+            sources (List[Tuple[str, int]]): Couples (chemin du CSV, label) à indexer.
+            text_col (str): Colonne de texte à découper.
+
+        Returns:
+            int: Nombre de chunks insérés dans Chroma.
+        """
+        t0 = time.perf_counter()
+        # Chaque étape tourne dans son propre thread, reliée à la suivante par une file bornée :
+        # le chargement/nettoyage du batch n+1 se fait pendant l'embedding du batch n.
+        articles = bounded_stage(self.load_and_clean(sources), self.queue_size)
+        chunks = bounded_stage(self.chunk(articles, text_col), self.queue_size)
+        embedded = bounded_stage(self.embed(chunks), self.queue_size)
+
+        total = 0
+        for chunks_df in embedded:
+            self.storage.insert_into_chroma(chunks_df)
+            total += len(chunks_df)
+
+        elapsed = time.perf_counter() - t0
+        print(f"[SUCCÈS] {total} chunks indexés en flux en {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} chunks/s)")
+        return total
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from opentelemetry import context as otel_context
+from opentelemetry import metrics, trace
+
+logger = logging.getLogger(__name__)
+
+# Statistiques renvoyées par Ollama à la fin d'une génération (durées en nanosecondes)
+OLLAMA_STATS_FIELDS = (
+    "prompt_eval_count", "eval_count", "total_duration", "load_duration", "prompt_eval_duration", "eval_duration",
+)
+
+
+def ollama_stats(response) -> Dict[str, int]:
+    """Extrait les compteurs de tokens et durées d'une réponse Ollama (dict ou objet)."""
+    stats = {}
+    for name in OLLAMA_STATS_FIELDS:
+        value = response.get(name) if isinstance(response, dict) else getattr(response, name, None)
+        if value is not None:
+            stats[name] = int(value)
+    return stats
+
+
+class AnalysisTrace:
+    """
+    Mesures d'une analyse : durée de chaque étape (ms), statistiques Ollama et attributs
+    (modèle, n_results, cache, court-circuit...).
+
+    Chaque étape est aussi un span OpenTelemetry enfant du span de l'analyse ; le contexte
+    parent est passé explicitement, les étapes peuvent donc se terminer dans un autre
+    thread ou après la fin de l'appel (génération en flux).
+    """
+
+    def __init__(self, telemetry: "PipelineTelemetry", name: str, attributes: Dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = dict(attributes)
+        self.stages = {} # {étape: durée en ms}
+        self.ollama = {} # Statistiques Ollama de la génération (voir ollama_stats)
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._span = telemetry.tracer.start_span(name, attributes=_span_attributes(self.attributes))
+        self._context = trace.set_span_in_context(self._span)
+        self._finished = False
+        self._lock = threading.Lock() # Étapes chronométrées depuis plusieurs threads (analyse groupée)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Chronomètre une étape (embed, query, context, prompt, generate...)."""
+        span = self.telemetry.tracer.start_span(f"rag.{name}", context=self._context)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record_stage(name, (time.perf_counter() - start) * 1000, span)
+
+    def record_stage(self, name: str, duration_ms: float, span=None) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+        self.telemetry.stage_duration.record(duration_ms, {"stage": name})
+        if span is not None:
+            span.set_attribute("rag.duration_ms", duration_ms)
+            span.end()
+
+    def finish(self) -> None:
+        """Clôt l'analyse : span racine, métriques de tokens et ligne du journal JSON."""
+        if self._finished:
+            return
+        self._finished = True
+        total_ms = (time.perf_counter() - self._start) * 1000
+        for kind, field in (("prompt", "prompt_eval_count"), ("completion", "eval_count")):
+            if field in self.ollama:
+                self.telemetry.token_counter.add(self.ollama[field], {"kind": kind})
+        self._span.set_attributes(_span_attributes({**self.attributes, **self.ollama, "total_ms": total_ms}))
+        self._span.end()
+        self.telemetry.record(self, total_ms)
+
+    def to_dict(self, total_ms: float = None) -> Dict:
+        record = {
+            "timestamp": self.started,
+            "name": self.name,
+            **self.attributes,
+            "stages_ms": {k: round(v, 3) for k, v in self.stages.items()},
+            "total_ms": round(total_ms, 3) if total_ms is not None else None,
+            "ollama": self.ollama,
+        }
+        if self.ollama.get("eval_count") and self.ollama.get("eval_duration"):
+            record["tokens_per_s"] = round(self.ollama["eval_count"] / (self.ollama["eval_duration"] / 1e9), 2)
+        return record
+
+
+def _span_attributes(values: Dict) -> Dict:
+    """OpenTelemetry n'accepte que des types simples comme attributs."""
+    return {f"rag.{k}": v for k, v in values.items() if isinstance(v, (str, bool, int, float))}
+
+
+class PipelineTelemetry:
+    """
+    Instrumentation du pipeline RAG.
+
+    - spans et métriques OpenTelemetry (histogramme `rag.stage.duration`, compteur
+      `rag.llm.tokens`) : sans fournisseur configuré (voir setup_opentelemetry), l'API
+      OpenTelemetry est sans effet ;
+    - journal JSON local optionnel : une ligne par analyse (durées par étape, tokens).
+
+    La dernière analyse reste accessible dans `last_trace`.
+    """
+
+    def __init__(self, json_log_path: str = None, service_name: str = "fake_news_rag"):
+        """
+        Args:
+            json_log_path (str): Fichier JSON Lines où écrire une ligne par analyse (optionnel).
+            service_name (str): Nom de l'instrumentation OpenTelemetry.
+        """
+        self.json_log_path = json_log_path
+        if json_log_path and os.path.dirname(json_log_path):
+            os.makedirs(os.path.dirname(json_log_path), exist_ok=True)
+        self.tracer = trace.get_tracer(service_name)
+        meter = metrics.get_meter(service_name)
+        self.stage_duration = meter.create_histogram(
+            "rag.stage.duration", unit="ms", description="Durée de chaque étape du pipeline RAG"
+        )
+        self.token_counter = meter.create_counter(
+            "rag.llm.tokens", unit="token", description="Tokens traités par le modèle de génération"
+        )
+        self.last_trace: Optional[AnalysisTrace] = None
+        self._lock = threading.Lock()
+
+    def start(self, name: str = "rag.analyze_article", **attributes) -> AnalysisTrace:
+        """Démarre le suivi d'une analyse ; à clore avec `AnalysisTrace.finish`."""
+        return AnalysisTrace(self, name, attributes)
+
+    @contextmanager
+    def analysis(self, name: str = "rag.analyze_article", **attributes):
+        """Suivi d'une analyse clos automatiquement à la sortie du bloc."""
+        run = self.start(name, **attributes)
+        token = otel_context.attach(run._context)
+        try:
+            yield run
+        finally:
+            otel_context.detach(token)
+            run.finish()
+
+    def record(self, run: AnalysisTrace, total_ms: float) -> None:
+        self.last_trace = run
+        record = run.to_dict(total_ms)
+        logger.info(
+            "%s : %.0f ms (%s)", run.name, total_ms,
+            ", ".join(f"{k}={v:.0f}ms" for k, v in run.stages.items()),
+        )
+        if self.json_log_path:
+            with self._lock, open(self.json_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+def setup_opentelemetry(service_name: str = "fake_news_rag", otlp_endpoint: str = None, console: bool = False):
+    """
+    Configure les fournisseurs OpenTelemetry (SDK) : export OTLP (gRPC) vers `otlp_endpoint`
+    et/ou affichage console. À appeler une fois au démarrage de l'application.
+    """
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    resource = Resource.create({"service.name": service_name})
+    tracer_provider = TracerProvider(resource=resource)
+    readers = []
+    if otlp_endpoint:
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=otlp_endpoint)))
+        readers.append(PeriodicExportingMetricReader(OTLPMetricExporter(endpoint=otlp_endpoint)))
+    if console:
+        tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        readers.append(PeriodicExportingMetricReader(ConsoleMetricExporter()))
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=readers))
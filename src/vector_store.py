@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+
+class EmbeddingStore:
+    """
+    Stockage binaire des chunks vectorisés, à la place du CSV de vecteurs sérialisés :
+    - embeddings.npy : matrice float32 contiguë (n_chunks x dim), chargée en memory-map
+    - metadata.parquet : table des chunks et métadonnées, indexée par chunk_id
+
+    La ligne i de la matrice correspond à la ligne i de la table de métadonnées.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    METADATA_FILE = "metadata.parquet"
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Répertoire du store (créé à l'écriture si absent).
+        """
+        self.path = path
+        self.embeddings_path = os.path.join(path, self.EMBEDDINGS_FILE)
+        self.metadata_path = os.path.join(path, self.METADATA_FILE)
+
+    def exists(self) -> bool:
+        """Indique si le store contient déjà une matrice et sa table de métadonnées."""
+        return os.path.exists(self.embeddings_path) and os.path.exists(self.metadata_path)
+
+    # -----------------------------
+    # Écriture
+    # -----------------------------
+    def write(self, df: pd.DataFrame, embeddings: Optional[np.ndarray] = None) -> None:
+        """
+        Écrit les chunks et leurs embeddings dans le store.
+
+        Args:
+            df (pd.DataFrame): Table des chunks. Si `embeddings` n'est pas fourni,
+                les vecteurs sont lus dans la colonne 'embedding'.
+            embeddings (np.ndarray): Matrice (n_chunks x dim) alignée sur df (optionnelle).
+        """
+        if embeddings is None:
+            embeddings = np.vstack(df["embedding"].to_numpy()) if len(df) else np.empty((0, 0))
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.shape[0] != len(df):
+            raise ValueError(f"{embeddings.shape[0]} embeddings pour {len(df)} chunks.")
+
+        metadata = df.drop(columns=["embedding"], errors="ignore").reset_index(drop=True)
+        if "chunk_id" not in metadata.columns:
+            metadata.insert(0, "chunk_id", self.make_chunk_ids(metadata))
+
+        os.makedirs(self.path, exist_ok=True)
+        # Écriture dans des fichiers temporaires puis renommage : le store n'est jamais à moitié écrit
+        with open(self.embeddings_path + ".tmp", "wb") as f:
+            np.save(f, embeddings)
+        metadata.to_parquet(self.metadata_path + ".tmp", index=False)
+        os.replace(self.embeddings_path + ".tmp", self.embeddings_path)
+        os.replace(self.metadata_path + ".tmp", self.metadata_path)
+        print(f"[SAVE] {len(metadata)} embeddings (dim={embeddings.shape[1] if embeddings.ndim == 2 else 0}) sauvegardés → {self.path}")
+
+    @staticmethod
+    def make_chunk_ids(df: pd.DataFrame) -> pd.Series:
+        """Identifiant de chunk '<index_article>_<chunk_index>' (ou position de la ligne à défaut)."""
+        if {"index_article", "chunk_index"}.issubset(df.columns):
+            return df["index_article"].astype(str) + "_" + df["chunk_index"].astype(str)
+        return pd.Series([str(i) for i in range(len(df))], index=df.index)
+
+    # -----------------------------
+    # Lecture
+    # -----------------------------
+    def load_embeddings(self, mmap: bool = True) -> np.ndarray:
+        """
+        Charge la matrice d'embeddings. Avec mmap=True, le fichier est projeté en mémoire
+        (aucune copie : seules les pages lues sont chargées).
+        """
+        return np.load(self.embeddings_path, mmap_mode="r" if mmap else None)
+
+    def load_metadata(self, columns=None) -> pd.DataFrame:
+        """Charge la table de métadonnées (éventuellement restreinte à certaines colonnes)."""
+        return pd.read_parquet(self.metadata_path, columns=columns)
+
+    def load(self, mmap: bool = True) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Charge le store.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: (métadonnées, matrice d'embeddings float32)
+        """
+        metadata = self.load_metadata()
+        embeddings = self.load_embeddings(mmap=mmap)
+        if embeddings.shape[0] != len(metadata):
+            raise ValueError(f"Store incohérent : {embeddings.shape[0]} embeddings pour {len(metadata)} lignes de métadonnées.")
+        print(f"[INFO] {len(metadata)} chunks chargés depuis {self.path} (embeddings {embeddings.shape}, mmap={mmap})")
+        return metadata, embeddings
@@ -0,0 +1,141 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+
+# Format de réponse demandé par RAGAnalyzer.build_prompt : "Verdict: TRUE|FAKE" puis "Reason: ..."
+VERDICT_PATTERN = re.compile(r"Verdict\W*(TRUE|FAKE)\b", re.IGNORECASE)
+REASON_PATTERN = re.compile(r"Reason\s*:\s*(.*)", re.IGNORECASE | re.DOTALL)
+
+# Schéma de sortie structurée du mode verdict rapide (paramètre `format` d'ollama.generate).
+# "cited" contient les numéros [1..k] des extraits du contexte utilisés.
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": ["TRUE", "FAKE"]},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "cited": {"type": "array", "items": {"type": "integer"}},
+    },
+    "required": ["verdict", "confidence", "cited"],
+}
+
+
+def parse_verdict(text: str) -> Optional[str]:
+    """Verdict ("TRUE" ou "FAKE") d'une réponse, ou None s'il n'apparaît pas (encore)."""
+    match = VERDICT_PATTERN.search(text)
+    return match.group(1).upper() if match else None
+
+
+def parse_reason(text: str) -> Optional[str]:
+    """Justification qui suit "Reason:", ou None si elle n'a pas commencé."""
+    match = REASON_PATTERN.search(text)
+    return match.group(1).strip() if match else None
+
+
+@dataclass
+class VerdictResult:
+    """
+    Résultat typé du mode verdict rapide.
+
+    Attributes:
+        verdict (str): "TRUE", "FAKE" ou "UNKNOWN" si la sortie du modèle est inexploitable.
+        confidence (float): Confiance annoncée par le modèle, entre 0 et 1.
+        cited_chunk_ids (List[str]): Ids des chunks du contexte cités par le modèle.
+        raw (str): Sortie brute du modèle.
+        explanation (str): Justification, obtenue à la demande (RAGPipeline.explain).
+    """
+
+    verdict: str
+    confidence: float = 0.0
+    cited_chunk_ids: List[str] = field(default_factory=list)
+    raw: str = ""
+    explanation: Optional[str] = None
+
+    @classmethod
+    def from_response(cls, raw: str, chunk_ids: List[str]) -> "VerdictResult":
+        """
+        Construit le résultat à partir de la sortie JSON du modèle.
+
+        Args:
+            raw (str): Sortie du modèle (JSON conforme à VERDICT_SCHEMA).
+            chunk_ids (List[str]): Ids des chunks du contexte, dans l'ordre de numérotation.
+        """
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            # Sortie tronquée (num_predict) ou hors format : on se rabat sur le verdict textuel
+            return cls(verdict=parse_verdict(raw) or "UNKNOWN", raw=raw)
+        if not isinstance(data, dict):
+            return cls(verdict="UNKNOWN", raw=raw)
+
+        verdict = str(data.get("verdict", "")).upper()
+        try:
+            confidence = min(max(float(data.get("confidence", 0.0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        cited = []
+        for n in data.get("cited") or []:
+            if isinstance(n, int) and 1 <= n <= len(chunk_ids) and chunk_ids[n - 1] not in cited:
+                cited.append(chunk_ids[n - 1])
+        return cls(verdict=verdict if verdict in ("TRUE", "FAKE") else "UNKNOWN",
+                   confidence=confidence, cited_chunk_ids=cited, raw=raw)
+
+
+class VerdictStream:
+    """
+    Enveloppe un flux de tokens du modèle : l'itération renvoie les tokens au fil de l'eau
+    tout en maintenant la réponse partielle (`text`) et le verdict dès qu'il est lisible.
+
+    Args:
+        tokens (Iterable[str]): Fragments de texte générés.
+        stop_after (str): None (génération complète), "verdict" (arrêt dès que le verdict est
+            lu) ou "reason" (arrêt à la fin du paragraphe de justification).
+    """
+
+    STOP_MODES = (None, "verdict", "reason")
+
+    def __init__(self, tokens: Iterable[str], stop_after: str = None):
+        if stop_after not in self.STOP_MODES:
+            raise ValueError(f"stop_after doit valoir l'un de {self.STOP_MODES}")
+        self._tokens = tokens
+        self.stop_after = stop_after
+        self.text = ""
+        self.verdict = None
+        self.stopped_early = False # True si la génération a été interrompue avant sa fin
+
+    @property
+    def reason(self) -> Optional[str]:
+        return parse_reason(self.text)
+
+    def is_complete(self) -> bool:
+        """Le format demandé par `stop_after` est-il complet ?"""
+        if self.stop_after == "verdict":
+            return self.verdict is not None
+        if self.stop_after == "reason":
+            match = REASON_PATTERN.search(self.text)
+            if match is None:
+                return False
+            # Fin du paragraphe : ligne vide, ou le modèle recommence un nouveau verdict
+            rest = match.group(1).lstrip()
+            return bool(rest) and ("\n\n" in rest or VERDICT_PATTERN.search(rest) is not None)
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        for token in self._tokens:
+            self.text += token
+            if self.verdict is None:
+                self.verdict = parse_verdict(self.text)
+            yield token
+            if self.is_complete():
+                self.stopped_early = True
+                break
+        close = getattr(self._tokens, "close", None)
+        if close is not None:
+            close() # Ferme la connexion HTTP : Ollama interrompt la génération
+
+    def consume(self) -> str:
+        """Lit le flux jusqu'au bout (ou jusqu'à l'arrêt anticipé) et renvoie la réponse."""
+        for _ in self:
+            pass
+        return self.text
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.vector_store import EmbeddingStore
+
+
+def _fake_embed(model, input):
+    """Embedding déterministe : le texte "article i" est envoyé sur l'axe i."""
+    vectors = []
+    for text in input:
+        vec = [0.0] * 4
+        vec[int(text.split()[-1]) % 4] = 1.0
+        vectors.append(vec)
+    return type("Response", (), {"embeddings": vectors})()
+
+
+@pytest.fixture
+def fake_embed():
+    """Remplaçant de ollama.embed, à utiliser comme side_effect d'un patch."""
+    return _fake_embed
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    """EmbeddingStore de 4 chunks ("chunk i" sur l'axe i, labels alternés)."""
+    df = pd.DataFrame({
+        "index_article": [0, 1, 2, 3],
+        "chunk_index": [0, 0, 0, 0],
+        "chunk": ["chunk 0", "chunk 1", "chunk 2", "chunk 3"],
+        "label": [1, 0, 1, 0],
+        "subject": ["News"] * 4,
+        "date": pd.to_datetime(["2017-12-31"] * 4),
+    })
+    path = str(tmp_path / "store")
+    EmbeddingStore(path).write(df, np.eye(4, dtype=np.float32))
+    return path
@@ -0,0 +1,53 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from src.async_pipeline import AsyncRAGPipeline
+from src.vector_store import EmbeddingStore
+from benchmarks.fake_ollama_server import FakeOllamaServer
+
+
+@pytest.fixture
+def random_store_dir(tmp_path):
+    """50 chunks aux vecteurs aléatoires (labels alternés)."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    df = pd.DataFrame({
+        "index_article": np.arange(50),
+        "chunk_index": np.zeros(50, dtype=int),
+        "chunk": [f"chunk {i}" for i in range(50)],
+        "label": np.arange(50) % 2,
+        "subject": ["News"] * 50,
+        "date": pd.to_datetime(["2017-12-31"] * 50),
+    })
+    path = str(tmp_path / "store")
+    EmbeddingStore(path).write(df, vectors)
+    return path
+
+
+def test_async_load_respects_concurrency_limits(random_store_dir):
+    """Test de charge : 24 analyses simultanées contre un faux serveur Ollama local."""
+    with FakeOllamaServer(dim=8, embed_latency=0.01, generate_latency=0.05) as server:
+        pipeline = AsyncRAGPipeline("unused", "unused", backend="numpy", store_path=random_store_dir,
+                                    host=server.host, embed_concurrency=4, generate_concurrency=3)
+        texts = [f"article numéro {i} à analyser" for i in range(24)]
+
+        results = asyncio.run(pipeline.analyze_articles(texts, n_results=3, label=1))
+
+        assert len(results) == 24
+        for response, docs, metas in results:
+            assert response.startswith("Verdict: TRUE")
+            assert len(docs) == 3 and all(m["label"] == 1 for m in metas)
+        assert server.stats["embed"]["requests"] == 24
+        assert server.stats["generate"]["requests"] == 24
+        # Les analyses se chevauchent, dans la limite fixée pour chaque backend
+        assert 1 < server.stats["generate"]["max_in_flight"] <= 3
+        assert server.stats["embed"]["max_in_flight"] <= 4
+
+
+def test_async_vectorize_matches_sync_normalization(random_store_dir):
+    with FakeOllamaServer(dim=8) as server:
+        pipeline = AsyncRAGPipeline("unused", "unused", backend="numpy", store_path=random_store_dir, host=server.host)
+        vector = asyncio.run(pipeline.retriever.vectorize_query("un texte"))
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
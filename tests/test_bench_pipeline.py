@@ -0,0 +1,20 @@
+from benchmarks.bench_pipeline import compare, run_benchmark
+from benchmarks.fake_ollama_server import FakeOllamaServer
+
+
+def test_benchmark_runs_offline_and_times_every_stage(tmp_path, capsys):
+    with FakeOllamaServer(dim=16) as server:
+        results = run_benchmark(str(tmp_path), server.host, n_articles=20, n_queries=3, n_results=2,
+                                backend="numpy", chunk_size=100, overlap=10)
+
+    assert list(results["stages"]) == [
+        "load_csv", "clean", "split_text", "embed_texts", "store_write", "insert_into_chroma"
+    ]
+    assert results["corpus"]["dim"] == 16
+    assert results["stages"]["embed_texts"]["items"] == results["corpus"]["chunks"]
+    assert results["retrieve_similar_docs"]["queries"] == 3
+    assert set(results["analyze_article"]["stages_mean_ms"]) == {"embed", "query", "context", "prompt", "generate"}
+    assert server.stats["generate"]["requests"] == 3
+
+    compare({"commit": "a", **results}, {"commit": "b", **results})
+    assert "analyze_article p95" in capsys.readouterr().out
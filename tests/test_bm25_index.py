@@ -0,0 +1,149 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.rag_pipeline import RAGPipeline
+from src.retrieval import RAGAnalyzer
+from src.storage_chroma import ChromaStorage
+from src.vector_store import EmbeddingStore
+
+TEXTS = [
+    "the senate passed the bill on tuesday",
+    "trump met merkel in berlin in 2017",
+    "the bill was rejected by the house",
+    "merkel said the bill was a mistake, the bill must go",
+    "",
+]
+
+
+def bm25_reference(texts, query, k1=1.2, b=0.75):
+    """Score BM25 calculé naïvement, document par document."""
+    docs = [tokenize(t) for t in texts]
+    avgdl = sum(map(len, docs)) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if df and tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_search_matches_reference_scores(tmp_path):
+    index = BM25Index.build(TEXTS, str(tmp_path / "bm25"))
+    reference = bm25_reference(TEXTS, "Merkel bill 2017 unknownword")
+
+    rows, scores = index.search("Merkel bill 2017 unknownword", k=10)
+    assert sorted(rows.tolist()) == [i for i, s in enumerate(reference) if s > 0] # Chunks sans terme commun exclus
+    np.testing.assert_allclose(scores, [reference[r] for r in rows], rtol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+    rows, _ = index.search("merkel bill", k=1)
+    assert rows.tolist() == [3]
+    # Lignes candidates (ex. filtres de métadonnées)
+    rows, _ = index.search("merkel bill", k=5, rows=np.array([0, 2]))
+    assert sorted(rows.tolist()) == [0, 2]
+    assert len(index.search("merkel", k=5, rows=np.array([], dtype=np.int64))[0]) == 0
+    assert len(index.search("", k=5)[0]) == 0
+
+
+def test_query_terms_keep_most_discriminant(tmp_path):
+    BM25Index.build(TEXTS, str(tmp_path / "bm25"))
+    index = BM25Index(str(tmp_path / "bm25"), max_query_terms=1)
+    # "the" apparaît dans 4 chunks, "berlin" dans un seul : seul "berlin" est conservé
+    assert index.terms[index.query_terms("the berlin")].tolist() == [b"berlin"]
+    assert index.search("the berlin", k=5)[0].tolist() == [1]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+    assert [item for item, _ in fused] == ["c", "a", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def corpus(n=30, dim=8):
+    """Chunks de remplissage + un chunk cible (nom propre rare) orthogonal à la requête."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors[:, 0] = np.abs(vectors[:, 0]) + 0.5 # Tous proches de la requête (axe 0)...
+    vectors[n - 1] = 0.0
+    vectors[n - 1, 1] = 1.0 # ... sauf le chunk cible
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    chunks = [f"filler text number {i}" for i in range(n - 1)] + ["senator kowalski quoted in 1987"]
+    df = pd.DataFrame({
+        "index_article": range(n),
+        "chunk_index": [0] * n,
+        "chunk": chunks,
+        "label": [i % 2 for i in range(n)],
+        "subject": ["News"] * n,
+        "date": pd.to_datetime(["2017-12-31"] * n),
+    })
+    query = np.zeros(dim, dtype=np.float32)
+    query[0] = 1.0
+    return df, vectors, query
+
+
+def test_hybrid_numpy_backend_adds_lexical_hits(tmp_path):
+    df, vectors, query = corpus()
+    store = str(tmp_path / "store")
+    EmbeddingStore(store).write(df, vectors)
+    BM25Index.build(df["chunk"], str(tmp_path / "bm25"))
+    analyzer = RAGAnalyzer(backend="numpy", store_path=store, bm25_path=str(tmp_path / "bm25"))
+
+    vector_docs, _ = analyzer.retrieve_similar_docs(query.tolist(), n_results=3)
+    assert "senator kowalski quoted in 1987" not in vector_docs # Hors des candidats vectoriels
+
+    docs, metas, distances = analyzer.retrieve_similar_docs(query.tolist(), n_results=3, return_distances=True,
+                                                            query_text="What did Kowalski say in 1987?")
+    assert docs[:2] == [vector_docs[0], "senator kowalski quoted in 1987"]
+    assert distances[1] == pytest.approx(2.0) # Distance vectorielle réelle (vecteurs orthogonaux)
+    assert metas[1]["chunk_id"] == analyzer.index.chunk_ids[29] and metas[1]["label"] == 1
+
+    # Filtres appliqués aussi à la recherche lexicale
+    docs, metas = analyzer.retrieve_similar_docs(query.tolist(), n_results=3, label=0, query_text="kowalski 1987")
+    assert "senator kowalski quoted in 1987" not in docs and {m["label"] for m in metas} == {0}
+
+    batch = analyzer.retrieve_batch([query.tolist()] * 2, n_results=3, query_texts=["kowalski", "filler"])
+    assert batch[0][0][1] == "senator kowalski quoted in 1987"
+    assert "senator kowalski quoted in 1987" not in batch[1][0]
+
+
+def test_hybrid_chroma_backend_and_pipeline(tmp_path):
+    df, vectors, query = corpus()
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="news_articles")
+    storage.insert_into_chroma(df, embeddings=vectors)
+    BM25Index.build(df["chunk"], str(tmp_path / "bm25"), chunk_ids=storage.make_chunk_ids(df))
+
+    BM25Index.build(df["chunk"], str(tmp_path / "no_ids"))
+    with pytest.raises(ValueError): # Backend Chroma : ids requis pour relire les chunks lexicaux
+        RAGAnalyzer(chroma_path=str(tmp_path / "db"), bm25_path=str(tmp_path / "no_ids"))
+
+    pipeline = RAGPipeline(str(tmp_path / "db"), "news_articles", bm25_path=str(tmp_path / "bm25"))
+    with patch.object(pipeline.retriever, "vectorize_query", return_value=query.tolist()), \
+         patch("src.retrieval.ollama.generate", return_value={"response": "Verdict: TRUE"}):
+        response, docs, metas = pipeline.analyze_article("kowalski 1987", n_results=2)
+    assert docs[1] == "senator kowalski quoted in 1987"
+    assert metas[1]["chunk_id"] == storage.make_chunk_ids(df)[29]
+    assert pipeline.telemetry.last_trace.stages["query"] >= 0
+
+
+def test_analyzers_share_the_lexical_thread_pool(tmp_path):
+    df, vectors, query = corpus()
+    store = str(tmp_path / "store")
+    EmbeddingStore(store).write(df, vectors)
+    BM25Index.build(df["chunk"], str(tmp_path / "bm25"))
+
+    def bm25_threads():
+        return sum(t.name.startswith("bm25") for t in threading.enumerate())
+
+    for _ in range(5): # Un analyseur par requête (app, benchmarks) : aucun thread créé par instance
+        analyzer = RAGAnalyzer(backend="numpy", store_path=store, bm25_path=str(tmp_path / "bm25"))
+        analyzer.retrieve_batch([query.tolist()] * 3, n_results=3, query_texts=["kowalski"] * 3)
+    assert bm25_threads() <= 4
@@ -0,0 +1,120 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from src.chunking import WordChunker
+
+
+def reference_split_text(text, chunk_size, overlap):
+    """Ancienne implémentation de OllamaEmbedder.split_text (référence)."""
+    if not isinstance(text, str) or not text.strip():
+        return []
+    words = text.split()
+    chunks, start = [], 0
+    while start < len(words):
+        end = start + chunk_size
+        chunk = " ".join(words[start:end])
+        if len(chunk.split()) > 10:
+            chunks.append(chunk)
+        if end >= len(words):
+            break
+        start += chunk_size - overlap
+    return chunks
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(15, 2), (20, 0), (30, 29), (300, 30)])
+def test_split_text_matches_reference(chunk_size, overlap):
+    rng = random.Random(chunk_size)
+    chunker = WordChunker(chunk_size=chunk_size, overlap=overlap)
+    for _ in range(200):
+        n = rng.randint(0, 400)
+        seps = [" ", " ", " ", "  ", "\t", "\n", "\x1c"] + rng.choice([[], ["\xa0"]]) # Espacements irréguliers (ASCII ou non)
+        text = rng.choice(["", " "]) + "".join(f"w{i}" + rng.choice(seps) for i in range(n))
+        assert chunker.split_text(text) == reference_split_text(text, chunk_size, overlap)
+    assert chunker.split_text(None) == []
+
+
+def test_chunk_table_matches_iterrows_explosion():
+    rng = random.Random(0)
+    chunker = WordChunker(chunk_size=15, overlap=3)
+    df = pd.DataFrame({
+        "text": [" ".join(f"m{j}" for j in range(rng.randint(0, 60))) for _ in range(50)],
+        "label": [i % 2 for i in range(50)],
+        "subject": ["News"] * 50,
+        "date": pd.to_datetime(["2017-12-31"] * 50),
+    }, index=range(100, 150))
+
+    expected = pd.DataFrame([
+        {"index_article": i, "chunk_index": j, "chunk": chunk,
+         "label": row["label"], "subject": row["subject"], "date": row["date"]}
+        for i, row in df.iterrows()
+        for j, chunk in enumerate(reference_split_text(row["text"], 15, 3))
+    ])
+
+    pd.testing.assert_frame_equal(chunker.chunk_table(df), expected)
+
+
+def test_spans_are_arrays():
+    chunker = WordChunker(chunk_size=20, overlap=5)
+    doc, starts, ends = chunker.spans_from_lengths(np.array([0, 11, 50]))
+    # Document de 11 mots : 1 chunk ; 50 mots : fenêtres 0-20, 15-35, 30-50
+    assert doc.tolist() == [1, 2, 2, 2]
+    assert starts.tolist() == [0, 0, 15, 30]
+    assert ends.tolist() == [11, 20, 35, 50]
+
+
+def test_invalid_overlap():
+    with pytest.raises(ValueError):
+        WordChunker(chunk_size=10, overlap=10)
+
+
+# -------------------------------------------------------------
+# Découpage en tokens (TokenChunker)
+# -------------------------------------------------------------
+def make_tokenizer():
+    """Petit tokenizer WordPiece hors-ligne : 'w12' -> ['w', '##1', '##2']."""
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+
+    vocab = {"[UNK]": 0, "[CLS]": 1, "[SEP]": 2, "w": 3, **{f"##{d}": 4 + d for d in range(10)}}
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = __import__("tokenizers").processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 1), ("[SEP]", 2)]
+    )
+    return tokenizer
+
+
+def test_token_chunker_respects_token_budget_and_words():
+    from src.chunking import TokenChunker
+
+    tokenizer = make_tokenizer()
+    chunker = TokenChunker(tokenizer, chunk_size=60, overlap=8)
+    text = " ".join(f"w{i}" for i in range(200)) # mots de 2 à 4 tokens
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        n_tokens = len(tokenizer.encode(chunk, add_special_tokens=False).ids)
+        assert n_tokens <= 60
+        assert all(w.startswith("w") for w in chunk.split()) # Aucun mot coupé
+    # Chevauchement : chaque chunk reprend la fin du précédent, sans trou entre les chunks
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.split()[0] in prev.split()
+    covered = {w for c in chunks for w in c.split()}
+    assert covered == {f"w{i}" for i in range(len(covered))}
+    assert len(covered) > 190 # Seul un dernier segment de 10 mots ou moins peut être ignoré
+
+
+def test_truncation_report():
+    from src.chunking import truncation_report
+
+    tokenizer = make_tokenizer()
+    # 'w12' = 3 tokens ; 10 mots + [CLS]/[SEP] = 32 tokens
+    report = truncation_report(tokenizer, [" ".join(["w12"] * 10), "w1"], max_tokens=20)
+
+    assert report["n_chunks"] == 2
+    assert report["n_truncated_chunks"] == 1
+    assert report["total_tokens"] == 32 + 4
+    assert report["truncated_tokens"] == 12
@@ -3,6 +3,7 @@ import pytest
 from unittest.mock import patch
 import pandas as pd
 from typing import List
+import numpy as np
 
 
 
@@ -16,6 +17,14 @@ def mock_ollama_embeddings_func(model, prompt):
     # Le code de l'utilisateur s'attend à un objet avec un attribut 'embedding'
     return type("Response", (), {"embedding": SIMULATED_EMBEDDING})()
 
+# Fonction de mock pour ollama.embed (API batch : liste de textes en entrée)
+def mock_ollama_embed_func(model, input):
+    """Simule la réponse d'ollama.embed : un embedding par texte, dans l'ordre."""
+    return type("Response", (), {"embeddings": [SIMULATED_EMBEDDING for _ in input]})()
+
+# Embedding attendu après normalisation L2 de SIMULATED_EMBEDDING
+NORMALIZED_EMBEDDING = (np.array(SIMULATED_EMBEDDING) / np.linalg.norm(SIMULATED_EMBEDDING)).tolist()
+
 def test_init():
     """
     Test d'instanciation de la classe OllamaEmbedder.
@@ -50,7 +59,7 @@ def test_split_text():
 # -------------------------------------------------------------
 # Test de embed_texts avec mock
 # -------------------------------------------------------------
-@patch("src.embedding.ollama.embeddings", side_effect=mock_ollama_embeddings_func)
+@patch("src.embedding.ollama.embed", side_effect=mock_ollama_embed_func)
 def test_embed_texts_mock(mock_embed):
     """
     Test de la méthode embed_texts sans appel réel à Ollama.
@@ -70,7 +79,7 @@ def test_embed_texts_mock(mock_embed):
 # -------------------------------------------------------------
 # Test de embed_dataframe avec mock
 # -------------------------------------------------------------
-@patch("src.embedding.ollama.embeddings", side_effect=mock_ollama_embeddings_func)
+@patch("src.embedding.ollama.embed", side_effect=mock_ollama_embed_func)
 def test_embed_dataframe_mock(mock_embed):
     """
     Test de embed_dataframe qui combine le chunking et la vectorisation.
@@ -98,9 +107,9 @@ def test_embed_dataframe_mock(mock_embed):
     # Vérifie qu'il y a le nombre attendu de chunks (1 + 1 = 2)
     assert len(embedded_df) == 2
     
-    # Vérifie que les embeddings ont été générés
+    # Vérifie que les embeddings ont été générés (et normalisés L2)
     # L'erreur indique que la liste est parfois imbriquée. On s'assure de la bonne extraction.
-    expected_embeddings = [SIMULATED_EMBEDDING, SIMULATED_EMBEDDING]
+    expected_embeddings = [NORMALIZED_EMBEDDING, NORMALIZED_EMBEDDING]
     actual_embeddings = embedded_df["embedding"].apply(lambda x: x if isinstance(x, list) else x.embedding).tolist()
     
     assert actual_embeddings == expected_embeddings
@@ -108,3 +117,73 @@ def test_embed_dataframe_mock(mock_embed):
     # Vérifie la propagation des métadonnées
     assert embedded_df["label"].tolist() == [1, 0]
 
+
+# -------------------------------------------------------------
+# Test du mode batch : ordre des vecteurs et taille des requêtes
+# -------------------------------------------------------------
+def test_embed_texts_batched_preserves_order():
+    """
+    Chaque texte reçoit un vecteur distinct : on vérifie que l'ordre de sortie
+    correspond à l'ordre d'entrée et que les requêtes respectent batch_size.
+    """
+    def embed_by_index(model, input):
+        return type("Response", (), {"embeddings": [[float(t), 1.0] for t in input]})()
+
+    embedder = OllamaEmbedder(batch_size=3, max_workers=4)
+    texts = [str(i) for i in range(10)]
+
+    with patch("src.embedding.ollama.embed", side_effect=embed_by_index) as mock_embed:
+        embeddings = embedder.embed_texts(texts)
+
+    # 10 textes / batch de 3 -> 4 requêtes
+    assert mock_embed.call_count == 4
+    assert all(len(call.kwargs["input"]) <= 3 for call in mock_embed.call_args_list)
+    # Le ratio x/y du vecteur normalisé redonne l'indice du texte
+    assert [round(e[0] / e[1]) for e in embeddings] == list(range(10))
+
+
+@patch("src.embedding.ollama.embeddings", side_effect=mock_ollama_embeddings_func)
+def test_embed_texts_single_mode(mock_embeddings):
+    """
+    Avec batch_size=1, l'embedder utilise une requête par texte (API ollama.embeddings).
+    """
+    embedder = OllamaEmbedder(batch_size=1)
+    embeddings = embedder.embed_texts(["a", "b", "c"])
+
+    assert mock_embeddings.call_count == 3
+    assert embeddings == [NORMALIZED_EMBEDDING] * 3
+
+
+# -------------------------------------------------------------
+# Test de la reprise après interruption (checkpoints)
+# -------------------------------------------------------------
+def test_embed_dataframe_resumes_from_checkpoint(tmp_path):
+    """
+    Simule un crash après le premier shard : la relance ne doit vectoriser
+    que les chunks manquants et produire le même résultat qu'un run complet.
+    """
+    text = " ".join(f"mot{i}" for i in range(12))
+    df = pd.DataFrame({"text": [text] * 4, "label": [1, 0, 1, 0]})
+    checkpoint_dir = tmp_path / "checkpoints"
+    embedder = OllamaEmbedder(chunk_size=15, overlap=2, batch_size=2)
+
+    calls = []
+    def crash_after_first_shard(model, input):
+        calls.append(list(input))
+        if len(calls) > 1:
+            raise ConnectionError("Ollama indisponible")
+        return mock_ollama_embed_func(model, input)
+
+    with patch("src.embedding.ollama.embed", side_effect=crash_after_first_shard):
+        with pytest.raises(ConnectionError):
+            embedder.embed_dataframe(df.copy(), checkpoint_dir=str(checkpoint_dir), shard_size=2)
+
+    assert (checkpoint_dir / "shard_00000.pkl").exists()
+
+    with patch("src.embedding.ollama.embed", side_effect=mock_ollama_embed_func) as mock_embed:
+        embedded_df = embedder.embed_dataframe(df.copy(), checkpoint_dir=str(checkpoint_dir), shard_size=2)
+
+    # Seuls les 2 chunks du second shard sont re-vectorisés
+    assert sum(len(c.kwargs["input"]) for c in mock_embed.call_args_list) == 2
+    assert embedded_df["index_article"].tolist() == [0, 1, 2, 3]
+    assert embedded_df["embedding"].tolist() == [NORMALIZED_EMBEDDING] * 4
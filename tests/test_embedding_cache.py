@@ -0,0 +1,69 @@
+from unittest.mock import patch
+import numpy as np
+from src.embedding import OllamaEmbedder
+from src.embedding_cache import EmbeddingCache
+
+
+def mock_ollama_embed_func(model, input):
+    """Simule ollama.embed : le vecteur dépend de la longueur du texte."""
+    return type("Response", (), {"embeddings": [[float(len(t)), 1.0] for t in input]})()
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("all-minilm", ["un texte"], [[0.6, 0.8]])
+
+    found = cache.get_many("all-minilm", ["un   texte", "absent"]) # Espaces normalisés
+    assert list(found) == [0]
+    np.testing.assert_allclose(found[0], [0.6, 0.8], rtol=1e-6)
+    # Le nom du modèle fait partie de la clé
+    assert cache.get_many("autre-modele", ["un texte"]) == {}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put_many("m", ["a"], [[1.0]])
+    cache.put_many("m", ["b"], [[2.0]])
+    cache.get_many("m", ["a"]) # "a" devient le plus récemment utilisé
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert len(cache) == 2
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {0, 2}
+
+
+def test_entry_count_tracked_without_counting_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    cache.put_many("m", ["a", "b", "a"], [[1.0], [2.0], [1.0]]) # Doublon dans le lot
+    cache.put_many("m", ["b", "c"], [[4.0], [3.0]]) # "b" réécrit
+    assert cache.get_many("m", ["b"]) == {0: [4.0]}
+    cache.put_many("m", ["d", "e"], [[5.0], [6.0]])
+
+    assert len(cache) == cache._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 3
+    cache.close()
+    assert cache.stats()["entries"] == 3 # Statistiques servies sans requête SQLite
+    assert len(EmbeddingCache(str(tmp_path / "cache.sqlite"))) == 3
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path)
+    cache.put_many("m", ["texte"], [[1.0, 0.0]])
+    cache.close()
+
+    assert EmbeddingCache(path).get_many("m", ["texte"]) == {0: [1.0, 0.0]}
+
+
+def test_embedder_only_embeds_cache_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    embedder = OllamaEmbedder(cache=cache)
+
+    with patch("src.embedding.ollama.embed", side_effect=mock_ollama_embed_func) as mock_embed:
+        first = embedder.embed_texts(["aa", "bbb", "aa"])
+        second = embedder.embed_texts(["bbb", "cccc", "aa"])
+
+    # 1er appel : "aa" dédoublonné ; 2e appel : seul "cccc" est nouveau
+    assert [c.kwargs["input"] for c in mock_embed.call_args_list] == [["aa", "bbb"], ["cccc"]]
+    np.testing.assert_allclose(second[0], first[1], rtol=1e-6)
+    np.testing.assert_allclose(second[2], first[0], rtol=1e-6)
@@ -0,0 +1,99 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.embedding_cache import EmbeddingCache
+from src.embedding_farm import EmbeddingEndpoint, EmbeddingFarm
+from src.vector_store import EmbeddingStore
+from benchmarks.fake_ollama_server import FakeOllamaServer, fake_embedding
+
+DEAD_ENDPOINT = "http://127.0.0.1:9" # Port fermé : health check en échec
+
+
+def expected(texts, dim):
+    vectors = np.array([fake_embedding(t, dim) for t in texts], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_farm_skips_dead_endpoint_and_retries_failures():
+    texts = [f"chunk {i}" for i in range(50)]
+    with FakeOllamaServer(dim=8) as a, FakeOllamaServer(dim=8, fail_requests=3) as b:
+        farm = EmbeddingFarm([a.host, b.host, DEAD_ENDPOINT], batch_size=4, shard_size=7, backoff=0.01)
+        vectors = farm.embed_texts(texts)
+        assert a.stats["embed"]["requests"] > 0 and b.stats["embed"]["requests"] > 0
+
+    np.testing.assert_allclose(vectors, expected(texts, 8), rtol=1e-5)
+    assert sum(s["chunks"] for s in farm.stats.values()) == len(texts)
+
+
+def test_slow_shard_is_stolen_by_an_idle_worker():
+    texts = [f"chunk {i}" for i in range(12)]
+    with FakeOllamaServer(dim=4, embed_latency=0.02) as fast, FakeOllamaServer(dim=4, embed_latency=3.0) as slow:
+        farm = EmbeddingFarm([fast.host, slow.host], workers_per_endpoint=1, batch_size=100, shard_size=3,
+                             steal_factor=2.0)
+        t0 = time.perf_counter()
+        vectors = farm.embed_texts(texts)
+        assert time.perf_counter() - t0 < 2.0 # Le shard pris par l'endpoint lent est refait ailleurs
+
+    np.testing.assert_allclose(vectors, expected(texts, 4), rtol=1e-5)
+    assert list(farm.stats) == [f"{fast.host}#0"]
+
+
+def test_embed_to_store_resumes_and_merges_in_order(tmp_path):
+    chunks_df = pd.DataFrame({"index_article": np.arange(10) // 2, "chunk_index": np.arange(10) % 2,
+                              "chunk": [f"chunk {i}" for i in range(10)]})
+    work_dir = str(tmp_path / "farm")
+    with FakeOllamaServer(dim=8) as server:
+        farm = EmbeddingFarm([server.host], shard_size=4)
+        farm.embed_shards(chunks_df["chunk"].tolist()[:4] + ["autre"] * 6, work_dir=work_dir) # Autres textes : ignorés
+        farm.embed_shards(chunks_df["chunk"].tolist(), work_dir=work_dir)
+        requests = server.stats["embed"]["requests"]
+        store = farm.embed_to_store(chunks_df, str(tmp_path / "store"), work_dir)
+        assert server.stats["embed"]["requests"] == requests # Tous les shards repris depuis le disque
+
+    metadata, embeddings = store.load()
+    assert metadata["chunk"].tolist() == chunks_df["chunk"].tolist()
+    np.testing.assert_allclose(embeddings, expected(chunks_df["chunk"], 8), rtol=1e-5)
+
+
+def test_cached_chunks_are_not_sent_to_workers(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    texts = [f"chunk {i}" for i in range(10)]
+    with FakeOllamaServer(dim=8) as server:
+        EmbeddingFarm([server.host], shard_size=4, cache=cache).embed_texts(texts[:6])
+        assert server.stats["embed"]["requests"] == 2
+
+        # Shard 0 entièrement en cache, shard 1 en partie : seuls "chunk 6".."chunk 9" sont vectorisés
+        sent, embed = [], EmbeddingEndpoint.embed
+        def spy(endpoint, batch):
+            sent.extend(batch)
+            return embed(endpoint, batch)
+        with patch.object(EmbeddingEndpoint, "embed", spy):
+            vectors = EmbeddingFarm([server.host], shard_size=4, cache=cache).embed_texts(texts)
+        assert sorted(sent) == texts[6:]
+    np.testing.assert_allclose(vectors, expected(texts, 8), rtol=1e-5)
+    assert len(cache.get_many("all-minilm", texts)) == 10
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_unexpected_worker_exit_raises_instead_of_hanging():
+    with FakeOllamaServer(dim=8) as server, \
+         patch.object(EmbeddingEndpoint, "embed", side_effect=SystemExit("worker tué")):
+        farm = EmbeddingFarm([server.host], shard_size=2, workers_per_endpoint=2)
+        t0 = time.perf_counter()
+        with pytest.raises(RuntimeError, match="workers"):
+            farm.embed_texts([f"chunk {i}" for i in range(6)])
+        assert time.perf_counter() - t0 < 5.0
+
+
+def test_worker_processes():
+    texts = [f"chunk {i}" for i in range(9)]
+    with FakeOllamaServer(dim=8) as server:
+        vectors = EmbeddingFarm([server.host], shard_size=3, use_processes=True).embed_texts(texts)
+    np.testing.assert_allclose(vectors, expected(texts, 8), rtol=1e-5)
+
+
+def test_no_healthy_endpoint():
+    with pytest.raises(RuntimeError):
+        EmbeddingFarm([DEAD_ENDPOINT]).embed_texts(["chunk 0"])
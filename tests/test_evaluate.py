@@ -0,0 +1,30 @@
+import pandas as pd
+from benchmarks.bench_pipeline import use_ollama_host
+from benchmarks.evaluate import run_sweep, split_holdout, synthetic_corpus
+from benchmarks.fake_ollama_server import FakeOllamaServer
+
+
+def test_split_holdout_is_stratified_and_disjoint():
+    df = pd.DataFrame({"text": [f"article {i}" for i in range(40)], "label": [1] * 30 + [0] * 10})
+    train, holdout = split_holdout(df, n_holdout=8)
+    assert holdout["label"].value_counts().to_dict() == {1: 6, 0: 2}
+    assert len(train) == 32 and not set(train["text"]) & set(holdout["text"])
+
+
+def test_sweep_reports_accuracy_recall_latency_and_cost(tmp_path):
+    df = synthetic_corpus(60).reset_index(drop=True)
+    # Le faux serveur répond toujours "Verdict: TRUE"
+    with FakeOllamaServer(dim=16) as server, use_ollama_host(server.host):
+        rows = run_sweep(df, str(tmp_path), chunk_sizes=[50, 100], overlaps=[10], n_results_values=[2, 4],
+                         n_holdout=10, n_recall=5, price_prompt=1.0, price_completion=2.0)
+
+    assert [(r["chunk_size"], r["n_results"]) for r in rows] == [(50, 2), (50, 4), (100, 2), (100, 4)]
+    _, holdout = split_holdout(df, n_holdout=10)
+    for row in rows:
+        assert row["accuracy"] == (holdout["label"] == 1).mean()
+        assert row["unknown_rate"] == 0.0
+        assert 0.0 <= row["recall_at_k"] <= 1.0
+        assert row["p50_ms"] <= row["p95_ms"]
+        assert row["cost"] == (row["prompt_tokens"] * 1.0 + row["completion_tokens"] * 2.0) / 1000
+    # Plus de voisins : prompt plus long
+    assert rows[1]["prompt_tokens"] > rows[0]["prompt_tokens"]
@@ -0,0 +1,63 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.knn_classifier import KNNVoteClassifier
+from src.rag_pipeline import RAGPipeline
+
+
+def test_predict_weights_by_similarity():
+    classifier = KNNVoteClassifier(power=1.0, smoothing=0.0)
+    metas = [{"label": 1}, {"label": 0}, {"label": 0}]
+    # Un voisin TRUE très proche l'emporte sur deux voisins FAKE éloignés
+    label, confidence = classifier.predict(metas, [0.0, 1.6, 1.6])
+    assert label == 1
+    assert confidence == pytest.approx(1.0 / 1.4)
+    assert classifier.predict([], []) == (None, 0.0)
+
+
+def test_calibrate_picks_lowest_threshold_meeting_target(tmp_path):
+    classifier = KNNVoteClassifier(power=1.0, smoothing=0.0)
+    # Voisins unanimes (confiance 1) : corrects ; voisins partagés (confiance 2/3) : faux une fois sur deux
+    votes = [([{"label": 1}] * 3, [0.1] * 3)] * 6 + [([{"label": 0}, {"label": 0}, {"label": 1}], [0.1] * 3)] * 4
+    labels = [1] * 6 + [0, 0, 1, 1]
+
+    best = classifier.calibrate(votes, labels, target_accuracy=0.9)
+
+    assert classifier.threshold == pytest.approx(1.0)
+    assert best["coverage"] == pytest.approx(0.6) and best["accuracy"] == 1.0
+    classifier.save(str(tmp_path / "knn.json"))
+    assert KNNVoteClassifier.load(str(tmp_path / "knn.json")).threshold == pytest.approx(1.0)
+
+
+def test_pipeline_short_circuits_confident_votes(store_dir, fake_embed):
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir,
+                           knn_classifier=KNNVoteClassifier(threshold=0.6))
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed), \
+         patch("src.retrieval.ollama.generate", return_value={"response": "Verdict: FAKE\nReason: llm"}) as generate:
+        # Voisin identique à la requête (label 1), les autres orthogonaux : vote confiant, pas d'appel au LLM
+        response, docs, metas = pipeline.analyze_article("article 0", n_results=4)
+        assert response.startswith("Verdict: TRUE")
+        assert generate.call_count == 0
+
+        # Confiance (1 / 1.5) sous le seuil : le LLM tranche
+        pipeline.knn_classifier.threshold = 0.9
+        response, _, _ = pipeline.analyze_article("article 0", n_results=1)
+        assert response == "Verdict: FAKE\nReason: llm"
+        assert generate.call_count == 1
+
+        pipeline.knn_classifier.threshold = 0.6
+        result, _, _ = pipeline.fast_verdict("article 2", n_results=1)
+        assert result.verdict == "TRUE" and result.cited_chunk_ids == ["2_0"]
+
+    assert pipeline.knn_stats == {"requests": 3, "short_circuited": 2}
+    assert pipeline.short_circuit_rate == pytest.approx(2 / 3)
+
+
+def test_knn_counters_are_thread_safe(store_dir):
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir,
+                           knn_classifier=KNNVoteClassifier(threshold=0.6))
+    confident = ([{"label": 1}] * 3, [0.1] * 3)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(8):
+            executor.submit(lambda: [pipeline._knn_shortcut(*confident) for _ in range(500)])
+    assert pipeline.knn_stats == {"requests": 4000, "short_circuited": 4000}
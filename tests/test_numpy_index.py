@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.numpy_index import NumpySearchIndex
+from src.vector_store import EmbeddingStore
+
+
+@pytest.fixture
+def random_store(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    df = pd.DataFrame({
+        "index_article": np.arange(1000) // 2,
+        "chunk_index": np.arange(1000) % 2,
+        "chunk": [f"chunk {i}" for i in range(1000)],
+        "label": np.arange(1000) % 2,
+        "subject": ["News"] * 1000,
+        "date": pd.to_datetime(["2017-12-31"] * 500 + ["2016-03-01"] * 500),
+    })
+    EmbeddingStore(str(tmp_path / "store")).write(df, vectors)
+    return str(tmp_path / "store"), vectors
+
+
+def test_search_matches_brute_force(random_store):
+    store_dir, vectors = random_store
+    index = NumpySearchIndex(store_dir, block_size=128) # Plusieurs blocs
+    queries = vectors[:7] + 0.1
+
+    idx, scores = index.search(queries, k=5)
+
+    expected = np.argsort(-(queries @ vectors.T), axis=1)[:, :5]
+    np.testing.assert_array_equal(idx, expected)
+    assert np.all(np.diff(scores, axis=1) <= 0) # Tri décroissant
+
+
+def test_retrieve_similar_docs_format(random_store):
+    store_dir, vectors = random_store
+    index = NumpySearchIndex(store_dir)
+
+    docs, metas, distances = index.retrieve_similar_docs(vectors[42].tolist(), n_results=3)
+
+    assert docs[0] == "chunk 42"
+    assert metas[0] == {"index_article": 21, "label": 0, "subject": "News", "date": "2017-12-31",
+                        "date_int": 20171231, "chunk_id": "21_0"}
+    assert distances[0] == pytest.approx(0.0, abs=1e-5)
+    assert len(docs) == len(metas) == len(distances) == 3
+
+
+def test_filtered_search_matches_brute_force(random_store):
+    store_dir, vectors = random_store
+    index = NumpySearchIndex(store_dir, block_size=128)
+    queries = vectors[:7] + 0.1
+
+    rows = index.metadata_index.rows(label=1, date_from="2017-01-01")
+    idx, _ = index.search(queries, k=5, rows=rows)
+
+    allowed = np.flatnonzero((np.arange(1000) % 2 == 1) & (np.arange(1000) < 500))
+    np.testing.assert_array_equal(rows, allowed)
+    expected = allowed[np.argsort(-(queries @ vectors[allowed].T), axis=1)[:, :5]]
+    np.testing.assert_array_equal(idx, expected)
+
+
+def test_retrieve_similar_docs_filters(random_store):
+    store_dir, vectors = random_store
+    index = NumpySearchIndex(store_dir)
+
+    # Le plus proche voisin (label 0) est exclu : les 5 résultats respectent le filtre
+    docs, metas, _ = index.retrieve_similar_docs(vectors[42].tolist(), n_results=5, label=1, date_to="2016-12-31")
+    assert len(docs) == 5
+    assert all(m["label"] == 1 and m["date_int"] <= 20161231 for m in metas)
+
+    docs, metas, _ = index.retrieve_similar_docs(vectors[42].tolist(), n_results=5, subject="worldnews")
+    assert docs == metas == []
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from tokenizers.processors import TemplateProcessing
+from src.embedding_cache import EmbeddingCache
+from src.onnx_embedding import OnnxEmbedder
+from src.rag_pipeline import RAGPipeline
+
+VOCAB = {"[PAD]": 0, "[CLS]": 1, "[SEP]": 2, "[UNK]": 3, "article": 4, "0": 5, "1": 6, "2": 7, "3": 8}
+# État caché de chaque token (dimension 4) : "article i" a une moyenne dominée par l'axe i
+TABLE = np.zeros((len(VOCAB), 4), dtype=np.float32)
+TABLE[[5, 6, 7, 8], [0, 1, 2, 3]] = 10.0
+TABLE[[1, 2, 4]] = 0.1
+
+
+class FakeSession:
+    """Remplace onnxruntime.InferenceSession : états cachés = TABLE[input_ids]."""
+
+    def __init__(self, path, options=None, providers=None, input_names=("input_ids", "attention_mask")):
+        self.path = path
+        self.input_names = input_names
+        self.batches = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.input_names]
+
+    def run(self, outputs, feeds):
+        assert set(feeds) == set(self.input_names)
+        self.batches.append(feeds["input_ids"].shape)
+        return [TABLE[feeds["input_ids"]]]
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.post_processor = TemplateProcessing(single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 1), ("[SEP]", 2)])
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    (tmp_path / "onnx").mkdir()
+    for name in OnnxEmbedder.ONNX_FILES.values():
+        (tmp_path / name).write_bytes(b"")
+    return str(tmp_path)
+
+
+def expected(text):
+    ids = [1] + [VOCAB.get(w, 3) for w in text.split()] + [2]
+    vec = TABLE[ids].mean(axis=0)
+    return vec / np.linalg.norm(vec)
+
+
+def test_mean_pooling_ignores_padding_and_keeps_order(model_dir):
+    with patch("src.onnx_embedding.ort.InferenceSession", FakeSession):
+        embedder = OnnxEmbedder(model_path=model_dir, batch_size=2)
+    texts = ["article 2", "article 1 1 1 1", "article 0", "article 3 3"]
+    vectors = embedder.embed_texts(texts)
+
+    for text, vec in zip(texts, vectors):
+        np.testing.assert_allclose(vec, expected(text), rtol=1e-5)
+    assert sorted(embedder.session.batches) == [(2, 5), (2, 7)] # Padding au plus long texte de chaque batch
+    assert embedder.session.path.endswith("onnx/model.onnx")
+
+
+def test_int8_weights_and_model_inputs(model_dir):
+    def session(path, options=None, providers=None):
+        return FakeSession(path, input_names=("input_ids", "attention_mask", "token_type_ids"))
+
+    with patch("src.onnx_embedding.ort.InferenceSession", session):
+        embedder = OnnxEmbedder(model_path=model_dir, quantize=True)
+    assert embedder.session.path.endswith(OnnxEmbedder.ONNX_FILES[True])
+    np.testing.assert_allclose(embedder.embed_texts(["article 1"])[0], expected("article 1"), rtol=1e-5)
+
+    with pytest.raises(FileNotFoundError):
+        OnnxEmbedder(model_path=str(model_dir) + "/missing")
+
+
+def test_cache_entries_not_shared_between_backends(model_dir, tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    with patch("src.onnx_embedding.ort.InferenceSession", FakeSession):
+        fp32 = OnnxEmbedder(model_path=model_dir, cache=cache)
+        int8 = OnnxEmbedder(model_path=model_dir, quantize=True, cache=cache)
+    assert len({fp32.cache_key, int8.cache_key, "all-minilm"}) == 3 # "all-minilm" : vecteurs Ollama
+
+    fp32.embed_texts(["article 1"])
+    assert int8.cache.get_many(int8.cache_key, ["article 1"]) == {}
+    int8.embed_texts(["article 1"])
+    assert len(fp32.session.batches) == 1 and len(int8.session.batches) == 1 # Chaque backend vectorise le texte
+
+
+def test_pipeline_queries_without_ollama(model_dir, store_dir):
+    with patch("src.onnx_embedding.ort.InferenceSession", FakeSession):
+        embedder = OnnxEmbedder(model_path=model_dir)
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir, embedder=embedder)
+    assert pipeline.retriever.embedder is embedder and embedder.in_process
+
+    with patch("src.embedding.ollama.embed", side_effect=AssertionError("appel Ollama inattendu")), \
+         patch("src.retrieval.ollama.generate", return_value={"response": "Verdict: TRUE"}):
+        response, docs, metas = pipeline.analyze_article("article 2", n_results=1)
+    assert docs == ["chunk 2"]
@@ -0,0 +1,85 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.rag_pipeline import RAGPipeline
+from src.retrieval import RAGAnalyzer
+from src.storage_chroma import ChromaStorage
+
+
+def test_analyze_articles_streams_results(store_dir, fake_embed):
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir)
+    texts = [f"article {i}" for i in range(8)]
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def fake_generate(model, prompt, stream=False):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return {"response": f"Verdict: TRUE ({prompt.count('chunk')} chunks)"}
+
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed) as embed, \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate):
+        results = list(pipeline.analyze_articles(texts, n_results=1, max_concurrency=3))
+
+    assert embed.call_count == 1 # Vectorisation groupée (batch_size=8)
+    assert sorted(i for i, *_ in results) == list(range(8))
+    for i, response, docs, metas in results:
+        assert docs == [f"chunk {i % 4}"] # Le plus proche voisin de chaque article
+        assert response == "Verdict: TRUE (1 chunks)"
+    assert peak[0] <= 3
+    assert set(pipeline.batch_stats) == {"embedding", "retrieval", "generation"}
+    assert pipeline.batch_stats["generation"]["items"] == 8
+
+
+def test_chroma_retrieve_batch_single_query(tmp_path):
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="news_articles")
+    df = pd.DataFrame({
+        "index_article": [0, 1],
+        "chunk_index": [0, 0],
+        "chunk": ["chunk 0", "chunk 1"],
+        "label": [1, 0],
+        "subject": ["News", "News"],
+        "date": pd.to_datetime(["2017-12-31", "2016-01-05"]),
+    })
+    storage.insert_into_chroma(df, embeddings=np.eye(2, dtype=np.float32))
+    analyzer = RAGAnalyzer(chroma_path=str(tmp_path / "db"))
+
+    with patch.object(analyzer.collection, "query", wraps=analyzer.collection.query) as query:
+        results = analyzer.retrieve_batch([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]], n_results=1)
+
+    assert query.call_count == 1 # Une seule requête multi-vecteurs
+    assert [docs for docs, _ in results] == [["chunk 0"], ["chunk 1"], ["chunk 1"]]
+    assert results[0][1][0]["label"] == 1
+
+
+def test_fast_verdict_and_explanation(store_dir, fake_embed):
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir)
+    calls = []
+
+    def fake_generate(model, prompt, stream=False, format=None, options=None):
+        calls.append({"format": format, "options": options})
+        if format is not None:
+            return {"response": '{"verdict": "FAKE", "confidence": 0.8, "cited": [1]}'}
+        return {"response": "The closest reference article is labelled FAKE."}
+
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed), \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate):
+        result, docs, metas = pipeline.fast_verdict("article 2", n_results=2, num_predict=32)
+        assert result.verdict == "FAKE"
+        assert result.confidence == pytest.approx(0.8)
+        assert result.cited_chunk_ids == [metas[0]["chunk_id"]] == ["2_0"]
+        assert result.explanation is None
+        assert calls[0]["options"]["num_predict"] == 32
+
+        explanation = pipeline.explain("article 2", result, docs, metas)
+        assert result.explanation == explanation
+        assert calls[1]["format"] is None # Explication en texte libre, seulement à la demande
+
+        batch = list(pipeline.analyze_articles(["article 0", "article 1"], n_results=1, fast=True))
+    assert [r.verdict for _, r, _, _ in batch] == ["FAKE", "FAKE"]
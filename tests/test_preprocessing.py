@@ -90,3 +90,18 @@ def test_save_csv(tmp_path, sample_df):
     assert output_file.exists()
 
 
+
+
+def test_clean_pipeline_matches_chained_methods(sample_df):
+    # Valeurs hétérogènes : NaN, None et nombres dans des colonnes texte
+    df = sample_df.copy()
+    df["title"] = ["  Title ONE ", None, 42, "Check https://x.io !!", float("nan"), "Dup"]
+
+    expected = (
+        DataCleaner(df.copy()).remove_spaces().lower_case().date_format().clean_all_text_columns().get_df()
+    )
+    fused = DataCleaner(df.copy()).clean_pipeline().get_df()
+    fused_parallel = DataCleaner(df.copy()).clean_pipeline(n_jobs=2, chunk_size=1).get_df()
+
+    pd.testing.assert_frame_equal(fused, expected)
+    pd.testing.assert_frame_equal(fused_parallel, expected)
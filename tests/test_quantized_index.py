@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.numpy_index import NumpySearchIndex
+from src.quantized_index import QuantizedSearchIndex, recall_at_k
+from src.vector_store import EmbeddingStore
+
+
+@pytest.fixture(scope="module")
+def clustered_store(tmp_path_factory):
+    """Vecteurs normalisés regroupés en thèmes, comme des chunks d'articles."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(50, 32))
+    vectors = centers[rng.integers(0, 50, 3000)] + 0.5 * rng.normal(size=(3000, 32))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    df = pd.DataFrame({"chunk": [f"chunk {i}" for i in range(3000)], "label": np.arange(3000) % 2})
+    store_dir = str(tmp_path_factory.mktemp("quantized") / "store")
+    EmbeddingStore(store_dir).write(df, vectors)
+    # Requêtes de test tenues à l'écart : proches des thèmes mais absentes du store
+    queries = centers[rng.integers(0, 50, 50)] + 0.5 * rng.normal(size=(50, 32))
+    return store_dir, (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize("method,min_compression,min_recall", [("int8", 3.9, 0.99), ("pq", 15.0, 0.95)])
+def test_quantized_recall_and_memory(clustered_store, method, min_compression, min_recall):
+    store_dir, queries = clustered_store
+    exact = NumpySearchIndex(store_dir)
+    index = QuantizedSearchIndex(store_dir, method=method, pq_subspaces=8, block_size=1000)
+
+    assert exact.embeddings.nbytes / index.codes.nbytes >= min_compression # Hors paramètres (fixes)
+    assert recall_at_k(index, exact, queries, k=5) >= min_recall
+
+    # Scores renvoyés = similarités exactes (re-ranking float32)
+    idx, scores = index.search(queries[:3], k=5)
+    np.testing.assert_allclose(scores, np.einsum("qd,qkd->qk", queries[:3], exact.embeddings[idx]), rtol=1e-5)
+
+
+def test_codes_are_persisted(clustered_store):
+    store_dir, _ = clustered_store
+    first = QuantizedSearchIndex(store_dir, method="int8")
+    second = QuantizedSearchIndex(store_dir, method="int8")
+    np.testing.assert_array_equal(first.codes, second.codes)
+
+
+def test_codes_rebuilt_when_store_rewritten_with_same_size(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"chunk": [f"chunk {i}" for i in range(200)], "label": np.arange(200) % 2})
+    store_dir = str(tmp_path / "store")
+    EmbeddingStore(store_dir).write(df, rng.normal(size=(200, 16)).astype(np.float32))
+    before = QuantizedSearchIndex(store_dir, method="int8").codes
+
+    # Même nombre de chunks, autres vecteurs (ex. autre modèle) : les codes ne doivent pas être réutilisés
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    EmbeddingStore(store_dir).write(df, vectors)
+    after = QuantizedSearchIndex(store_dir, method="int8")
+    assert not np.array_equal(before, after.codes)
+    np.testing.assert_array_equal(after.codes, QuantizedSearchIndex(store_dir, method="int8").codes)
+    np.testing.assert_allclose(after.codes * after.scales, vectors, atol=after.scales.max())
+
+
+@pytest.mark.parametrize("method", ["int8", "pq"])
+def test_quantized_filtered_search(clustered_store, method):
+    store_dir, queries = clustered_store
+    index = QuantizedSearchIndex(store_dir, method=method, pq_subspaces=8, block_size=1000)
+
+    rows = index.metadata_index.rows(label=[1])
+    idx, _ = index.search(queries, k=5, rows=rows)
+
+    assert np.all(idx % 2 == 1)
+
+
+def test_pq_batch_scores_match_reconstructed_vectors(clustered_store):
+    store_dir, queries = clustered_store
+    index = QuantizedSearchIndex(store_dir, method="pq", pq_subspaces=8, block_size=700)
+
+    # Score approché = produit scalaire avec le vecteur reconstruit à partir des centroïdes
+    reconstructed = np.hstack([index.codebooks[j][index.codes[:, j]] for j in range(8)])
+    scores = index._approximate_scores(queries, index.codes)
+    assert scores.shape == (len(queries), len(index)) and scores.dtype == np.float32
+    np.testing.assert_allclose(scores, queries @ reconstructed.T, rtol=1e-4, atol=1e-5)
+
+    # Lot de requêtes (plusieurs blocs) = requêtes une à une
+    idx, sims = index.search(queries, k=5)
+    for q in range(0, len(queries), 10):
+        single_idx, single_sims = index.search(queries[q], k=5)
+        np.testing.assert_array_equal(idx[q], single_idx[0])
+        np.testing.assert_allclose(sims[q], single_sims[0], rtol=1e-6)
@@ -0,0 +1,94 @@
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.rag_pipeline import RAGPipeline
+from src.response_cache import ResponseCache
+
+
+def unit(*values):
+    vec = np.array(values, dtype=np.float32)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def test_exact_and_semantic_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), similarity_threshold=0.95)
+    scope = ResponseCache.make_scope("llama3.2", 5)
+    cache.put(scope, "Un  article viral", unit(1, 0, 0), {"response": "Verdict: FAKE"})
+
+    assert cache.get_exact(scope, "Un article viral ") == {"response": "Verdict: FAKE"} # Espaces normalisés
+    assert cache.get_exact(scope, "Un article viral modifié") is None
+    payload, similarity = cache.get_similar(scope, unit(1, 0.1, 0)) # Quasi-doublon
+    assert payload == {"response": "Verdict: FAKE"} and similarity > 0.99
+    assert cache.get_similar(scope, unit(1, 1, 0)) is None # Trop éloigné
+    # Le modèle et n_results font partie de la clé
+    assert cache.get_exact(ResponseCache.make_scope("phi3:mini", 5), "Un article viral") is None
+    assert cache.get_similar(ResponseCache.make_scope("llama3.2", 3), unit(1, 0, 0)) is None
+
+    assert cache.stats() == {"exact_hits": 1, "semantic_hits": 1, "misses": 2, "hit_rate": 0.5, "entries": 1}
+
+
+def test_persistence_ttl_and_lru(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    scope = ResponseCache.make_scope("llama3.2", 5)
+    cache = ResponseCache(path, max_entries=2)
+    for i in range(3):
+        cache.put(scope, f"article {i}", unit(1, i, 0), {"i": i})
+    cache.close()
+
+    reopened = ResponseCache(path, max_entries=2)
+    assert reopened.get_exact(scope, "article 0") is None # Entrée la moins récemment utilisée évincée
+    assert reopened.get_exact(scope, "article 2") == {"i": 2}
+    assert reopened.get_similar(scope, unit(1, 1, 0)) == ({"i": 1}, pytest.approx(1.0))
+
+    expired = ResponseCache(path, ttl=0.05)
+    time.sleep(0.1)
+    assert expired.get_exact(scope, "article 2") is None
+    assert expired.get_similar(scope, unit(1, 2, 0)) is None
+
+
+def test_batch_eviction_keeps_count_and_vectors_in_sync(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=20)
+    scope = ResponseCache.make_scope("llama3.2", 5)
+    vectors = np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    for i, vector in enumerate(vectors):
+        cache.put(scope, f"article {i}", vector, {"i": i})
+    cache.put(scope, "article 49", vectors[49], {"i": 49}) # Réécriture : pas de nouvelle entrée
+
+    stored = {key for (key,) in cache._conn.execute("SELECT key FROM responses")}
+    # Lots de 3 évictions (retour à 18 entrées) ; 2 insertions depuis le dernier lot
+    assert cache.stats()["entries"] == len(stored) == 20
+    assert set(cache._index[scope].keys) == stored
+    assert cache.get_similar(scope, vectors[49]) == ({"i": 49}, pytest.approx(1.0))
+    assert cache.get_similar(scope, vectors[0]) is None # Évincé
+    assert ResponseCache(str(tmp_path / "responses.sqlite")).stats()["entries"] == len(stored)
+
+
+def fake_generate(model, prompt, stream=False):
+    if stream:
+        return iter([{"response": "Verdict: TRUE"}, {"response": "\nReason: ok"}])
+    return {"response": "Verdict: TRUE\nReason: ok"}
+
+
+def test_pipeline_serves_repeated_articles_from_cache(tmp_path, store_dir, fake_embed):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir, response_cache=cache)
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed) as embed, \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate) as generate:
+        first = pipeline.analyze_article("article 1", n_results=2)
+        assert pipeline.analyze_article("article 1", n_results=2) == first # Hit exact, sans embedding
+        assert embed.call_count == 1
+        # "article 5" a le même vecteur que "article 1" : quasi-doublon
+        assert pipeline.analyze_article("article 5", n_results=2) == first
+        assert generate.call_count == 1
+        # n_results différent : nouvelle analyse
+        pipeline.analyze_article("article 1", n_results=1)
+        assert generate.call_count == 2
+
+        # Mode flux : la réponse complète est mise en cache à la fin du flux
+        stream, _, _ = pipeline.stream_article("article 2", n_results=2)
+        stream.consume()
+        stream, _, _ = pipeline.stream_article("article 2", n_results=2)
+        assert stream.consume() == "Verdict: TRUE\nReason: ok"
+        assert generate.call_count == 3
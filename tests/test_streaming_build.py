@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock, patch
+import pandas as pd
+import pytest
+from src.embedding import OllamaEmbedder
+from src.streaming_build import StreamingVectorDBBuilder, bounded_stage
+
+
+def mock_ollama_embed_func(model, input):
+    return type("Response", (), {"embeddings": [[1.0, 0.0] for _ in input]})()
+
+
+def write_csv(path, texts):
+    pd.DataFrame({
+        "title": [f"titre {i}" for i in range(len(texts))],
+        "text": texts,
+        "subject": ["politicsNews"] * len(texts),
+        "date": ["December 31, 2017 "] * len(texts),
+    }).to_csv(path, index=False)
+
+
+def test_bounded_stage_propagates_errors():
+    def failing():
+        yield 1
+        raise RuntimeError("boom")
+
+    stage = bounded_stage(failing(), maxsize=1)
+    assert next(stage) == 1
+    with pytest.raises(RuntimeError):
+        next(stage)
+
+
+@patch("src.embedding.ollama.embed", side_effect=mock_ollama_embed_func)
+def test_streaming_build_matches_batch_numbering(mock_embed, tmp_path):
+    long_text = " ".join(f"mot{i}" for i in range(20))
+    true_csv, fake_csv = tmp_path / "True.csv", tmp_path / "Fake.csv"
+    # Doublon dans deux batchs différents du même fichier
+    write_csv(true_csv, [long_text + " a", long_text + " b", long_text + " a"])
+    write_csv(fake_csv, [long_text + " c", "trop court"])
+
+    storage = MagicMock()
+    builder = StreamingVectorDBBuilder(OllamaEmbedder(chunk_size=50, overlap=5), storage, batch_size=2)
+    total = builder.run([(str(true_csv), 1), (str(fake_csv), 0)])
+
+    inserted = pd.concat([call.args[0] for call in storage.insert_into_chroma.call_args_list])
+    assert total == 3
+    # Numérotation continue des articles et des chunks entre les batchs
+    assert inserted["index_article"].tolist() == [0, 1, 2]
+    assert inserted.index.tolist() == [0, 1, 2]
+    assert inserted["label"].tolist() == [1, 1, 0]
+    assert all(len(e) == 2 for e in inserted["embedding"])
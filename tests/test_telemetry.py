@@ -0,0 +1,103 @@
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from src.rag_pipeline import RAGPipeline
+from src.telemetry import PipelineTelemetry, ollama_stats
+
+
+OLLAMA_STATS = {"prompt_eval_count": 120, "eval_count": 20, "eval_duration": 500_000_000}
+
+
+def fake_generate(model, prompt, stream=False, **kwargs):
+    if stream:
+        return iter([{"response": "Verdict: TRUE"}, {"response": "\nReason: ok", "done": True, **OLLAMA_STATS}])
+    return {"response": "Verdict: TRUE\nReason: ok", "done": True, **OLLAMA_STATS}
+
+
+def test_ollama_stats_accepts_dicts_and_objects():
+    assert ollama_stats({"eval_count": 3, "response": "x"}) == {"eval_count": 3}
+    assert ollama_stats(type("Response", (), {"eval_count": 3, "eval_duration": None})()) == {"eval_count": 3}
+
+
+def test_analyze_article_records_stages_tokens_and_spans(tmp_path, store_dir, fake_embed):
+    log_path = tmp_path / "logs" / "analyses.jsonl"
+    telemetry = PipelineTelemetry(str(log_path))
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    telemetry.tracer = provider.get_tracer("test")
+
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir, telemetry=telemetry)
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed), \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate):
+        pipeline.analyze_article("article 1", n_results=2)
+
+    trace = telemetry.last_trace
+    assert list(trace.stages) == ["embed", "query", "context", "prompt", "generate"]
+    assert trace.ollama == OLLAMA_STATS
+    assert trace.attributes == {"model": "llama3.2", "n_results": 2, "outcome": "llm"}
+
+    record = json.loads(log_path.read_text().splitlines()[-1])
+    assert record["name"] == "rag.analyze_article"
+    assert set(record["stages_ms"]) == set(trace.stages)
+    assert record["tokens_per_s"] == 40.0
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    root = spans["rag.analyze_article"]
+    assert root.attributes["rag.eval_count"] == 20
+    for stage in trace.stages:
+        assert spans[f"rag.{stage}"].parent.span_id == root.context.span_id
+
+
+def test_stream_article_trace_ends_with_the_stream(store_dir, fake_embed):
+    telemetry = PipelineTelemetry()
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir, telemetry=telemetry)
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed), \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate):
+        stream, docs, metas = pipeline.stream_article("article 1", n_results=1)
+        assert telemetry.last_trace is None # Génération pas encore consommée
+        stream.consume()
+
+    trace = telemetry.last_trace
+    assert trace.name == "rag.stream_article"
+    assert "generate" in trace.stages and "first_token_ms" in trace.attributes
+    assert trace.ollama["eval_count"] == 20
+
+
+def test_analyze_articles_records_batch_stages_and_tokens(store_dir, fake_embed):
+    telemetry = PipelineTelemetry()
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    telemetry.tracer = provider.get_tracer("test")
+
+    pipeline = RAGPipeline("unused", "unused", backend="numpy", store_path=store_dir, telemetry=telemetry)
+    with patch("src.embedding.ollama.embed", side_effect=fake_embed), \
+         patch("src.retrieval.ollama.generate", side_effect=fake_generate):
+        results = list(pipeline.analyze_articles(["article 0", "article 1", "article 2"], n_results=1))
+
+    assert len(results) == 3
+    trace = telemetry.last_trace
+    assert trace.name == "rag.analyze_articles"
+    assert list(trace.stages) == ["embed", "query", "prompt", "generate"]
+    assert trace.attributes == {"model": "llama3.2", "n_results": 1, "batch_size": 3, "knn": 0, "llm": 3}
+    assert trace.ollama == {field: 3 * value for field, value in OLLAMA_STATS.items()} # Cumul sur le lot
+
+    spans = exporter.get_finished_spans()
+    root = next(span for span in spans if span.name == "rag.analyze_articles")
+    generate_spans = [span for span in spans if span.name == "rag.generate"]
+    assert len(generate_spans) == 3 # Un span par génération, rattaché au lot
+    assert all(span.parent.span_id == root.context.span_id for span in generate_spans)
+
+
+def test_stage_durations_recorded_from_concurrent_threads():
+    run = PipelineTelemetry().start("rag.analyze_articles")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(8):
+            executor.submit(lambda: [run.record_stage("generate", 1.0) for _ in range(2000)])
+    run.finish()
+    assert run.stages["generate"] == pytest.approx(16000.0) # Aucune durée perdue
@@ -0,0 +1,216 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.vector_store import EmbeddingStore
+from src.storage_chroma import ChromaStorage
+from src.metadata_index import chroma_where
+from src.retrieval import RAGAnalyzer
+
+
+@pytest.fixture # Table de chunks vectorisés pour les tests
+def embedded_df():
+    return pd.DataFrame({
+        "index_article": [0, 0, 1],
+        "chunk_index": [0, 1, 0],
+        "chunk": ["premier chunk", "second chunk", "autre article"],
+        "label": [1, 1, 0],
+        "subject": ["politicsNews", "politicsNews", "News"],
+        "date": pd.to_datetime(["2017-12-31", "2017-12-31", "2016-01-05"]),
+        "embedding": [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+    })
+
+
+def test_store_roundtrip(tmp_path, embedded_df):
+    store = EmbeddingStore(str(tmp_path / "store"))
+    assert not store.exists()
+    store.write(embedded_df)
+    assert store.exists()
+
+    metadata, embeddings = store.load()
+
+    # Matrice float32 projetée en mémoire, alignée sur les métadonnées
+    assert isinstance(embeddings, np.memmap)
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (3, 2)
+    np.testing.assert_allclose(embeddings, np.array(embedded_df["embedding"].tolist()))
+    assert metadata["chunk_id"].tolist() == ["0_0", "0_1", "1_0"]
+    assert "embedding" not in metadata.columns
+    assert metadata["chunk"].tolist() == embedded_df["chunk"].tolist()
+
+
+def test_store_rejects_misaligned_embeddings(tmp_path, embedded_df):
+    store = EmbeddingStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.write(embedded_df, embeddings=np.zeros((2, 2)))
+
+
+def test_chroma_insert_and_export_store(tmp_path, embedded_df):
+    store_dir = str(tmp_path / "store")
+    EmbeddingStore(store_dir).write(embedded_df)
+
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    metadata, embeddings = storage.load_embedded_store(store_dir)
+    storage.insert_into_chroma(metadata, embeddings=embeddings)
+    assert storage.collection.count() == 3
+
+    # Les dates sont stockées comme dans l'ancien aller-retour CSV
+    chunk_id = ChromaStorage.make_chunk_ids(metadata)[2]
+    stored = storage.collection.get(ids=[chunk_id], include=["metadatas"])
+    assert stored["metadatas"][0]["date"] == "2016-01-05"
+    assert stored["metadatas"][0]["date_int"] == 20160105 # Forme numérique triable pour les filtres
+
+    export_dir = str(tmp_path / "export")
+    storage.export_to_store(export_dir)
+    exported_meta, exported_emb = EmbeddingStore(export_dir).load()
+    assert len(exported_meta) == 3
+    np.testing.assert_allclose(np.sort(exported_emb, axis=0), np.sort(embeddings, axis=0), rtol=1e-6)
+
+
+def test_chroma_where_filters(tmp_path, embedded_df):
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    storage.insert_into_chroma(embedded_df)
+
+    assert chroma_where() is None
+    where = chroma_where(label=1, subject=["politicsNews", "worldnews"], date_from="2017-01-01")
+    results = storage.collection.query(query_embeddings=[[0.6, 0.8]], n_results=3, where=where)
+    assert sorted(results["documents"][0]) == ["premier chunk", "second chunk"]
+
+    results = storage.collection.query(query_embeddings=[[1.0, 0.0]], n_results=3,
+                                       where=chroma_where(date_to="2016-12-31"))
+    assert results["documents"][0] == ["autre article"]
+
+
+def test_date_int_backfilled_on_collection_built_before_date_filters(tmp_path, embedded_df, caplog):
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    storage.insert_into_chroma(embedded_df)
+    # Collection antérieure à date_int : seule la date textuelle est stockée
+    stored = storage.collection.get(include=["metadatas", "embeddings", "documents"])
+    storage.collection.delete(ids=stored["ids"])
+    storage.collection.add(ids=stored["ids"], embeddings=stored["embeddings"], documents=stored["documents"],
+                           metadatas=[{k: v for k, v in m.items() if k != "date_int"} for m in stored["metadatas"]])
+    assert ChromaStorage.needs_date_backfill(storage.collection)
+
+    with caplog.at_level(logging.WARNING, logger="src.retrieval"):
+        RAGAnalyzer(chroma_path=str(tmp_path / "db"), collection_name="test")
+    assert "date_int" in caplog.text # Filtres de dates inopérants signalés côté requête
+
+    reopened = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test") # Rattrapage à l'ouverture
+    assert not ChromaStorage.needs_date_backfill(reopened.collection)
+    results = reopened.collection.query(query_embeddings=[[1.0, 0.0]], n_results=3,
+                                        where=chroma_where(date_to="2016-12-31"))
+    assert results["documents"][0] == ["autre article"]
+    assert reopened.backfill_date_int() == 0
+
+
+def test_insert_is_idempotent(tmp_path, embedded_df):
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    # Chunk dupliqué (même texte, mêmes métadonnées) dans le même batch
+    df = pd.concat([embedded_df, embedded_df.iloc[[0]]], ignore_index=True)
+
+    storage.insert_into_chroma(df, batch_size=2)
+    storage.insert_into_chroma(df.iloc[::-1].reset_index(drop=True)) # Relance, ordre des lignes différent
+
+    assert storage.collection.count() == 3
+    storage.insert_into_chroma(df, batch_size=1, prefetch=1) # Sans préparation anticipée au-delà du batch suivant
+    assert storage.collection.count() == 3
+    with pytest.raises(ValueError):
+        storage.insert_into_chroma(df, prefetch=0)
+
+
+def test_chunk_ids_are_stable():
+    df = pd.DataFrame({"chunk": ["a", "b"], "label": [1, 0], "chunk_index": [0, 0]})
+    ids = ChromaStorage.make_chunk_ids(df)
+    assert ChromaStorage.make_chunk_ids(df.iloc[::-1]) == ids[::-1]
+    assert len(set(ids)) == 2
+    # Avec une empreinte d'article, l'id est '<article_id>_<chunk_index>'
+    assert ChromaStorage.make_chunk_ids(df.assign(article_id=["x", "y"])) == ["x_0", "y_0"]
+
+
+def test_sync_articles_only_embeds_changes(tmp_path):
+    from unittest.mock import patch
+    from src.embedding import OllamaEmbedder
+
+    def mock_embed(model, input):
+        return type("Response", (), {"embeddings": [[1.0, 0.0] for _ in input]})()
+
+    words = " ".join(f"mot{i}" for i in range(30))
+    articles = pd.DataFrame({
+        "title": ["a", "b", "c"],
+        "text": [f"{words} a", f"{words} b", f"{words} c"],
+        "subject": ["News"] * 3,
+        "date": pd.to_datetime(["2017-12-31"] * 3),
+        "label": [1, 1, 0],
+    })
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    embedder = OllamaEmbedder(chunk_size=15, overlap=2)
+
+    with patch("src.embedding.ollama.embed", side_effect=mock_embed) as mocked:
+        first = storage.sync_articles(articles, embedder)
+        assert first["added"] == 3
+        assert storage.collection.count() == 6 # 2 chunks par article
+
+        # Rafraîchissement : "b" modifié, "c" supprimé, "d" ajouté, "a" inchangé
+        refreshed = pd.concat([
+            articles.iloc[[0]],
+            articles.iloc[[1]].assign(text=f"{words} b modifie"),
+            articles.iloc[[2]].assign(title="d", text=f"{words} d"),
+        ], ignore_index=True)
+        mocked.reset_mock()
+        second = storage.sync_articles(refreshed, embedder)
+
+    assert second == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1, "chunks_added": 4, "chunks_deleted": 4}
+    # Seuls les chunks de "b" et "d" ont été vectorisés
+    assert sum(len(c.kwargs["input"]) for c in mocked.call_args_list) == 4
+    assert storage.collection.count() == 6
+    texts = storage.collection.get(include=["documents"])["documents"]
+    assert not any(t.endswith(" c") for t in texts)
+
+
+def test_sync_articles_bootstraps_a_fully_built_collection(tmp_path):
+    from unittest.mock import patch
+    from src.embedding import OllamaEmbedder
+
+    def mock_embed(model, input):
+        return type("Response", (), {"embeddings": [[1.0, 0.0] for _ in input]})()
+
+    words = " ".join(f"mot{i}" for i in range(30))
+    articles = pd.DataFrame({
+        "title": ["a", "b", "c"],
+        "text": [f"a {words} a", f"b {words} b", f"c {words} c"],
+        "subject": ["News"] * 3,
+        "date": pd.to_datetime(["2017-12-31"] * 3),
+        "label": [1, 1, 0],
+    })
+    storage = ChromaStorage(persist_dir=str(tmp_path / "db"), collection_name="test")
+    embedder = OllamaEmbedder(chunk_size=15, overlap=2)
+
+    with patch("src.embedding.ollama.embed", side_effect=mock_embed) as mocked:
+        # Construction complète (build_vector_db.py) : ids de make_chunk_ids, pas de manifeste
+        chunks_df = embedder.build_chunks(articles)
+        chunks_df["embedding"] = embedder.embed_texts(chunks_df["chunk"].tolist())
+        storage.insert_into_chroma(chunks_df)
+        assert not os.path.exists(storage.manifest_path())
+
+        # Index non unique : les positions font foi
+        refreshed = pd.concat([
+            articles.iloc[[0]],
+            articles.iloc[[1]].assign(text=f"b modifie {words} b"),
+            articles.iloc[[2]],
+        ]).set_axis([7, 7, 7])
+        mocked.reset_mock()
+        stats = storage.sync_articles(refreshed, embedder)
+
+    # Le 2e chunk de "b" est identique à celui de "a" (même id) : il est conservé
+    assert stats == {"added": 0, "updated": 1, "removed": 0, "unchanged": 2, "chunks_added": 2, "chunks_deleted": 1}
+    assert sum(len(c.kwargs["input"]) for c in mocked.call_args_list) == 2 # Seul "b" est revectorisé
+    texts = storage.collection.get(include=["documents"])["documents"]
+    assert storage.collection.count() == 6 and len(set(texts)) == 5 # Chunks synchronisés : ids '<empreinte>_<i>'
+    assert any(t.startswith("b modifie") for t in texts) and not any(t.startswith("b mot0") for t in texts)
+    assert len(storage.load_manifest()) == 3
+
+    # Manifeste désormais écrit : une nouvelle synchronisation ne change rien
+    with patch("src.embedding.ollama.embed", side_effect=mock_embed) as mocked:
+        again = storage.sync_articles(refreshed, embedder)
+    assert again["unchanged"] == 3 and again["chunks_deleted"] == 0 and not mocked.called
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import patch
+from src.retrieval import RAGAnalyzer
+from src.verdict import VerdictResult, VerdictStream, parse_reason, parse_verdict
+
+
+def token_source(text, consumed):
+    """Simule un flux de tokens et compte ceux effectivement lus."""
+    for token in text.split(" "):
+        consumed.append(token)
+        yield token + " "
+
+
+RESPONSE = "Verdict: FAKE\nReason: The context contradicts the article.\n\nVerdict: TRUE extra tokens"
+
+
+def test_parse_verdict_and_reason():
+    assert parse_verdict("**Verdict:** true") == "TRUE"
+    assert parse_verdict("Verdict: FA") is None # Verdict encore incomplet
+    assert parse_reason("Verdict: FAKE\nReason:  because.") == "because."
+    assert parse_reason("Verdict: FAKE") is None
+
+
+def test_stream_exposes_verdict_early():
+    consumed = []
+    stream = VerdictStream(token_source(RESPONSE, consumed))
+    verdict_at = None
+    for i, _ in enumerate(stream):
+        if stream.verdict and verdict_at is None:
+            verdict_at = i
+    assert verdict_at == 1 # Disponible dès le deuxième token
+    assert stream.verdict == "FAKE"
+    assert not stream.stopped_early
+    assert stream.text.strip() == RESPONSE
+
+
+@pytest.mark.parametrize("stop_after,expected_tokens", [("verdict", 2), ("reason", 7)])
+def test_stream_stops_when_format_complete(stop_after, expected_tokens):
+    consumed = []
+    stream = VerdictStream(token_source(RESPONSE, consumed), stop_after=stop_after)
+    text = stream.consume()
+    assert stream.stopped_early
+    assert len(consumed) == expected_tokens
+    assert stream.verdict == "FAKE"
+    if stop_after == "reason":
+        assert stream.reason.startswith("The context contradicts the article.")
+
+
+def test_stream_response_uses_ollama_stream():
+    analyzer = RAGAnalyzer.__new__(RAGAnalyzer) # Pas de base vectorielle nécessaire
+    chunks = [{"response": "Verdict: "}, {"response": "TRUE"}, {"response": "\nReason: ok"}]
+    with patch("src.retrieval.ollama.generate", return_value=iter(chunks)) as generate:
+        stream = analyzer.stream_response("prompt", "llama3.2", stop_after="verdict")
+        assert [t for t in stream] == ["Verdict: ", "TRUE"]
+    assert generate.call_args.kwargs["stream"] is True
+
+
+def test_verdict_result_from_json():
+    result = VerdictResult.from_response('{"verdict": "fake", "confidence": 1.4, "cited": [2, 2, 9]}', ["a", "b", "c"])
+    assert result == VerdictResult(verdict="FAKE", confidence=1.0, cited_chunk_ids=["b"],
+                                   raw='{"verdict": "fake", "confidence": 1.4, "cited": [2, 2, 9]}')
+
+
+def test_verdict_result_truncated_output():
+    # Sortie coupée par num_predict : le verdict reste récupérable
+    assert VerdictResult.from_response('{"verdict": "TRUE", "confid', ["a"]).verdict == "TRUE"
+    assert VerdictResult.from_response("je ne sais pas", ["a"]).verdict == "UNKNOWN"